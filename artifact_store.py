@@ -0,0 +1,224 @@
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any, Iterator
+
+DEFAULT_QUOTA_BYTES = 20 * 1024 ** 3
+# Artifacts stored or read this recently are never evicted, so a run (in any process) can use
+# what it just stored before it gets around to pinning it.
+DEFAULT_GRACE_SECONDS = 600
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def script_hash(script: str) -> str:
+    return hashlib.sha256(script.encode("utf-8")).hexdigest()
+
+class ArtifactStore:
+    """Content-addressed store for rendered videos and partial movie segments.
+
+    Blobs live under blobs/<2 hex>/<sha256><ext>, so identical renders and segments are
+    stored once; an SQLite index tracks provenance and last access for LRU eviction.
+    Pinned artifacts and ones touched within grace_seconds are skipped by eviction.
+    """
+
+    def __init__(self, root: str = "artifacts", quota_bytes: int = DEFAULT_QUOTA_BYTES,
+                 grace_seconds: float = DEFAULT_GRACE_SECONDS):
+        self.root = Path(root)
+        self.blobs = self.root / "blobs"
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        self.quota_bytes = quota_bytes
+        self.grace_seconds = grace_seconds
+        self.pins: Dict[str, int] = {}
+        self.conn = sqlite3.connect(str(self.root / "index.db"), check_same_thread=False, timeout=30)
+        self.lock = threading.Lock()
+        self._init_db()
+
+    def _init_db(self):
+        try:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS artifacts (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                ext TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                topic TEXT,
+                script_hash TEXT,
+                quality TEXT,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                refs INTEGER DEFAULT 1
+            )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS artifacts_lru ON artifacts (last_access)")
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Artifact store initialization failed: {str(e)}")
+            raise
+
+    def _blob_path(self, artifact_id: str, ext: str) -> Path:
+        return self.blobs / artifact_id[:2] / f"{artifact_id}{ext}"
+
+    def put(self, path: str, kind: str = "video", topic: str = "", script: str = "",
+            quality: str = "480p15") -> str:
+        """Add a file (moved, not copied) and return its stable artifact id."""
+        artifact_id = file_digest(path)
+        ext = Path(path).suffix
+        blob = self._blob_path(artifact_id, ext)
+        size = os.path.getsize(path)
+        now = time.time()
+        if blob.exists():
+            os.remove(path)
+        else:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=blob.parent, suffix=".part")
+            os.close(fd)
+            shutil.move(path, tmp)
+            os.replace(tmp, blob)
+        with self.lock:
+            self.conn.execute("""
+            INSERT INTO artifacts (id, kind, ext, size, topic, script_hash, quality, created_at, last_access)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET last_access = excluded.last_access, refs = refs + 1,
+                topic = COALESCE(NULLIF(artifacts.topic, ''), excluded.topic)
+            """, (artifact_id, kind, ext, size, topic, script_hash(script) if script else "", quality, now, now))
+            self.conn.commit()
+        self.evict()
+        return artifact_id
+
+    def put_segments(self, directory: str, topic: str = "", script: str = "", quality: str = "480p15") -> List[str]:
+        """Store every partial movie file in a directory; identical segments across runs dedupe."""
+        directory = Path(directory)
+        if not directory.is_dir():
+            return []
+        return [
+            self.put(str(segment), kind="segment", topic=topic, script=script, quality=quality)
+            for segment in sorted(directory.glob("*.mp4"))
+        ]
+
+    def get(self, artifact_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.conn.execute("""
+            SELECT id, kind, ext, size, topic, script_hash, quality, created_at, last_access, refs
+            FROM artifacts WHERE id = ?
+            """, (artifact_id,)).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "kind", "ext", "size", "topic", "script_hash", "quality", "created_at", "last_access", "refs")
+        return dict(zip(keys, row))
+
+    def path(self, artifact_id: str) -> Optional[str]:
+        """Resolve an artifact id to a readable file, refreshing its LRU position."""
+        entry = self.get(artifact_id)
+        if entry is None:
+            return None
+        blob = self._blob_path(artifact_id, entry["ext"])
+        if not blob.exists():
+            return None
+        with self.lock:
+            self.conn.execute("UPDATE artifacts SET last_access = ? WHERE id = ?", (time.time(), artifact_id))
+            self.conn.commit()
+        return str(blob.resolve())
+
+    def pin(self, artifact_id: str) -> None:
+        with self.lock:
+            self.pins[artifact_id] = self.pins.get(artifact_id, 0) + 1
+
+    def unpin(self, artifact_id: str) -> None:
+        with self.lock:
+            if self.pins.get(artifact_id, 0) > 1:
+                self.pins[artifact_id] -= 1
+            else:
+                self.pins.pop(artifact_id, None)
+
+    @contextmanager
+    def pinned(self, artifact_ids: List[str]) -> Iterator[None]:
+        """Keep these artifacts out of eviction while a run still needs them."""
+        ids = [artifact_id for artifact_id in artifact_ids if artifact_id]
+        for artifact_id in ids:
+            self.pin(artifact_id)
+        try:
+            yield
+        finally:
+            for artifact_id in ids:
+                self.unpin(artifact_id)
+
+    def usage(self) -> Dict[str, int]:
+        with self.lock:
+            count, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts").fetchone()
+        return {"artifacts": count, "bytes": total, "quota_bytes": self.quota_bytes}
+
+    def evict(self) -> int:
+        """Delete least-recently-accessed artifacts until the store fits its quota, skipping pinned
+        and recently used ones (the store may stay over quota until they are released)."""
+        with self.lock:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+            if total <= self.quota_bytes:
+                return 0
+            freed = 0
+            rows = self.conn.execute("""
+            SELECT id, ext, size FROM artifacts WHERE last_access < ? ORDER BY last_access
+            """, (time.time() - self.grace_seconds,)).fetchall()
+            for artifact_id, ext, size in rows:
+                if total - freed <= self.quota_bytes:
+                    break
+                if artifact_id in self.pins:
+                    continue
+                self._blob_path(artifact_id, ext).unlink(missing_ok=True)
+                self.conn.execute("DELETE FROM artifacts WHERE id = ?", (artifact_id,))
+                freed += size
+            self.conn.commit()
+        logging.info(f"Artifact store evicted {freed} bytes")
+        return freed
+
+    def close(self):
+        try:
+            self.conn.close()
+        except sqlite3.Error as e:
+            logging.error(f"Failed to close artifact store: {str(e)}")
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect the rendered media artifact store.")
+    parser.add_argument("--root", default=os.getenv("ARTIFACT_DIR", "artifacts"))
+    parser.add_argument("--quota-bytes", type=int, default=int(os.getenv("ARTIFACT_QUOTA_BYTES", DEFAULT_QUOTA_BYTES)))
+    parser.add_argument("--grace-seconds", type=float,
+                        default=float(os.getenv("ARTIFACT_GRACE_SECONDS", DEFAULT_GRACE_SECONDS)),
+                        help="Never evict artifacts used this recently")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="Show an artifact and its file path")
+    show.add_argument("artifact_id")
+    sub.add_parser("stats", help="Show store usage")
+    sub.add_parser("evict", help="Evict down to the quota")
+    args = parser.parse_args(argv)
+
+    store = ArtifactStore(args.root, args.quota_bytes, args.grace_seconds)
+    try:
+        if args.command == "show":
+            entry = store.get(args.artifact_id)
+            if entry is None:
+                print(f"No such artifact: {args.artifact_id}")
+                return 1
+            print({**entry, "path": store.path(args.artifact_id)})
+        elif args.command == "evict":
+            store.evict()
+        print(store.usage())
+    finally:
+        store.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
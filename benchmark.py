@@ -0,0 +1,310 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import statistics
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Callable, Dict, Any, List
+from colorama import init, Fore
+from error_memory import ErrorMemory
+from utils import extract_code_block, extract_scene_name, divide_scenes, read_module_docs
+from script_optimizer import optimize_script
+from budget import make_budget
+
+init(autoreset=True)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+STARTUP_MODULES = ["flow", "flow2", "flow3", "flow4"]
+LARGEST_DATASET_MODULES = [
+    "manim.mobject.graphing.coordinate_systems",
+    "manim.mobject.mobject",
+    "manim.mobject.types.vectorized_mobject",
+]
+
+class _StubMessage:
+    def __init__(self, content: str):
+        self.content = content
+
+class _StubLLM:
+    """Answers analyze_error prompts instantly so only the SQLite path is timed."""
+
+    def __init__(self):
+        self.counter = 0
+
+    def invoke(self, prompt):
+        self.counter += 1
+        return _StubMessage(f"REPLACE: `line_{self.counter % 97}` WITH `fixed_{self.counter % 97}`")
+
+def _scene_source(index: int) -> str:
+    return f"""
+class Scene{index}(Scene):
+    def construct(self):
+        axes = Axes(x_range=[0, 10, 1], y_range=[0, 8, 1])
+        dots = VGroup(*[Dot(axes.c2p(x, x % 7), color=BLUE) for x in range(10)])
+        self.play(Create(axes), run_time=0.5)
+        self.play(LaggedStart(*[Create(d) for d in dots], lag_ratio=0.1))
+        self.wait(1)
+"""
+
+def _large_llm_output(scenes: int = 200) -> str:
+    prose = "The model reasons about the visual layout before writing code. " * 400
+    code = "from manim import *\n" + "".join(_scene_source(i) for i in range(scenes))
+    return f"{prose}\n```python\n{code}\n```\n{prose}"
+
+def _large_text_script(sentences: int = 5000) -> str:
+    return ". ".join(f"Sentence {i} explains one more detail of linear regression" for i in range(sentences))
+
+def _checkpoint_state() -> Dict[str, Any]:
+    """A flow4 AgentState after a few attempts, with every field the checkpointer stores filled in."""
+    script = extract_code_block(_large_llm_output(scenes=20))
+    error = "Traceback (most recent call last):\n" + "  File \"scene.py\", line 12, in construct\n" * 30
+    history = [
+        {"attempt": i, "script_hash": f"{i:064x}", "script": script, "error": "" if i == 3 else "AttributeError",
+         "status": "success" if i == 3 else "error", "last_error": "" if i == 3 else error[-2000:],
+         "artifact_id": f"{i:064x}" if i == 3 else "", "render_quality": "low", "review": "IMPROVEMENTS: none"}
+        for i in range(1, 4)
+    ]
+    return {
+        "user_input": "Explain linear regression",
+        "reasoning": "Start with a scatter plot, then fit a line. " * 50,
+        "steps": "\n".join(f"{i}. Animate step {i}" for i in range(1, 40)),
+        "script_content": script,
+        "candidates": [script, script.replace("run_time=1", "run_time=2")],
+        "execution_result": "Success",
+        "observer_feedback": "IMPROVEMENTS:\n" + "Slow down the fit animation.\n" * 20,
+        "quality_review": "APPROVED",
+        "reviewed_script": script,
+        "improvement_suggestions": "Slow down the fit animation.\n" * 20,
+        "error_fixes": "No fixes needed",
+        "render_failures": 2,
+        "final_code": script,
+        "last_error": "",
+        "artifact_id": "f" * 64,
+        "use_cache": True,
+        "warm_start": False,
+        "warm_script": "",
+        "cache_hit": 0,
+        "attempts": 3,
+        "attempt_history": history,
+        "stuck": 0,
+        "stop_reason": "",
+        "budget": make_budget(),
+        "spent": {"seconds": 142.5, "llm_tokens": 21000.0, "render_seconds": 95.2},
+        "render_quality": "low",
+        "status": "success",
+    }
+
+def _seed_error_memory(error_memory: ErrorMemory, rows: int) -> None:
+    batch = (
+        (f"AttributeError: 'Mobject' has no attribute 'attr_{i}'", f"REPLACE: `a{i}` WITH `b{i}`", "self.play(x)", random.randint(1, 50))
+        for i in range(rows)
+    )
+    error_memory.conn.executemany(
+        "INSERT OR IGNORE INTO error_knowledge (error_summary, solution, example_code, occurrences) VALUES (?, ?, ?, ?)",
+        batch
+    )
+    error_memory.conn.commit()
+
+def time_call(fn: Callable[[], Any], repeat: int, number: int = 1) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number * 1000)
+    return {
+        "min_ms": min(samples),
+        "median_ms": statistics.median(samples),
+        "mean_ms": statistics.fmean(samples),
+        "max_ms": max(samples),
+        "repeat": repeat,
+        "number": number,
+    }
+
+def bench_extraction(repeat: int) -> Dict[str, Dict[str, float]]:
+    text = _large_llm_output()
+    code = extract_code_block(text)
+    return {
+        "extract_code_block[large]": time_call(lambda: extract_code_block(text), repeat, number=20),
+        "extract_scene_name[large]": time_call(lambda: extract_scene_name(code), repeat, number=200),
+        "extract_code_block[no_fence]": time_call(lambda: extract_code_block(code), repeat, number=20),
+    }
+
+def bench_error_memory(repeat: int, row_counts: List[int]) -> Dict[str, Dict[str, float]]:
+    results = {}
+    llm = _StubLLM()
+    for rows in row_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            error_memory = ErrorMemory(str(Path(tmp) / "bench_errors.db"))
+            try:
+                logging.info(f"Seeding ErrorMemory with {rows} rows")
+                _seed_error_memory(error_memory, rows)
+                results[f"ErrorMemory.record_error[{rows}]"] = time_call(
+                    lambda: error_memory.record_error(
+                        raw_error="Traceback...\nNameError: name 'np' is not defined",
+                        faulty_code="self.play(Create(np.array([1, 2])))",
+                        llm=llm
+                    ),
+                    repeat, number=5
+                )
+                results[f"ErrorMemory.get_prevention_guide[{rows}]"] = time_call(
+                    error_memory.get_prevention_guide, repeat
+                )
+            finally:
+                error_memory.close()
+    return results
+
+def bench_module_docs(repeat: int) -> Dict[str, Dict[str, float]]:
+    modules = ",".join(LARGEST_DATASET_MODULES)
+    return {
+        "module_documentation_extractor[3_largest]": time_call(lambda: read_module_docs(modules), repeat, number=5),
+    }
+
+def bench_scene_division(repeat: int) -> Dict[str, Dict[str, float]]:
+    text_script = _large_text_script()
+    titles = "\n".join(f"Scene {i}: Part {i}" for i in range(1, 13))
+    return {
+        "scene_division_node[5000_sentences]": time_call(lambda: divide_scenes(text_script, titles), repeat, number=20),
+    }
+
+def bench_script_optimizer(repeat: int) -> Dict[str, Dict[str, float]]:
+    loop = """
+        for x in range(10):
+            dot = Dot(axes.c2p(x, x % 7), color=BLUE)
+            dots.add(dot)
+            self.play(Create(dot), run_time=0.3)
+        self.play(FadeOut(dots))
+        self.play(FadeOut(axes))
+"""
+    code = "from manim import *\n" + "".join(
+        _scene_source(i).replace("        self.wait(1)\n", loop) for i in range(20)
+    )
+    return {
+        "optimize_script[20_scenes]": time_call(lambda: optimize_script(code), repeat, number=5),
+    }
+
+def bench_checkpoint(repeat: int) -> Dict[str, Dict[str, float]]:
+    try:
+        from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+    except ImportError:
+        logging.warning(Fore.YELLOW + "langgraph not installed - skipping checkpoint serialization benchmark")
+        return {}
+    serde = JsonPlusSerializer()
+    state = _checkpoint_state()
+    payload = serde.dumps_typed(state)
+    return {
+        "checkpoint.dumps_typed": time_call(lambda: serde.dumps_typed(state), repeat, number=50),
+        "checkpoint.loads_typed": time_call(lambda: serde.loads_typed(payload), repeat, number=50),
+    }
+
+def _import_seconds(module: str) -> float:
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    env = {**os.environ, "NO_PROXY": "*", "LANGCHAIN_TRACING_V2": "false"}
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, timeout=120,
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+    return float(result.stdout.strip().splitlines()[-1])
+
+def bench_startup(repeat: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for module in STARTUP_MODULES:
+        try:
+            samples = [_import_seconds(module) * 1000 for _ in range(repeat)]
+        except Exception as e:
+            logging.warning(Fore.YELLOW + f"Skipping startup benchmark for {module}: {e}")
+            continue
+        results[f"startup.import[{module}]"] = {
+            "min_ms": min(samples),
+            "median_ms": statistics.median(samples),
+            "mean_ms": statistics.fmean(samples),
+            "max_ms": max(samples),
+            "repeat": repeat,
+            "number": 1,
+        }
+    return results
+
+def run_benchmarks(repeat: int, row_counts: List[int]) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for bench in (bench_extraction, bench_module_docs, bench_scene_division, bench_script_optimizer,
+                  bench_checkpoint, bench_startup):
+        logging.info(Fore.GREEN + f"Running {bench.__name__}")
+        results.update(bench(repeat))
+    logging.info(Fore.GREEN + "Running bench_error_memory")
+    results.update(bench_error_memory(repeat, row_counts))
+    return results
+
+def compare_to_baseline(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any],
+                        tolerance: float, min_delta_ms: float = 0.05) -> List[str]:
+    """Compares the best run (min_ms), which is less noisy than the median on a shared machine."""
+    regressions = []
+    for name, stats in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if not reference:
+            continue
+        limit = max(reference["min_ms"] * (1 + tolerance), reference["min_ms"] + min_delta_ms)
+        if stats["min_ms"] > limit:
+            regressions.append(
+                f"{name}: best run {stats['min_ms']:.3f}ms > {reference['min_ms']:.3f}ms (+{tolerance:.0%} allowed)"
+            )
+    return regressions
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the orchestration hot paths (no LLM or render time).")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--rows", default="10000,100000", help="Comma-separated ErrorMemory sizes, e.g. 10000,100000,1000000")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown of the best run relative to the baseline")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="Ignore slowdowns smaller than this")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    args = parser.parse_args(argv)
+
+    row_counts = [int(r) for r in args.rows.split(",") if r.strip()]
+    results = run_benchmarks(args.repeat, row_counts)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    logging.info(Fore.GREEN + f"Wrote results to {args.output}")
+
+    for name, stats in results.items():
+        print(f"{name:<50} median {stats['median_ms']:>10.3f} ms   min {stats['min_ms']:>10.3f} ms")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logging.info(Fore.GREEN + f"Stored baseline in {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        logging.warning(Fore.YELLOW + f"No baseline at {args.baseline} - run with --save-baseline first")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        for line in regressions:
+            logging.error(Fore.RED + f"Regression: {line}")
+        return 1
+    logging.info(Fore.GREEN + "No regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
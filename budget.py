@@ -0,0 +1,135 @@
+import os
+import time
+import logging
+import functools
+import threading
+import contextvars
+from typing import Dict, Any, Callable, Optional, Tuple
+
+PROFILES = {
+    "interactive": {"deadline_seconds": 240, "llm_tokens": 80000, "render_seconds": 300, "max_attempts": 4},
+    "batch": {"deadline_seconds": 3600, "llm_tokens": 400000, "render_seconds": 2400, "max_attempts": 10},
+}
+
+# Starting guesses per node (wall seconds, LLM tokens, render seconds) until real calls are measured.
+PRIOR_COSTS = {
+    "action": (20.0, 6000, 0.0),
+    "execute": (60.0, 0, 60.0),
+    "review": (8.0, 3000, 0.0),
+    "observe": (10.0, 4000, 0.0),
+}
+EWMA_ALPHA = 0.3
+# Until a draft render has been measured, assume it costs this fraction of a normal one.
+DRAFT_COST_RATIO = 0.4
+
+current_usage: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("current_usage", default=None)
+_charge_lock = threading.Lock()
+
+def charge(llm_tokens: float = 0, render_seconds: float = 0.0) -> None:
+    """Add usage to whichever graph node is running in this context (no-op outside a node).
+
+    Worker threads started by a node see the same usage dict if they run in contextvars.copy_context().
+    """
+    usage = current_usage.get()
+    if usage is not None:
+        with _charge_lock:
+            usage["llm_tokens"] += llm_tokens
+            usage["render_seconds"] += render_seconds
+
+def add_usage(left: Dict[str, float], right: Dict[str, float]) -> Dict[str, float]:
+    """State reducer: parallel nodes both report what they spent."""
+    merged = dict(left or {})
+    for key, value in (right or {}).items():
+        merged[key] = merged.get(key, 0) + value
+    return merged
+
+class NodeCosts:
+    """Process-wide moving averages of what each graph node costs, used to predict the next iteration."""
+
+    def __init__(self):
+        self.costs: Dict[str, Tuple[float, float, float]] = dict(PRIOR_COSTS)
+        self.lock = threading.Lock()
+
+    def record(self, node: str, seconds: float, llm_tokens: float, render_seconds: float) -> None:
+        with self.lock:
+            if node not in self.costs:
+                self.costs[node] = (seconds, llm_tokens, render_seconds)
+                return
+            old = self.costs[node]
+            new = (seconds, llm_tokens, render_seconds)
+            self.costs[node] = tuple(o + EWMA_ALPHA * (n - o) for o, n in zip(old, new))
+
+    def get(self, node: str) -> Tuple[float, float, float]:
+        with self.lock:
+            return self.costs.get(node, (0.0, 0.0, 0.0))
+
+    def iteration(self, quality: str = "low", error: bool = False) -> Dict[str, float]:
+        """Predicted cost of one more action -> (execute || review) -> observe round."""
+        action, review, observe = self.get("action"), self.get("review"), self.get("observe")
+        execute = self.get("execute")
+        if quality == "draft":
+            with self.lock:
+                execute = self.costs.get("execute:draft") or tuple(v * DRAFT_COST_RATIO for v in execute)
+        observe_seconds = observe[0] if error else 0.0
+        return {
+            "seconds": action[0] + max(execute[0], review[0]) + observe_seconds,
+            "llm_tokens": action[1] + review[1] + (observe[1] if error else 0.0),
+            "render_seconds": execute[2],
+        }
+
+def metered(node: str, fn: Callable, costs: Callable[[], NodeCosts]) -> Callable:
+    """Wrap a graph node so its LLM tokens and render seconds land in state["spent"] and in the cost model."""
+    @functools.wraps(fn)
+    def run(state, *args, **kwargs):
+        usage = {"llm_tokens": 0, "render_seconds": 0.0}
+        token = current_usage.set(usage)
+        start = time.perf_counter()
+        try:
+            update = fn(state, *args, **kwargs)
+        finally:
+            current_usage.reset(token)
+        if node != "execute" or usage["render_seconds"]:
+            # An execute that reused an earlier outcome rendered nothing and says nothing about render cost.
+            key = f"{node}:draft" if node == "execute" and state.get("render_quality") == "draft" else node
+            costs().record(key, time.perf_counter() - start, usage["llm_tokens"], usage["render_seconds"])
+        return {**update, "spent": {k: round(v, 3) for k, v in usage.items()}}
+    return run
+
+def make_budget(options: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Deadline (epoch seconds), token/render limits and attempt cap from a profile plus per-request overrides."""
+    options = options or {}
+    profile = PROFILES[options.get("profile") or os.getenv("BUDGET_PROFILE", "interactive")]
+    limits = {key: float(options.get(key, profile[key])) for key in profile}
+    return {
+        "deadline": time.time() + limits["deadline_seconds"],
+        "llm_tokens": limits["llm_tokens"],
+        "render_seconds": limits["render_seconds"],
+        "max_attempts": int(limits["max_attempts"]),
+    }
+
+def plan_next(budget: Dict[str, Any], spent: Dict[str, float], attempts: int, costs: NodeCosts,
+              error: bool) -> Tuple[str, str]:
+    """Return ("full" | "draft" | "stop", reason) for the next improve or fix iteration."""
+    if attempts >= budget["max_attempts"]:
+        return "stop", f"reached {budget['max_attempts']} attempts"
+    remaining = {
+        "seconds": budget["deadline"] - time.time(),
+        "llm_tokens": budget["llm_tokens"] - spent.get("llm_tokens", 0),
+        "render_seconds": budget["render_seconds"] - spent.get("render_seconds", 0),
+    }
+
+    def shortfall(quality: str) -> Optional[str]:
+        needed = costs.iteration(quality, error)
+        for key, value in needed.items():
+            if value > remaining[key]:
+                return f"next iteration needs ~{value:.0f} {key.replace('_', ' ')}, {max(0, remaining[key]):.0f} left"
+        return None
+
+    full = shortfall("low")
+    if full is None:
+        return "full", ""
+    draft = shortfall("draft")
+    if draft is None:
+        return "draft", full
+    logging.info(f"Budget exhausted: {draft}")
+    return "stop", draft
@@ -0,0 +1,186 @@
+import os
+import logging
+import threading
+import functools
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_MODEL = "gemini-1.5-flash"
+
+_error_memories = {}
+_error_memories_lock = threading.Lock()
+
+# Reentrant because factories build on each other (get_llm -> get_rate_limiter, get_render_scheduler -> get_glyph_cache).
+_shared_lock = threading.RLock()
+
+def shared(factory):
+    """Lazy per-process singleton (one per distinct argument tuple). Unlike lru_cache, concurrent
+    first calls wait for a single instance instead of each building their own."""
+    instances = {}
+
+    @functools.wraps(factory)
+    def get(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        if key in instances:
+            return instances[key]
+        with _shared_lock:
+            if key not in instances:
+                instances[key] = factory(*args, **kwargs)
+            return instances[key]
+    return get
+
+@shared
+def get_llm(model: str = DEFAULT_MODEL, temperature: float = None, max_output_tokens: int = None):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    logging.info(f"Creating LLM client for {model}")
+    kwargs = {}
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    if max_output_tokens is not None:
+        kwargs["max_output_tokens"] = max_output_tokens
+    return guard_llm(ChatGoogleGenerativeAI(
+        model=model,
+        api_key=os.getenv("GOOGLE_API_KEY"),
+        **kwargs
+    ))
+
+@shared
+def get_rate_limiter():
+    """One limiter for every LLM call in the process: LLM_RPM requests and LLM_TPM tokens per minute."""
+    from llm_guard import RateLimiter
+
+    return RateLimiter(float(os.getenv("LLM_RPM", "1000")), float(os.getenv("LLM_TPM", "4000000")))
+
+@shared
+def get_latency_tracker():
+    from llm_guard import LatencyTracker
+
+    return LatencyTracker()
+
+def guard_llm(llm):
+    """Put a chat model behind the shared rate limiter; LLM_HEDGE=0 turns off hedged requests."""
+    from llm_guard import GuardedChatModel
+
+    return GuardedChatModel(
+        inner=llm,
+        limiter=get_rate_limiter(),
+        latencies=get_latency_tracker(),
+        hedge=os.getenv("LLM_HEDGE", "1") == "1"
+    )
+
+@shared
+def get_model_router():
+    """Per-node model routing; LLM_ROUTES points at a JSON file overriding routes, LLM_ROUTING_LOG records calls."""
+    from model_router import ModelRouter, load_routes
+
+    return ModelRouter(load_routes(os.getenv("LLM_ROUTES")), log_path=os.getenv("LLM_ROUTING_LOG"))
+
+def get_node_llm(node: str, failures: int = 0, temperature: float = None, escalate: bool = False):
+    """LLM client routed for one graph node; failures is the count of consecutive failed renders,
+    escalate forces the node's stronger model."""
+    router = get_model_router()
+    decision = router.route(node, failures, escalate)
+    if temperature is not None:
+        decision["temperature"] = temperature
+    llm = get_llm(decision["model"], decision["temperature"], decision["max_output_tokens"])
+    return router.instrument(llm, decision)
+
+@shared
+def get_node_costs():
+    """Measured per-node latency, LLM tokens and render seconds, shared by every run in the process."""
+    from budget import NodeCosts
+
+    return NodeCosts()
+
+@shared
+def get_react_prompt():
+    from prompts import react_prompt
+    return react_prompt
+
+def build_agent_executor(llm, tools, **kwargs):
+    from langchain.agents import create_react_agent, AgentExecutor
+
+    agent = create_react_agent(llm, tools, get_react_prompt())
+    return AgentExecutor(agent=agent, tools=tools, **kwargs)
+
+def get_error_memory(db_path: str = None):
+    db_path = db_path or os.getenv("MANIM_ERRORS_DB", "manim_errors.db")
+    with _error_memories_lock:
+        if db_path not in _error_memories:
+            from error_memory import ErrorMemory
+
+            logging.info(f"Opening error memory at {db_path}")
+            _error_memories[db_path] = ErrorMemory(db_path)
+        return _error_memories[db_path]
+
+def close_error_memory() -> None:
+    with _error_memories_lock:
+        for error_memory in _error_memories.values():
+            error_memory.close()
+        _error_memories.clear()
+
+@shared
+def get_render_farm():
+    from render_farm import RenderFarm
+
+    agents = [url.strip() for url in os.getenv("RENDER_AGENTS", "").split(",") if url.strip()]
+    logging.info(f"Using render agents: {agents}")
+    return RenderFarm(agents)
+
+def get_renderer():
+    """Render callable (script_path, scene_name, priority): remote agents if RENDER_AGENTS is set."""
+    if os.getenv("RENDER_AGENTS"):
+        return get_render_farm().render
+    return get_render_scheduler().render
+
+@shared
+def get_render_scheduler():
+    """Local render slots for this process: RENDER_CPU_BUDGET (default all CPUs) / RENDER_CPUS per render.
+    The budget is per process; jobs.py divides it between its workers."""
+    from render_scheduler import RenderScheduler
+
+    cpu_budget = os.getenv("RENDER_CPU_BUDGET")
+    return RenderScheduler(
+        cpu_budget=float(cpu_budget) if cpu_budget else None,
+        cpus_per_render=float(os.getenv("RENDER_CPUS", "2")),
+        memory=os.getenv("RENDER_MEMORY", "2g"),
+        backend=os.getenv("MANIM_BACKEND", "docker"),
+        glyph_cache=get_glyph_cache(),
+        profile_dir=os.getenv("MANIM_PROFILE_DIR")
+    )
+
+@shared
+def get_glyph_cache():
+    """Shared tex/text SVG cache, enabled by pointing MANIM_GLYPH_CACHE at a directory."""
+    root = os.getenv("MANIM_GLYPH_CACHE")
+    if not root:
+        return None
+    from glyph_cache import GlyphCache, DEFAULT_MAX_BYTES
+
+    return GlyphCache(root, int(os.getenv("MANIM_GLYPH_CACHE_BYTES", DEFAULT_MAX_BYTES)))
+
+@shared
+def get_artifact_store():
+    """Content-addressed store for rendered videos under ARTIFACT_DIR, capped at ARTIFACT_QUOTA_BYTES."""
+    from artifact_store import ArtifactStore, DEFAULT_QUOTA_BYTES, DEFAULT_GRACE_SECONDS
+
+    return ArtifactStore(
+        os.getenv("ARTIFACT_DIR", "artifacts"),
+        int(os.getenv("ARTIFACT_QUOTA_BYTES", DEFAULT_QUOTA_BYTES)),
+        float(os.getenv("ARTIFACT_GRACE_SECONDS", DEFAULT_GRACE_SECONDS))
+    )
+
+@shared
+def get_semantic_cache():
+    """Cache of approved results for near-duplicate topics; SEMANTIC_CACHE=0 turns it off."""
+    if os.getenv("SEMANTIC_CACHE", "1") != "1":
+        return None
+    from semantic_cache import SemanticCache, DEFAULT_TTL_SECONDS, DEFAULT_THRESHOLD
+
+    return SemanticCache(
+        os.getenv("SEMANTIC_CACHE_DB", "semantic_cache.db"),
+        float(os.getenv("SEMANTIC_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+        float(os.getenv("SEMANTIC_CACHE_THRESHOLD", DEFAULT_THRESHOLD))
+    )
@@ -1,10 +1,12 @@
 import sqlite3
+import threading
 from typing import Dict, List
 import logging
 
 class ErrorMemory:
     def __init__(self, db_path: str = "manim_errors.db"):
-        self.conn = sqlite3.connect(db_path)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.lock = threading.Lock()
         self._init_db()
     
     def _init_db(self):
@@ -59,20 +61,21 @@ class ErrorMemory:
     def record_error(self, raw_error: str, faulty_code: str, llm) -> str:
         analysis = self.analyze_error(raw_error, faulty_code, llm)
         try:
-            self.conn.execute("""
-            INSERT OR REPLACE INTO error_knowledge 
-            (error_summary, solution, example_code, occurrences)
-            VALUES (?, ?, ?, COALESCE(
-                (SELECT occurrences FROM error_knowledge 
-                 WHERE error_summary = ? AND solution = ?), 0) + 1)
-            """, (
-                analysis["summary"],
-                analysis["solution"],
-                faulty_code[-200:],
-                analysis["summary"],
-                analysis["solution"]
-            ))
-            self.conn.commit()
+            with self.lock:
+                self.conn.execute("""
+                INSERT OR REPLACE INTO error_knowledge 
+                (error_summary, solution, example_code, occurrences)
+                VALUES (?, ?, ?, COALESCE(
+                    (SELECT occurrences FROM error_knowledge 
+                     WHERE error_summary = ? AND solution = ?), 0) + 1)
+                """, (
+                    analysis["summary"],
+                    analysis["solution"],
+                    faulty_code[-200:],
+                    analysis["summary"],
+                    analysis["solution"]
+                ))
+                self.conn.commit()
             return analysis["summary"]
         except sqlite3.Error as e:
             logging.error(f"Failed to record error: {str(e)}")
@@ -80,14 +83,15 @@ class ErrorMemory:
 
     def get_prevention_guide(self) -> List[Dict]:
         try:
-            cursor = self.conn.execute("""
-            SELECT error_summary, solution, occurrences 
-            FROM error_knowledge 
-            ORDER BY occurrences DESC
-            """)
+            with self.lock:
+                rows = self.conn.execute("""
+                SELECT error_summary, solution, occurrences 
+                FROM error_knowledge 
+                ORDER BY occurrences DESC
+                """).fetchall()
             return [
                 {"summary": row[0], "solution": row[1], "count": row[2]}
-                for row in cursor.fetchall()
+                for row in rows
             ]
         except sqlite3.Error as e:
             logging.error(f"Failed to get prevention guide: {str(e)}")
@@ -1,33 +1,23 @@
 import os
 from langchain.prompts import ChatPromptTemplate
-from langchain_anthropic import ChatAnthropic
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import StateGraph, END
+from functools import lru_cache
 from typing import Dict, List, Any
 from pydantic import BaseModel
 from langchain.agents import tool
 from dotenv import load_dotenv
-from langchain import hub
-from langchain.agents import create_react_agent, AgentExecutor
+from clients import get_node_llm, build_agent_executor
 from bs4 import BeautifulSoup
 import requests
 from links import MANIM_URLS
 
 load_dotenv()
 
-os.environ["JINA_API_KEY"] = os.getenv("JINA_API_KEY")
-os.environ["TAVILY_API_KEY"] = os.getenv("TAVILY_API_KEY")
-
 # llm = ChatAnthropic(
 #     model_name="claude-3-5-sonnet-20240620",
 #     api_key=os.getenv("CLAUDE_API_KEY"),
 # )
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-1.5-flash",
-    api_key=os.getenv("GOOGLE_API_KEY"),
-)
-
 @tool
 def url_content_extractor(urls: str = None):
     """Fetch and extract content from specified URLs using BeautifulSoup."""
@@ -50,13 +40,11 @@ def url_content_extractor(urls: str = None):
     
     return contents
 
-prompt_template = hub.pull("hwchase17/react")
-
 tools = [url_content_extractor]
 
-agent = create_react_agent(llm, tools, prompt_template)
-
-agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True);
+@lru_cache(maxsize=None)
+def get_agent_executor():
+    return build_agent_executor(get_node_llm("react_agent"), tools, verbose=True)
 
 class State(BaseModel):
     user_input: str = ""
@@ -189,7 +177,7 @@ refine_prompt = ChatPromptTemplate.from_messages(
 
 def identify_algorithm(state: Dict[str, Any]) -> Dict[str, Any]:
     print("Entering identify_algorithm node")
-    chain = identify_algorithm_prompt | llm
+    chain = identify_algorithm_prompt | get_node_llm("identify_algorithm")
     response = chain.invoke({"user_input": state["user_input"]})
     content = response.content
     if isinstance(content, list):
@@ -200,7 +188,7 @@ def identify_algorithm(state: Dict[str, Any]) -> Dict[str, Any]:
 
 def plan_explanation(state: Dict[str, Any]) -> Dict[str, Any]:
     print("Entering plan_explanation node")
-    chain = plan_explanation_prompt | llm
+    chain = plan_explanation_prompt | get_node_llm("plan_explanation")
     response = chain.invoke({"algorithm": state["algorithm"]})
     content = response.content
     if isinstance(content, list):
@@ -215,7 +203,7 @@ def plan_explanation(state: Dict[str, Any]) -> Dict[str, Any]:
 
 def process_step(state: Dict[str, Any]) -> Dict[str, Any]:
     print(f"Entering process_step node. Current step index: {state['current_step_index']}")
-    chain = process_step_prompt | llm
+    chain = process_step_prompt | get_node_llm("process_step")
     current_step = state["steps"][state["current_step_index"]]
     response = chain.invoke({"algorithm": state["algorithm"], "current_step": current_step})
     content = response.content
@@ -242,7 +230,7 @@ def refine_step(state: Dict[str, Any]) -> Dict[str, Any]:
     combined_input = f"{system_message}\n\nHuman request: {human_message}"
     
     agent_input = {"input": combined_input}
-    response = agent_executor.invoke(agent_input)
+    response = get_agent_executor().invoke(agent_input)
     
     refined_code = response["output"]
     
@@ -1,48 +1,38 @@
 import os
+import math
+import uuid
 import requests
-from langchain import hub
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from links2 import MANIM_MODULES
+from utils import divide_scenes, read_module_docs, extract_code_block, extract_scene_name, rendered_video_path, concat_videos
 from langchain.agents import tool
+from functools import lru_cache
 from typing import List, Dict, Any
 from langgraph.graph import StateGraph, END
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.agents import create_react_agent, AgentExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from clients import get_node_llm, build_agent_executor, get_renderer, get_artifact_store
+from render_scheduler import PRIORITY_FIRST
+from workspace import render_workspace
+from hls import HlsPublisher, DEFAULT_TARGET_DURATION
+from scene_merger import merge_scenes, SceneMergeError
+from script_optimizer import scene_seconds
 
 load_dotenv()
 
-os.environ["JINA_API_KEY"] = os.getenv("JINA_API_KEY")
-
-llm = ChatGoogleGenerativeAI(
-    model="gemini-1.5-flash",
-    api_key=os.getenv("GOOGLE_API_KEY")
-)
-
-prompt_template = hub.pull("hwchase17/react")
-
 @tool
 def module_documentation_extractor(modules: str = None):
     """Returns the documentation for the specified Modules."""
     if not modules:
         return []
-    
-    content = []
-    for module in modules.split(","):
-        module = module.strip()
-        path = f"dataset/{module}.txt"
-        try:
-            with open(path, 'r', encoding='utf-8') as f:
-                content.append(f.read())
-        except Exception as e:
-            content.append(f"Error reading {module}: {str(e)}")
-    return content
+    return read_module_docs(modules)
 
 tools = [module_documentation_extractor]
 
-agent = create_react_agent(llm, tools, prompt_template)
-agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True, handle_parsing_errors=True)
+@lru_cache(maxsize=None)
+def get_agent_executor():
+    return build_agent_executor(get_node_llm("react_agent"), tools, verbose=True, handle_parsing_errors=True)
 
 class State(BaseModel):
     user_input: str = ""
@@ -53,6 +43,10 @@ class State(BaseModel):
     finalized_code_list: List[str] = []  
     final_code: str = "" 
     current_index: int = 0  
+    scene_artifacts: List[str] = []
+    render_errors: List[str] = []
+    artifact_id: str = ""
+    stream_id: str = ""
 
 
 text_script_prompt = ChatPromptTemplate.from_messages([
@@ -182,32 +176,24 @@ script_integration_prompt = ChatPromptTemplate.from_messages([
 
 def text_script_node(state: Dict[str, Any]) -> Dict[str, Any]:
     print("Entering text_script_node")
-    chain = text_script_prompt | llm
+    chain = text_script_prompt | get_node_llm("text_script")
     state["text_script"] = chain.invoke({"user_input": state["user_input"]}).content.strip()
     print(f"Text script generated: {state['text_script']}")
     return state
 
 def scene_division_node(state: Dict[str, Any]) -> Dict[str, Any]:
     print("Entering scene_division_node")
-    chain = scene_division_prompt | llm
+    chain = scene_division_prompt | get_node_llm("scene_division")
     content = chain.invoke({"text_script": state["text_script"]}).content.strip()
     if isinstance(content, list):
         content = " ".join(str(item) for item in content)
-    scene_titles = [title.strip() for title in content.split("\n") if title.strip()]
-    if not scene_titles:
-        scene_titles = ["Default Scene"]
-    script_lines = state["text_script"].split(". ")
-    lines_per_scene = max(1, len(script_lines) // len(scene_titles))
-    state["scenes"] = [
-        {"title": title, "content": ". ".join(script_lines[i * lines_per_scene:(i + 1) * lines_per_scene]).strip()}
-        for i, title in enumerate(scene_titles)
-    ]
+    state["scenes"] = divide_scenes(state["text_script"], content)
     print(f"Scenes divided: {state['scenes']}")
     return state
 
 def scene_description_node(state: Dict[str, Any]) -> Dict[str, Any]:
     print(f"Entering scene_description_node. Current index: {state['current_index']}")
-    chain = scene_description_prompt | llm
+    chain = scene_description_prompt | get_node_llm("scene_description")
     current_scene = state["scenes"][state["current_index"]]
     description = chain.invoke({
         "scene_title": current_scene["title"],
@@ -223,7 +209,7 @@ def scene_description_node(state: Dict[str, Any]) -> Dict[str, Any]:
 
 def process_step_node(state: Dict[str, Any]) -> Dict[str, Any]:
     print(f"Entering process_step_node. Current index: {state['current_index']}")
-    chain = process_step_prompt | llm
+    chain = process_step_prompt | get_node_llm("process_step")
     description = state["scene_descriptions"][state["current_index"]]
     code = chain.invoke({"scene_title": state["scenes"][state["current_index"]]["title"], "scene_description": description}).content.strip()
     if len(state["scene_codes"]) <= state["current_index"]:
@@ -247,7 +233,7 @@ def refine_step_node(state: Dict[str, Any]) -> Dict[str, Any]:
     combined_input = f"{system_message}\n\nHuman request: {human_message}"
     
     agent_input = {"input": combined_input}
-    response = agent_executor.invoke(agent_input)
+    response = get_agent_executor().invoke(agent_input)
     
     refined_code = response["output"]
     if len(state["finalized_code_list"]) <= state["current_index"]:
@@ -258,9 +244,104 @@ def refine_step_node(state: Dict[str, Any]) -> Dict[str, Any]:
     state["current_index"] += 1
     return state
 
+def scene_script(refined_code: str) -> str:
+    code = extract_code_block(refined_code)
+    return "\n".join(line for line in code.splitlines() if not line.startswith("Referenced modules"))
+
+def render_scene(run_id: str, index: int, code: str, user_input: str) -> tuple[str, str]:
+    """Render one scene in its own workspace and store the video; returns (artifact_id, error)."""
+    with render_workspace(run_id, index + 1) as workdir:
+        script_path = str(workdir / f"scene{index}.py")
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write(code)
+        scene_name = extract_scene_name(code)
+        success, result = get_renderer()(script_path, scene_name, priority=PRIORITY_FIRST)
+        video = rendered_video_path(script_path, scene_name)
+        if not success or not os.path.exists(video):
+            return "", result if not success else "Rendered video not found"
+        return get_artifact_store().put(video, kind="scene", topic=user_input, script=code), ""
+
+def render_scenes_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    print(f"Entering render_scenes_node. Rendering {len(state['finalized_code_list'])} scenes in parallel")
+    run_id = uuid.uuid4().hex[:12]
+    backend = os.getenv("MANIM_BACKEND", "docker")
+    codes = [scene_script(code) for code in state["finalized_code_list"]]
+    estimates = [scene_seconds(code) for code in codes]
+    target = max([DEFAULT_TARGET_DURATION] + [math.ceil(seconds) for seconds in estimates if seconds])
+    publisher = HlsPublisher(run_id, backend=backend, target_duration=target)
+    state["stream_id"] = run_id
+    print(f"Streaming finished scenes to {publisher.playlist}")
+
+    store = get_artifact_store()
+    results = [("", "Not rendered")] * len(codes)
+    pinned: List[str] = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(codes))) as pool:
+            futures = {
+                pool.submit(render_scene, run_id, i, code, state["user_input"]): i
+                for i, code in enumerate(codes)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    # One broken scene must not throw away every other scene's render.
+                    print(f"Scene {i} failed to render: {type(e).__name__}: {e}")
+                    results[i] = ("", f"{type(e).__name__}: {e}")
+                if results[i][0]:
+                    store.pin(results[i][0])
+                    pinned.append(results[i][0])
+                path = store.path(results[i][0]) if results[i][0] else None
+                if path:
+                    publisher.publish(i, path)
+                else:
+                    publisher.skip(i)
+        publisher.finish()
+        state["scene_artifacts"] = [artifact_id for artifact_id, _ in results]
+        state["render_errors"] = [error for _, error in results]
+        if not codes or any(state["render_errors"]):
+            print(f"Scene rendering failed; skipping concatenation: {state['render_errors']}")
+            return state
+
+        paths = [store.path(artifact_id) for artifact_id in state["scene_artifacts"]]
+        for i in [i for i, path in enumerate(paths) if path is None]:
+            # Only possible if another process evicted it; render the scene again once.
+            print(f"Scene {i} video {state['scene_artifacts'][i]} is no longer in the store; re-rendering")
+            try:
+                artifact_id, error = render_scene(run_id, i, codes[i], state["user_input"])
+            except Exception as e:
+                artifact_id, error = "", f"{type(e).__name__}: {e}"
+            if artifact_id:
+                store.pin(artifact_id)
+                pinned.append(artifact_id)
+                state["scene_artifacts"][i] = artifact_id
+                paths[i] = store.path(artifact_id)
+            if paths[i] is None:
+                state["render_errors"][i] = error or f"Scene {i} video was evicted from the artifact store"
+        if any(path is None for path in paths):
+            print(f"Scene videos missing; skipping concatenation: {state['render_errors']}")
+            return state
+
+        with render_workspace(run_id, 0) as workdir:
+            success, result = concat_videos(paths, str(workdir / "final.mp4"), backend=backend)
+            if success:
+                state["artifact_id"] = store.put(result, topic=state["user_input"], script="\n\n".join(codes))
+        print(f"Final video: {state['artifact_id'] or result}")
+        return state
+    finally:
+        for artifact_id in pinned:
+            store.unpin(artifact_id)
+
 def script_integration_node(state: Dict[str, Any]) -> Dict[str, Any]:
     print("Entering script_integration_node")
-    chain = script_integration_prompt | llm
+    try:
+        state["final_code"] = merge_scenes([scene_script(code) for code in state["finalized_code_list"]])
+        print("Final code merged deterministically.")
+        return state
+    except SceneMergeError as e:
+        print(f"Deterministic merge failed ({e}); falling back to the LLM")
+    chain = script_integration_prompt | get_node_llm("script_integration")
     state["final_code"] = chain.invoke({"finalized_code_list": state["finalized_code_list"]}).content.strip()
     print(f"Final code integrated.")
     return state
@@ -269,8 +350,8 @@ def should_continue(state: Dict[str, Any]) -> str:
     if state["current_index"] < len(state["scenes"]):
         print("Should continue: scene_description")
         return "scene_description"
-    print("Should continue: script_integration")
-    return "script_integration"
+    print("Should continue: render_scenes")
+    return "render_scenes"
 
 
 workflow = StateGraph(dict)
@@ -279,6 +360,7 @@ workflow.add_node("scene_division", scene_division_node)
 workflow.add_node("scene_description", scene_description_node)
 workflow.add_node("process_step", process_step_node)
 workflow.add_node("refine", refine_step_node)
+workflow.add_node("render_scenes", render_scenes_node)
 workflow.add_node("script_integration", script_integration_node)
 
 workflow.set_entry_point("text_script")
@@ -289,7 +371,8 @@ workflow.add_edge("process_step", "refine")
 workflow.add_conditional_edges(
     "refine", 
     should_continue, 
-    {"scene_description": "scene_description", "script_integration": "script_integration"})
+    {"scene_description": "scene_description", "render_scenes": "render_scenes"})
+workflow.add_edge("render_scenes", "script_integration")
 workflow.add_edge("script_integration", END)
 
 
@@ -304,5 +387,6 @@ if __name__ == "__main__":
     try:
         result = run_workflow("Explain linear regression")
         print("Final Code:\n", result["final_code"])
+        print("Video artifact:", result["artifact_id"] or result["render_errors"])
     except Exception as e:
         print(f"An error occurred: {str(e)}")
\ No newline at end of file
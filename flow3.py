@@ -2,22 +2,18 @@ import os
 import re
 import logging
 import subprocess
-from pathlib import Path
 from dotenv import load_dotenv
 from typing import Dict, Any, TypedDict, Literal
 from langgraph.graph import StateGraph, END
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+from clients import get_node_llm, get_artifact_store
+from workspace import render_workspace
+from utils import rendered_video_path
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-1.5-flash",
-    api_key=os.getenv("GOOGLE_API_KEY")
-)
-
 class AgentState(TypedDict):
     user_input: str
     reasoning: str
@@ -29,6 +25,7 @@ class AgentState(TypedDict):
     error_fixes: str
     final_code: str
     last_error: str
+    artifact_id: str
     attempts: int
     status: Literal["initial", "error", "success", "approved"]
 
@@ -147,14 +144,14 @@ def run_manim_script(script_path: str, scene_name: str) -> tuple[bool, str]:
 
 def think_node(state: AgentState) -> Dict[str, str]:
     logging.info("Starting think_node")
-    chain = think_prompt | llm
+    chain = think_prompt | get_node_llm("think")
     reasoning = chain.invoke({"user_input": state["user_input"]}).content.strip()
     logging.info(f"Generated reasoning: {reasoning}...")
     return {"reasoning": reasoning}
 
 def plan_node(state: AgentState) -> Dict[str, str]:
     logging.info("Starting plan_node")
-    chain = plan_prompt | llm
+    chain = plan_prompt | get_node_llm("plan")
     steps = chain.invoke({
         "user_input": state["user_input"],
         "reasoning": state["reasoning"]
@@ -167,7 +164,7 @@ def action_node(state: AgentState) -> Dict[str, str]:
     logging.info(f"Using error fixes: {state.get('error_fixes', 'None')}")
     logging.info(f"Using improvements: {state.get('improvement_suggestions', 'None')}")
     
-    chain = action_prompt | llm
+    chain = action_prompt | get_node_llm("action")
     script = chain.invoke({
         "user_input": state["user_input"],
         "steps": state["steps"],
@@ -180,22 +177,30 @@ def action_node(state: AgentState) -> Dict[str, str]:
 
 def execute_node(state: AgentState) -> Dict[str, str]:
     logging.info("Starting execute_node")
-    script_path = str(Path.cwd() / "mymanim.py")
-    
-    logging.info(f"Writing script to {script_path}")
-    with open(script_path, "w", encoding="utf-8") as f:
-        f.write(state["script_content"])
-    
-    scene_name = extract_scene_name(state["script_content"])
-    logging.info(f"Extracted scene name: {scene_name}")
-    
-    success, result = run_manim_script(script_path, scene_name)
+    with render_workspace("flow3", state["attempts"] + 1) as workdir:
+        script_path = str(workdir / "mymanim.py")
+
+        logging.info(f"Writing script to {script_path}")
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write(state["script_content"])
+
+        scene_name = extract_scene_name(state["script_content"])
+        logging.info(f"Extracted scene name: {scene_name}")
+
+        success, result = run_manim_script(script_path, scene_name)
+        video = rendered_video_path(script_path, scene_name)
+        artifact_id = ""
+        if success and os.path.exists(video):
+            # The workspace is deleted on exit, so the video has to move to the artifact store first.
+            artifact_id = get_artifact_store().put(video, topic=state["user_input"], script=state["script_content"])
+            logging.info(f"Stored video artifact {artifact_id}")
     
     if success:
         logging.info("Execution completed successfully")
         return {
             "execution_result": result,
             "last_error": "",
+            "artifact_id": artifact_id,
             "status": "success"
         }
     else:
@@ -210,7 +215,7 @@ def observe_node(state: AgentState) -> Dict[str, str]:
     logging.info("Starting observe_node")
     logging.info(f"Current status: {state['status']}")
     
-    chain = observe_prompt | llm
+    chain = observe_prompt | get_node_llm("observe")
     analysis = chain.invoke({
         "user_input": state["user_input"],
         "status": state["status"],
@@ -236,6 +241,7 @@ def observe_node(state: AgentState) -> Dict[str, str]:
         logging.info("Observer approved the script")
         return {
             "final_code": state["script_content"],
+            "artifact_id": state.get("artifact_id", ""),
             "status": "approved"
         }
     
@@ -301,6 +307,7 @@ def run_workflow(user_input: str) -> Dict[str, Any]:
         error_fixes="",
         final_code="",
         last_error="",
+        artifact_id="",
         attempts=0,
         status="initial"
     )
@@ -319,6 +326,7 @@ def run_workflow(user_input: str) -> Dict[str, Any]:
         "final_code": final_state.get("final_code", ""),
         "status": final_state.get("status", "unknown"),
         "attempts": final_state.get("attempts", 0),
+        "artifact_id": final_state.get("artifact_id", ""),
         "feedback": final_state.get("observer_feedback", "")
     }
 
@@ -330,6 +338,8 @@ if __name__ == "__main__":
         print("\n=== Workflow Results ===")
         print(f"Attempts: {result['attempts']}")
         print(f"Final Status: {result['status']}")
+        if result["artifact_id"]:
+            print(f"Video: {get_artifact_store().path(result['artifact_id'])}")
         
         if result["final_code"]:
             print("\nFinal Script:")
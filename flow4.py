@@ -1,14 +1,28 @@
 import os
+import ast
+import time
 import logging
+import threading
+import contextvars
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from error_memory import ErrorMemory
 from langgraph.graph import StateGraph, END
-from typing import Dict, Any, TypedDict, Literal
-from langchain_google_genai import ChatGoogleGenerativeAI
-from utils import extract_code_block, extract_scene_name, run_manim_script
-from prompts import think_prompt, plan_prompt, action_prompt, observe_prompt
+from typing import Dict, Any, TypedDict, Literal, Union, List, Tuple, Annotated, Optional
+from utils import extract_code_block, extract_scene_name, rendered_video_path, QUALITY_DIRS
+from prompts import think_prompt, plan_prompt, action_prompt, edit_prompt, observe_prompt, review_prompt
 from langgraph.checkpoint.memory import MemorySaver
+from clients import get_node_llm, get_error_memory, close_error_memory, get_renderer, get_artifact_store, get_semantic_cache, get_node_costs
+from render_scheduler import PRIORITY_FIX, PRIORITY_FIRST, PRIORITY_SPECULATIVE
+from workspace import render_workspace
+from script_optimizer import optimize_script
+from singleflight import SingleFlight, flight_key
+from semantic_cache import DEFAULT_WARM_THRESHOLD
+from progress import script_fingerprint, error_fingerprint, find_attempt, assess_progress
+from patching import apply_patch
+from stream_validator import ScriptStreamValidator
+from budget import add_usage, charge, current_usage, make_budget, metered, plan_next
+from langchain_core.runnables import RunnableConfig
 from colorama import init, Fore, Style
 
 init(autoreset=True)
@@ -19,40 +33,74 @@ load_dotenv()
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-error_memory = ErrorMemory()
-
 def cleanup():
-    error_memory.close()
-
-llm = ChatGoogleGenerativeAI(
-    model="gemini-1.5-flash",
-    api_key=os.getenv("GOOGLE_API_KEY")
-)
+    close_error_memory()
 
 class AgentState(TypedDict):
     user_input: str
     reasoning: str
     steps: str
     script_content: str
+    candidates: List[str]
     execution_result: str
     observer_feedback: str
+    quality_review: str
+    reviewed_script: str
     improvement_suggestions: str
     error_fixes: str
+    render_failures: int
     final_code: str
     last_error: str
+    artifact_id: str
+    use_cache: bool
+    warm_start: bool
+    warm_script: str
+    cache_hit: int
     attempts: int
-    status: Literal["initial", "error", "success", "approved"]
+    attempt_history: List[Dict[str, Any]]
+    stuck: int
+    stop_reason: str
+    budget: Dict[str, Any]
+    spent: Annotated[Dict[str, float], add_usage]
+    render_quality: str
+    status: Literal["initial", "error", "success", "approved", "stopped"]
+
+def cache_node(state: AgentState) -> Dict[str, Any]:
+    """Serve an approved result for a near-duplicate topic, or with warm_start seed the first script from one."""
+    cache = get_semantic_cache()
+    if cache is None or not state.get("use_cache", True):
+        return {"cache_hit": 0}
+    hit = cache.lookup(state["user_input"], WARM_THRESHOLD if state.get("warm_start") else None)
+    if hit and hit["artifact_id"] and get_artifact_store().get(hit["artifact_id"]) is None:
+        logging.info(f"Cached video {hit['artifact_id']} was evicted; dropping cache entry {hit['id']}")
+        cache.invalidate(entry_id=hit["id"])
+        hit = None
+    if hit is None:
+        return {"cache_hit": 0}
+    if hit["similarity"] >= cache.threshold:
+        logging.info(Fore.GREEN + f"Semantic cache hit ({hit['similarity']:.2f}): '{hit['topic']}'")
+        return {
+            "final_code": hit["final_code"],
+            "artifact_id": hit["artifact_id"],
+            "cache_hit": hit["id"],
+            "status": "approved"
+        }
+    logging.info(Fore.GREEN + f"Warm start from '{hit['topic']}' ({hit['similarity']:.2f})")
+    return {"warm_script": hit["final_code"], "cache_hit": hit["id"]}
+
+def route_from_cache(state: AgentState) -> str:
+    return "end" if state.get("status") == "approved" else "think"
 
 def think_node(state: AgentState) -> Dict[str, str]:
     logging.info(Fore.GREEN + "Starting think_node")
-    chain = think_prompt | llm
+    chain = think_prompt | get_node_llm("think")
     reasoning = chain.invoke({"user_input": state["user_input"]}).content.strip()
     logging.info(f"Generated reasoning: {reasoning}...")
     return {"reasoning": reasoning}
 
 def plan_node(state: AgentState) -> Dict[str, str]:
     logging.info(Fore.GREEN + "Starting plan_node")
-    chain = plan_prompt | llm
+    chain = plan_prompt | get_node_llm("plan")
     steps = chain.invoke({
         "user_input": state["user_input"],
         "reasoning": state["reasoning"]
@@ -65,115 +113,410 @@ def action_node(state: AgentState) -> Dict[str, str]:
 
     prevention_guide = "\n".join(
         f"• {e['summary']} (Fix: {e['solution']})"
-        for e in error_memory.get_prevention_guide()
+        for e in get_error_memory().get_prevention_guide()
     )
 
     print("\n\n**Prevention Guide: ", prevention_guide)
 
-    chain = action_prompt | llm
-    script = chain.invoke({
+    inputs = {
         "user_input": state["user_input"],
         "steps": state["steps"],
         "error_fixes": state.get("error_fixes", "No fixes needed"),
         "improvement_suggestions": state.get("improvement_suggestions", "No improvements suggested"),
         "prevention_guide": prevention_guide
-    }).content.strip()
-
-    script_content = extract_code_block(script)
-    logging.info(f"Generated script (length: {len(script_content)} chars)")
-    return {"script_content": script_content}
+    }
 
-def execute_node(state: AgentState) -> Dict[str, str]:
+    if state.get("warm_script") and state.get("attempts", 0) == 0 and state.get("status") == "initial":
+        logging.info("Using the cached script as the first draft")
+        return {"script_content": state["warm_script"], "candidates": []}
+
+    failures = state.get("render_failures", 0)
+    escalate = state.get("stuck", 0) > 0
+    k = speculative_candidates()
+    if k == 1 and can_edit(state, escalate):
+        script_content = edit_script(state, inputs, failures)
+        if script_content:
+            return {"script_content": script_content, "candidates": []}
+    if k == 1:
+        script_content = generate_script(inputs, failures, escalate=escalate)
+        logging.info(f"Generated script (length: {len(script_content)} chars)")
+        return {"script_content": script_content, "candidates": []}
+
+    scripts, errors = [], []
+    with ThreadPoolExecutor(max_workers=k) as pool:
+        futures = [
+            pool.submit(contextvars.copy_context().run, generate_script, inputs, failures,
+                        CANDIDATE_TEMPERATURES[i % len(CANDIDATE_TEMPERATURES)], escalate)
+            for i in range(k)
+        ]
+        for future in futures:
+            try:
+                scripts.append(future.result())
+            except Exception as e:
+                errors.append(e)
+    if not scripts:
+        raise errors[0]
+    candidates = list(dict.fromkeys(s for s in scripts if is_valid_candidate(s))) or scripts[:1]
+    logging.info(f"Generated {len(candidates)} distinct valid candidates from {k} requests")
+    return {"script_content": candidates[0], "candidates": candidates}
+
+WARM_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_WARM_THRESHOLD", DEFAULT_WARM_THRESHOLD))
+
+MAX_STUCK = 2
+
+CANDIDATE_TEMPERATURES = [None, 0.9, 0.5, 1.2, 0.7]
+
+STREAM_RETRIES = 2
+
+def speculative_candidates() -> int:
+    """SPECULATIVE_CANDIDATES=k (k > 1) generates k scripts per action and races their renders."""
+    return max(1, int(os.getenv("SPECULATIVE_CANDIDATES", "1")))
+
+def generate_script(inputs: Dict[str, str], failures: int = 0, temperature: float = None,
+                    escalate: bool = False) -> str:
+    llm = get_node_llm("action", failures, temperature, escalate)
+    if os.getenv("STREAM_VALIDATION", "1") == "1":
+        script_content = stream_script(llm, inputs)
+    else:
+        script_content = extract_code_block((action_prompt | llm).invoke(inputs).content.strip())
+    if os.getenv("MANIM_OPTIMIZE", "1") == "1":
+        script_content, report = optimize_script(script_content)
+        logging.info(f"Script optimizer: {report}")
+    return script_content
+
+def stream_script(llm, inputs: Dict[str, str]) -> str:
+    """Stream the script and validate it as it arrives. A fatal problem closes the stream and
+    re-prompts with the reason, up to STREAM_RETRIES times; the last try runs to the end and its
+    problems are left to the render and observer, as without streaming."""
+    error_fixes = inputs["error_fixes"]
+    for attempt in range(STREAM_RETRIES + 1):
+        validator = ScriptStreamValidator()
+        problem = None
+        stream = (action_prompt | llm).stream({**inputs, "error_fixes": error_fixes})
+        try:
+            for chunk in stream:
+                # Keep feeding after a problem on the last try so the whole script reaches the render.
+                found = validator.feed(chunk.content if isinstance(chunk.content, str) else "")
+                problem = problem or found
+                if problem and attempt < STREAM_RETRIES:
+                    break
+        finally:
+            stream.close()
+        if problem is None:
+            script, problem = validator.finish()
+            if script is not None:
+                return script
+        if attempt == STREAM_RETRIES:
+            break
+        logging.warning(Fore.YELLOW + f"Stopped script generation after {len(validator.text)} chars: it {problem}")
+        error_fixes = (f"{inputs['error_fixes']}\nThe previous draft was rejected because it {problem}. "
+                       f"Do not repeat that.")
+    logging.warning(Fore.YELLOW + f"Script still {problem}; sending it to render anyway")
+    return extract_code_block(validator.text.strip())
+
+def can_edit(state: AgentState, escalate: bool) -> bool:
+    """SCRIPT_EDITS=1 (default) patches the previous script instead of regenerating it, unless the
+    loop is stuck and needs a materially different script."""
+    return (os.getenv("SCRIPT_EDITS", "1") == "1" and state.get("attempts", 0) > 0
+            and bool(state.get("script_content")) and not escalate)
+
+def edit_script(state: AgentState, inputs: Dict[str, str], failures: int = 0) -> Optional[str]:
+    """Ask for SEARCH/REPLACE edits against the current script; None when they do not apply cleanly."""
+    chain = edit_prompt | get_node_llm("edit", failures)
+    response = chain.invoke({**inputs, "script_content": state["script_content"]}).content
+    script, report = apply_patch(state["script_content"], response)
+    if script is None or script.strip() == state["script_content"].strip() or not is_valid_candidate(script):
+        reason = report if script is None else "no change" if script.strip() == state["script_content"].strip() \
+            else "result does not parse"
+        logging.warning(Fore.YELLOW + f"Edit failed ({reason}); regenerating the full script")
+        return None
+    logging.info(f"Applied {report}: {len(response)} chars generated for a {len(script)}-char script")
+    if os.getenv("MANIM_OPTIMIZE", "1") == "1":
+        script, opt_report = optimize_script(script)
+        logging.info(f"Script optimizer: {opt_report}")
+    return script
+
+def is_valid_candidate(script: str) -> bool:
+    try:
+        ast.parse(script)
+    except SyntaxError:
+        return False
+    return extract_scene_name(script) != "DefaultScene"
+
+def store_render(state: AgentState, script: str, script_path: str, scene_name: str) -> str:
+    """Move the rendered video and its partial segments into the artifact store before the workspace goes."""
+    quality_dir = QUALITY_DIRS[state.get("render_quality", "low")]
+    video = Path(rendered_video_path(script_path, scene_name, quality_dir))
+    if not video.exists():
+        return ""
+    store = get_artifact_store()
+    segments = store.put_segments(
+        str(video.parent / "partial_movie_files" / scene_name),
+        topic=state["user_input"], script=script
+    )
+    artifact_id = store.put(str(video), topic=state["user_input"], script=script, quality=quality_dir)
+    logging.info(f"Stored video artifact {artifact_id} ({len(segments)} segments)")
+    return artifact_id
+
+def render_script(state: AgentState, script: str, run_id: Union[int, str], attempt: int,
+                  priority: int, cancel: threading.Event = None) -> Tuple[bool, str, str]:
+    with render_workspace(run_id, attempt) as workdir:
+        script_path = str(workdir / "mymanim.py")
+
+        logging.info(f"Writing script to {script_path}")
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write(script)
+
+        scene_name = extract_scene_name(script)
+        logging.info(f"Extracted scene name: {scene_name}")
+
+        started = time.perf_counter()
+        success, result = get_renderer()(script_path, scene_name, priority=priority, cancel=cancel,
+                                          quality=state.get("render_quality", "low"))
+        charge(render_seconds=time.perf_counter() - started)
+        artifact_id = store_render(state, script, script_path, scene_name) if success else ""
+    return success, result, artifact_id
+
+def race_candidates(state: AgentState, candidates: List[str], run_id: Union[int, str], attempt: int,
+                    priority: int) -> Tuple[bool, str, str, str]:
+    """Render all candidates at once; the first clean render wins and the others are cancelled."""
+    cancel = threading.Event()
+    errors: Dict[int, str] = {}
+    pool = ThreadPoolExecutor(max_workers=len(candidates))
+    try:
+        futures = {
+            pool.submit(contextvars.copy_context().run, render_script, state, script, f"{run_id}-c{i}", attempt,
+                        priority if i == 0 else PRIORITY_SPECULATIVE, cancel): i
+            for i, script in enumerate(candidates)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                success, result, artifact_id = future.result()
+            except Exception as e:
+                logging.error(Fore.RED + f"Candidate {i + 1}/{len(candidates)} failed to render: {str(e)}")
+                errors[i] = f"Render failed: {type(e).__name__}: {e}"
+                continue
+            if success:
+                cancel.set()
+                logging.info(Fore.GREEN + f"Candidate {i + 1}/{len(candidates)} rendered first; cancelling the rest")
+                return True, result, artifact_id, candidates[i]
+            errors[i] = result
+    finally:
+        pool.shutdown(wait=False)
+    first = min(errors)
+    return False, errors[first], "", candidates[first]
+
+def execute_node(state: AgentState, config: RunnableConfig) -> Dict[str, str]:
     logging.info(Fore.GREEN + "Starting execute_node")
-    script_path = str(Path.cwd() / "mymanim.py")
-
-    logging.info(f"Writing script to {script_path}")
-    with open(script_path, "w", encoding="utf-8") as f:
-        f.write(state["script_content"])
-
-    scene_name = extract_scene_name(state["script_content"])
-    logging.info(f"Extracted scene name: {scene_name}")
-
-    success, result = run_manim_script(script_path, scene_name)
+    run_id = config["configurable"].get("thread_id", "run")
+    attempt = state.get("attempts", 0) + 1
+
+    priority = PRIORITY_FIX if attempt > 1 else PRIORITY_FIRST
+    history = state.get("attempt_history", [])
+    candidates = state.get("candidates") or [state["script_content"]]
+    untried = [c for c in candidates if not find_attempt(history, script_fingerprint(c))]
+    candidates = untried or candidates[:1]
+    known = find_attempt(history, script_fingerprint(candidates[0])) if len(candidates) == 1 else None
+    if known:
+        logging.warning(Fore.YELLOW + f"Script is identical to attempt {known['attempt']}; reusing its outcome instead of rendering")
+        script = candidates[0]
+        success, artifact_id = known["status"] != "error", known["artifact_id"]
+        result = known["last_error"] if not success else f"Success (reused from attempt {known['attempt']})"
+    elif len(candidates) > 1:
+        success, result, artifact_id, script = race_candidates(state, candidates, run_id, attempt, priority)
+    else:
+        script = candidates[0]
+        success, result, artifact_id = render_script(state, script, run_id, attempt, priority)
 
     if success:
         logging.info(Fore.GREEN + "Execution completed successfully")
         return {
+            "script_content": script,
+            "candidates": [],
             "execution_result": result,
+            "render_failures": 0,
             "last_error": "",
+            "artifact_id": artifact_id,
             "status": "success"
         }
     else:
         logging.error(Fore.RED + f"Execution failed: {result}")
         return {
+            "script_content": script,
+            "candidates": [],
             "execution_result": result,
+            "render_failures": state.get("render_failures", 0) + 1,
             "last_error": result,
             "status": "error"
         }
 
-def observe_node(state: AgentState) -> Dict[str, str]:
+def review_node(state: AgentState) -> Dict[str, str]:
+    """Educational-quality review. It only needs the script, so it runs while execute renders."""
+    logging.info(Fore.GREEN + "Starting review_node")
+    known = find_attempt(state.get("attempt_history", []), script_fingerprint(state["script_content"]))
+    if known and known["review"]:
+        logging.info(f"Reusing the review of identical attempt {known['attempt']}")
+        return {"quality_review": known["review"], "reviewed_script": state["script_content"]}
+    return {"quality_review": review_script(state), "reviewed_script": state["script_content"]}
+
+def review_script(state: AgentState) -> str:
+    chain = review_prompt | get_node_llm("review", state.get("render_failures", 0))
+    return chain.invoke({
+        "user_input": state["user_input"],
+        "script_content": state["script_content"]
+    }).content.strip()
+
+def observe_node(state: AgentState, config: RunnableConfig) -> Dict[str, str]:
     current_attempt = state.get("attempts", 0) + 1
     logging.info(f"Attempt {current_attempt}. Status: {state['status']}")
 
-    if state["status"] == "error":
-        try:
-            error_context = state["last_error"].strip().split('\n')[-15:]
-            core_error = next(
-                (line for line in reversed(error_context)
-                 if any(e in line for e in ["Error:", "Exception:", "Failed"])),
-                state["last_error"]
-            )
-
-            error_summary = error_memory.record_error(
-                raw_error='\n'.join(error_context),
-                faulty_code=state["script_content"],
-                llm=llm
-            )
-            logging.info(f"Recorded error: {error_summary}")
-
-            prevention_guide = error_memory.get_prevention_guide()
-            state["error_fixes"] = next(
-                (e["solution"] for e in prevention_guide
-                 if core_error in e["summary"]),
-                "No specific fix found"
-            )
-        except Exception as e:
-            logging.error(Fore.RED + f"Error recording failed: {str(e)}")
-            state["error_fixes"] = "REPLACE: (see Manim documentation)"
-
-    chain = observe_prompt | llm
+    review = state.get("quality_review", "")
+    if state.get("reviewed_script") != state["script_content"]:
+        logging.info("Rendered script differs from the reviewed one; reviewing it now")
+        review = review_script(state)
+    improvements = "No improvements suggested"
+    if "IMPROVEMENTS:" in review:
+        improvements = review.split("IMPROVEMENTS:")[1].strip()
+
+    if state["status"] != "error":
+        if review == "APPROVED":
+            update = {
+                "final_code": state["script_content"],
+                "status": "approved",
+                "attempts": current_attempt
+            }
+            if state.get("render_quality") == "draft":
+                update.update(rerender_draft(state, config["configurable"].get("thread_id", "run"), current_attempt))
+            cache = get_semantic_cache()
+            if cache is not None and update.get("render_quality", state.get("render_quality")) != "draft":
+                cache.put(state["user_input"], state["script_content"],
+                          update.get("artifact_id", state.get("artifact_id", "")))
+            return track_progress(state, review, update)
+        return track_progress(state, review, {
+            "error_fixes": "No fixes needed",
+            "improvement_suggestions": improvements,
+            "observer_feedback": review,
+            "attempts": current_attempt,
+            "last_error": ""
+        })
+
+    # Only the error diagnosis has to wait for the render's stderr.
+    error_context = state["last_error"].strip().split('\n')[-15:]
+    core_error = next(
+        (line for line in reversed(error_context)
+         if any(e in line for e in ["Error:", "Exception:", "Failed"])),
+        state["last_error"]
+    )
+    try:
+        error_summary = get_error_memory().record_error(
+            raw_error='\n'.join(error_context),
+            faulty_code=state["script_content"],
+            llm=get_node_llm("analyze_error")
+        )
+        logging.info(f"Recorded error: {error_summary}")
+
+        prevention_guide = get_error_memory().get_prevention_guide()
+        state["error_fixes"] = next(
+            (e["solution"] for e in prevention_guide
+             if core_error in e["summary"]),
+            "No specific fix found"
+        )
+    except Exception as e:
+        logging.error(Fore.RED + f"Error recording failed: {str(e)}")
+        state["error_fixes"] = "REPLACE: (see Manim documentation)"
+
+    chain = observe_prompt | get_node_llm("observe", state.get("render_failures", 0))
     analysis = chain.invoke({
         "user_input": state["user_input"],
         "status": state["status"],
-        "last_error": core_error if state["status"] == "error" else "",
+        "last_error": core_error,
         "script_content": state["script_content"]
     }).content.strip()
 
-    error_fixes = "No fixes needed"
-    improvements = "No improvements suggested"
-
+    error_fixes = state.get("error_fixes", "No valid fix generated")
     if "ERROR FIXES:" in analysis:
         error_fixes = analysis.split("ERROR FIXES:")[1].split("IMPROVEMENTS:")[0].strip()
         if not error_fixes.startswith(("ADD:", "REPLACE:")):
             error_fixes = state.get("error_fixes", "No valid fix generated")
 
-    if "IMPROVEMENTS:" in analysis:
-        improvements = analysis.split("IMPROVEMENTS:")[1].strip()
-
-    if analysis == "APPROVED":
-        return {
-            "final_code": state["script_content"],
-            "status": "approved",
-            "attempts": current_attempt
-        }
-
-    return {
+    return track_progress(state, review, {
         "error_fixes": error_fixes,
         "improvement_suggestions": improvements,
         "observer_feedback": analysis,
         "attempts": current_attempt,
-        "last_error": core_error if state["status"] == "error" else ""
+        "last_error": core_error
+    })
+
+def rerender_draft(state: AgentState, run_id: Union[int, str], attempt: int) -> Dict[str, Any]:
+    """Render an approved draft once more at normal quality. If that fails the draft video is kept,
+    render_quality stays "draft" in the result, and it is not cached."""
+    logging.info("Approved a draft render; rendering it again at normal quality")
+    success, result, artifact_id = render_script({**state, "render_quality": "low"}, state["script_content"],
+                                                 f"{run_id}-final", attempt, PRIORITY_FIX)
+    if success and artifact_id:
+        return {"artifact_id": artifact_id, "render_quality": "low"}
+    logging.warning(Fore.YELLOW + f"Normal-quality render failed; returning the draft video: {result[:200]}")
+    return {}
+
+def track_progress(state: AgentState, review: str, update: Dict[str, Any]) -> Dict[str, Any]:
+    """Record this attempt and react when the loop stops making progress: first warn the prompt
+    and escalate the model, then stop with the reason and the best script that rendered."""
+    entry = {
+        "attempt": update["attempts"],
+        "script_hash": script_fingerprint(state["script_content"]),
+        "script": state["script_content"],
+        "error": error_fingerprint(state["last_error"]) if state["status"] == "error" else "",
+        "status": state["status"],
+        "last_error": state["last_error"][-2000:] if state["status"] == "error" else "",
+        "artifact_id": state.get("artifact_id", "") if state["status"] != "error" else "",
+        "render_quality": state.get("render_quality", "low"),
+        "review": review,
     }
+    history = state.get("attempt_history", []) + [entry]
+    update["attempt_history"] = history
+    if update.get("status") == "approved":
+        return update
+
+    verdict, reason = assess_progress(history)
+    if verdict == "ok":
+        update["stuck"] = 0
+        return apply_budget(state, update)
+
+    stuck = state.get("stuck", 0) + 1
+    logging.warning(Fore.YELLOW + f"No progress ({verdict}): {reason}")
+    update["stuck"] = stuck
+    if stuck >= MAX_STUCK:
+        return stop_with_best(update, f"{verdict}: {reason}")
+    update["improvement_suggestions"] = (
+        f"WARNING: {reason}. Do not return that script again; make a materially different change.\n"
+        + update.get("improvement_suggestions", "")
+    )
+    return apply_budget(state, update)
+
+def apply_budget(state: AgentState, update: Dict[str, Any]) -> Dict[str, Any]:
+    """Use measured node costs to decide whether another iteration fits the deadline and compute
+    budget, fits only with draft renders, or does not fit at all."""
+    spent = add_usage(state.get("spent", {}), current_usage.get() or {})
+    decision, reason = plan_next(state["budget"], spent, update["attempts"], get_node_costs(),
+                                 state["status"] == "error")
+    if decision == "stop":
+        return stop_with_best(update, f"budget: {reason}")
+    quality = "draft" if decision == "draft" else "low"
+    if quality != state.get("render_quality", "low"):
+        logging.warning(Fore.YELLOW + f"Switching to {quality} renders" + (f": {reason}" if reason else ""))
+    update["render_quality"] = quality
+    return update
+
+def stop_with_best(update: Dict[str, Any], reason: str) -> Dict[str, Any]:
+    """End the run with the most recent script that rendered, if any."""
+    rendered = next((h for h in reversed(update["attempt_history"]) if h["status"] != "error"), None)
+    update.update({"status": "stopped", "stop_reason": reason})
+    if rendered:
+        update["artifact_id"] = rendered["artifact_id"]
+        update["final_code"] = rendered["script"]
+        update["render_quality"] = rendered.get("render_quality", "low")
+    return update
 
 def should_continue(state: AgentState) -> str:
     logging.info(f"Determining continuation. Status: {state.get('status')}, Attempts: {state['attempts']}")
@@ -181,29 +524,33 @@ def should_continue(state: AgentState) -> str:
     if state.get("status") == "approved":
         logging.info(Fore.GREEN + "Workflow approved - ending")
         return "end"
+    if state.get("status") == "stopped":
+        logging.warning(Fore.YELLOW + f"Stopped early - {state.get('stop_reason')}")
+        return "end"
     if state.get("status") == "error":
         logging.info(Fore.RED + "Errors detected - routing to fix_errors")
         return "fix_errors"
-    if state["attempts"] >= 3:
-        logging.warning(Fore.YELLOW + "Max attempts reached - ending")
-        return "end"
 
     logging.info(Fore.GREEN + "Routing to improve_quality")
     return "improve_quality"
 
 workflow = StateGraph(AgentState)
 
-workflow.add_node("think", think_node)
-workflow.add_node("plan", plan_node)
-workflow.add_node("action", action_node)
-workflow.add_node("execute", execute_node)
-workflow.add_node("observe", observe_node)
+workflow.add_node("cache", cache_node)
+workflow.add_node("think", metered("think", think_node, get_node_costs))
+workflow.add_node("plan", metered("plan", plan_node, get_node_costs))
+workflow.add_node("action", metered("action", action_node, get_node_costs))
+workflow.add_node("execute", metered("execute", execute_node, get_node_costs))
+workflow.add_node("review", metered("review", review_node, get_node_costs))
+workflow.add_node("observe", metered("observe", observe_node, get_node_costs))
 
-workflow.set_entry_point("think")
+workflow.set_entry_point("cache")
+workflow.add_conditional_edges("cache", route_from_cache, {"end": END, "think": "think"})
 workflow.add_edge("think", "plan")
 workflow.add_edge("plan", "action")
 workflow.add_edge("action", "execute")
-workflow.add_edge("execute", "observe")
+workflow.add_edge("action", "review")
+workflow.add_edge(["execute", "review"], "observe")
 
 workflow.add_conditional_edges(
     "observe",
@@ -223,25 +570,60 @@ config={
 
 app = workflow.compile(checkpointer=memory)
 
-def run_workflow(user_input: str, thread_id: int = 1) -> Dict[str, Any]:
-    logging.info(Fore.GREEN + f"Starting workflow for input: {user_input}")
-
-    initial_state = AgentState(
+def make_initial_state(user_input: str, options: Dict[str, Any] = None) -> AgentState:
+    """options: {"cache": False} skips the semantic cache, {"warm_start": True} seeds from a similar topic.
+    {"profile": "interactive" | "batch"} picks the deadline and compute budget (default BUDGET_PROFILE);
+    deadline_seconds, llm_tokens, render_seconds and max_attempts override single limits."""
+    options = options or {}
+    return AgentState(
         user_input=user_input,
         reasoning="",
         steps="",
         script_content="",
+        candidates=[],
         execution_result="",
         observer_feedback="",
+        quality_review="",
+        reviewed_script="",
         improvement_suggestions="",
         error_fixes="",
+        render_failures=0,
         final_code="",
         last_error="",
+        artifact_id="",
+        use_cache=bool(options.get("cache", True)),
+        warm_start=bool(options.get("warm_start", os.getenv("SEMANTIC_CACHE_WARM_START") == "1")),
+        warm_script="",
+        cache_hit=0,
         attempts=0,
+        attempt_history=[],
+        stuck=0,
+        stop_reason="",
+        budget=make_budget(options),
+        spent={},
+        render_quality="low",
         status="initial"
     )
 
-    for step in app.stream(initial_state, config=config):
+flights = SingleFlight()
+
+def run_workflow(user_input: str, thread_id: Union[int, str] = 1, options: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Identical topics already in flight in this process share that run instead of starting their own."""
+    if os.getenv("SINGLE_FLIGHT", "1") != "1":
+        return _run_workflow(user_input, thread_id, options)
+    result, shared = flights.do(flight_key(user_input, options), lambda: _run_workflow(user_input, thread_id, options))
+    if shared:
+        logging.info(Fore.GREEN + f"Reused in-flight result for: {user_input}")
+        result["coalesced"] = True
+    return result
+
+def _run_workflow(user_input: str, thread_id: Union[int, str], options: Dict[str, Any] = None) -> Dict[str, Any]:
+    logging.info(Fore.GREEN + f"Starting workflow for input: {user_input}")
+
+    initial_state = make_initial_state(user_input, options)
+    run_config = {"configurable": {"thread_id": thread_id}}
+
+    for step in app.stream(initial_state, config=run_config):
         for node, value in step.items():
             logging.info(Fore.GREEN + f"Completed node: {node}")
             if "attempts" in value:
@@ -250,11 +632,21 @@ def run_workflow(user_input: str, thread_id: int = 1) -> Dict[str, Any]:
     final_state = value
     logging.info(Fore.GREEN + f"Workflow completed with status: {final_state.get('status', 'unknown')}")
 
+    return build_result(final_state, run_config)
+
+def build_result(final_state: Dict[str, Any], run_config: Dict[str, Any]) -> Dict[str, Any]:
+    values = app.get_state(run_config).values
     return {
         "final_code": final_state.get("final_code", ""),
         "status": final_state.get("status", "unknown"),
         "attempts": final_state.get("attempts", 0),
-        "feedback": final_state.get("observer_feedback", "")
+        "artifact_id": values.get("artifact_id", ""),
+        "cache_hit": values.get("cache_hit", 0),
+        "spent": values.get("spent", {}),
+        "render_quality": values.get("render_quality", "low"),
+        "draft": values.get("render_quality", "low") == "draft",
+        "feedback": final_state.get("observer_feedback", ""),
+        "stop_reason": final_state.get("stop_reason", "")
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,142 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+from colorama import init, Fore
+from utils import run_manim_script
+from workspace import render_workspace
+
+init(autoreset=True)
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+PRUNE_EVERY = 20
+
+COMMON_FORMULAS = [
+    r"y = mx + c",
+    r"\hat{y} = \beta_0 + \beta_1 x",
+    r"J(\theta) = \frac{1}{2m} \sum_{i=1}^{m} (h_\theta(x^{(i)}) - y^{(i)})^2",
+    r"\theta := \theta - \alpha \nabla J(\theta)",
+    r"\sigma(z) = \frac{1}{1 + e^{-z}}",
+    r"MSE = \frac{1}{n} \sum_{i=1}^{n} (y_i - \hat{y}_i)^2",
+    r"R^2 = 1 - \frac{SS_{res}}{SS_{tot}}",
+    r"P(A \mid B) = \frac{P(B \mid A) P(A)}{P(B)}",
+]
+
+COMMON_TEXTS = [
+    "Linear Regression",
+    "Gradient Descent",
+    "Data Points",
+    "Best Fit Line",
+    "Prediction",
+    "Error",
+]
+
+class GlyphCache:
+    """Size-capped directory shared by all renders for manim's tex (Tex/) and text (texts/) SVGs.
+
+    Manim already names these files by a hash of their content and style, so sharing the
+    directories is enough to deduplicate work across containers and workers.
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        for sub in ("Tex", "texts"):
+            (self.root / sub).mkdir(parents=True, exist_ok=True)
+            os.chmod(self.root / sub, 0o777)
+        os.chmod(self.root, 0o777)
+
+    def _entries(self) -> Dict[Tuple[str, str], Tuple[float, int, List[Path]]]:
+        """Group files by (directory, hash stem): a formula's .tex/.dvi/.svg live and die together."""
+        groups: Dict[Tuple[str, str], Tuple[float, int, List[Path]]] = {}
+        for sub in ("Tex", "texts"):
+            for path in (self.root / sub).iterdir():
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                key = (sub, path.name.split(".")[0])
+                last_used, size, files = groups.get(key, (0.0, 0, []))
+                groups[key] = (max(last_used, st.st_atime, st.st_mtime), size + st.st_size, files + [path])
+        return groups
+
+    def usage(self) -> Dict[str, int]:
+        groups = self._entries()
+        return {
+            "entries": len(groups),
+            "bytes": sum(size for _, size, _ in groups.values()),
+            "max_bytes": self.max_bytes,
+        }
+
+    def prune(self) -> int:
+        """Evict least-recently-used entries until the cache is back under 90% of its cap."""
+        with self.lock:
+            groups = self._entries()
+            total = sum(size for _, size, _ in groups.values())
+            if total <= self.max_bytes:
+                return 0
+            target = int(self.max_bytes * 0.9)
+            freed = 0
+            for last_used, size, files in sorted(groups.values(), key=lambda g: g[0]):
+                if total - freed <= target:
+                    break
+                for path in files:
+                    path.unlink(missing_ok=True)
+                freed += size
+            logging.info(f"Glyph cache pruned {freed} bytes ({total - freed} bytes left)")
+            return freed
+
+    def warm_up(self, formulas: List[str] = None, texts: List[str] = None, backend: str = "docker") -> tuple[bool, str]:
+        """Precompile common formulas and labels so first renders hit the cache."""
+        formulas = COMMON_FORMULAS if formulas is None else formulas
+        texts = COMMON_TEXTS if texts is None else texts
+        lines = ["from manim import *", "", "class GlyphWarmUp(Scene):", "    def construct(self):"]
+        lines += [f"        MathTex({formula!r})" for formula in formulas]
+        lines += [f"        Text({text!r})" for text in texts]
+        lines += ["        self.wait(0.1)"]
+        with render_workspace("glyph-warmup", 1) as workdir:
+            script_path = workdir / "glyph_warmup.py"
+            script_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+            start = time.perf_counter()
+            success, result = run_manim_script(
+                str(script_path), "GlyphWarmUp", backend=backend,
+                cache_dir=str(self.root), extra_args=["--dry_run"]
+            )
+        logging.info(f"Glyph warm-up finished in {time.perf_counter() - start:.1f}s: {result[:200]}")
+        return success, result
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Manage the shared tex/text glyph cache.")
+    parser.add_argument("--root", default=os.getenv("MANIM_GLYPH_CACHE", "glyph_cache"))
+    parser.add_argument("--max-bytes", type=int, default=int(os.getenv("MANIM_GLYPH_CACHE_BYTES", DEFAULT_MAX_BYTES)))
+    sub = parser.add_subparsers(dest="command", required=True)
+    warm = sub.add_parser("warm", help="Precompile common formulas and labels")
+    warm.add_argument("--formulas-file", help="One LaTeX formula per line (default: built-in list)")
+    warm.add_argument("--backend", choices=["docker", "local"], default=os.getenv("MANIM_BACKEND", "docker"))
+    sub.add_parser("prune", help="Evict entries over the size cap")
+    sub.add_parser("stats", help="Show cache usage")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    cache = GlyphCache(args.root, args.max_bytes)
+    if args.command == "warm":
+        formulas = None
+        if args.formulas_file:
+            with open(args.formulas_file, encoding="utf-8") as f:
+                formulas = [line.strip() for line in f if line.strip()]
+        success, result = cache.warm_up(formulas, backend=args.backend)
+        if not success:
+            print(Fore.RED + result)
+            return 1
+    elif args.command == "prune":
+        cache.prune()
+    print(cache.usage())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
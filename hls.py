@@ -0,0 +1,114 @@
+import os
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from colorama import init, Fore
+from utils import ffmpeg_command
+
+init(autoreset=True)
+
+PLAYLIST_NAME = "index.m3u8"
+# flow2 asks for 30-60 second scenes; one scene is one segment.
+DEFAULT_TARGET_DURATION = 60
+
+def stream_dir(stream_id: str) -> Path:
+    return Path(os.getenv("HLS_OUTPUT_DIR", "output/hls")) / stream_id
+
+class HlsPublisher:
+    """Publishes scenes as they finish rendering into a growing HLS EVENT playlist.
+
+    Each scene is remuxed (stream copy) to one MPEG-TS segment. Scenes finish out of order,
+    so a segment is only appended once every earlier scene is in the playlist; the first
+    scene becomes playable as soon as it alone has rendered. A scene that fails to render or
+    remux is skipped as a gap, so the scenes after it still get published. EXT-X-TARGETDURATION
+    may not change within an EVENT playlist, so it is fixed when the publisher is created.
+    """
+
+    def __init__(self, stream_id: str, backend: str = "docker", target_duration: int = DEFAULT_TARGET_DURATION):
+        self.directory = stream_dir(stream_id)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.backend = backend
+        self.target_duration = target_duration
+        self.lock = threading.Lock()
+        self.pending: Dict[int, Optional[Tuple[str, float]]] = {}
+        self.published: List[Optional[Tuple[str, float]]] = []
+        self.finished = False
+        self._write_playlist()
+
+    @property
+    def playlist(self) -> str:
+        return str(self.directory / PLAYLIST_NAME)
+
+    def _run(self, tool: str, args: List[str]) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            ffmpeg_command(tool, args, self.directory, self.backend), capture_output=True, text=True,
+            timeout=120, encoding="utf-8", errors="replace", cwd=self.directory
+        )
+
+    def _remux(self, index: int, video_path: str) -> Tuple[str, float]:
+        source, segment = f"scene{index:03d}.mp4", f"scene{index:03d}.ts"
+        shutil.copyfile(video_path, self.directory / source)
+        try:
+            result = self._run("ffmpeg", ["-y", "-loglevel", "error", "-i", source, "-c", "copy",
+                                          "-bsf:v", "h264_mp4toannexb", "-f", "mpegts", segment])
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr or "ffmpeg remux failed")
+            probe = self._run("ffprobe", ["-v", "error", "-show_entries", "format=duration",
+                                          "-of", "default=noprint_wrappers=1:nokey=1", segment])
+            duration = float(probe.stdout.strip() or 0)
+        finally:
+            (self.directory / source).unlink(missing_ok=True)
+        return segment, duration
+
+    def publish(self, index: int, video_path: str) -> bool:
+        """Remux one rendered scene and append every segment that is now in order."""
+        try:
+            segment = self._remux(index, video_path)
+        except (RuntimeError, ValueError, OSError, subprocess.TimeoutExpired) as e:
+            logging.error(Fore.RED + f"Could not publish scene {index} to HLS: {str(e)}")
+            self.skip(index)
+            return False
+        if round(segment[1]) > self.target_duration:
+            logging.warning(Fore.YELLOW + f"Scene {index} runs {segment[1]:.1f}s, longer than the "
+                                          f"{self.target_duration}s target duration of {self.playlist}")
+        self._add(index, segment)
+        logging.info(Fore.GREEN + f"Scene {index} ready; {len(self.published)} scenes streaming at {self.playlist}")
+        return True
+
+    def skip(self, index: int) -> None:
+        """Leave a gap for a scene that will never be published so later scenes are not held back."""
+        logging.warning(Fore.YELLOW + f"Skipping scene {index} in the HLS stream")
+        self._add(index, None)
+
+    def _add(self, index: int, segment: Optional[Tuple[str, float]]) -> None:
+        with self.lock:
+            self.pending[index] = segment
+            while len(self.published) in self.pending:
+                self.published.append(self.pending.pop(len(self.published)))
+            self._write_playlist()
+
+    def finish(self) -> None:
+        with self.lock:
+            self.finished = True
+            self._write_playlist()
+
+    def _write_playlist(self) -> None:
+        segments = [segment for segment in self.published if segment is not None]
+        lines = [
+            "#EXTM3U", "#EXT-X-VERSION:3", f"#EXT-X-TARGETDURATION:{self.target_duration}",
+            "#EXT-X-MEDIA-SEQUENCE:0", "#EXT-X-PLAYLIST-TYPE:EVENT",
+        ]
+        for i, (segment, duration) in enumerate(segments):
+            if i > 0:
+                lines.append("#EXT-X-DISCONTINUITY")
+            lines += [f"#EXTINF:{duration:.3f},", segment]
+        if self.finished:
+            lines.append("#EXT-X-ENDLIST")
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".m3u8.tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, self.playlist)
@@ -0,0 +1,148 @@
+import json
+import time
+import uuid
+import sqlite3
+import logging
+from typing import Dict, List, Optional, Any
+
+class JobQueue:
+    """Durable priority queue of video jobs with leases and bounded retries."""
+
+    def __init__(self, db_path: str = "jobs.db"):
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self._init_db()
+
+    def _init_db(self):
+        try:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                topic TEXT NOT NULL,
+                options TEXT NOT NULL DEFAULT '{}',
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 3,
+                lease_owner TEXT,
+                lease_expires REAL,
+                available_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                result TEXT,
+                error TEXT
+            )
+            """)
+            self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS jobs_ready
+            ON jobs (status, priority DESC, created_at)
+            """)
+        except sqlite3.Error as e:
+            logging.error(f"Job queue initialization failed: {str(e)}")
+            raise
+
+    def submit(self, topic: str, priority: int = 0, max_attempts: int = 3, options: Dict[str, Any] = None) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self.conn.execute("""
+        INSERT INTO jobs (id, topic, options, priority, max_attempts, available_at, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (job_id, topic, json.dumps(options or {}), priority, max_attempts, now, now, now))
+        return job_id
+
+    def lease(self, worker_id: str, lease_seconds: float = 600) -> Optional[Dict[str, Any]]:
+        """Atomically claim the highest-priority ready job, reclaiming expired leases."""
+        now = time.time()
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._reap_expired(now)
+            row = self.conn.execute("""
+            SELECT * FROM jobs
+            WHERE status = 'queued' AND available_at <= ?
+            ORDER BY priority DESC, created_at
+            LIMIT 1
+            """, (now,)).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute("""
+            UPDATE jobs
+            SET status = 'running', attempts = attempts + 1, lease_owner = ?,
+                lease_expires = ?, updated_at = ?
+            WHERE id = ?
+            """, (worker_id, now + lease_seconds, now, row["id"]))
+            self.conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            # BEGIN itself can fail (database still locked after the timeout); then there is nothing to roll back.
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK")
+            logging.error(f"Failed to lease job: {str(e)}")
+            return None
+        job = self._to_dict(row)
+        job["attempts"] += 1
+        job["status"] = "running"
+        return job
+
+    def _reap_expired(self, now: float) -> None:
+        self.conn.execute("""
+        UPDATE jobs
+        SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+            error = COALESCE(error, 'lease expired'), lease_owner = NULL, updated_at = ?
+        WHERE status = 'running' AND lease_expires < ?
+        """, (now, now))
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = 600) -> bool:
+        now = time.time()
+        cursor = self.conn.execute("""
+        UPDATE jobs SET lease_expires = ?, updated_at = ?
+        WHERE id = ? AND lease_owner = ? AND status = 'running'
+        """, (now + lease_seconds, now, job_id, worker_id))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        cursor = self.conn.execute("""
+        UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_owner = NULL, updated_at = ?
+        WHERE id = ? AND lease_owner = ? AND status = 'running'
+        """, (json.dumps(result), time.time(), job_id, worker_id))
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry_delay: float = 5) -> bool:
+        now = time.time()
+        cursor = self.conn.execute("""
+        UPDATE jobs
+        SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+            error = ?, lease_owner = NULL, available_at = ? + ? * attempts, updated_at = ?
+        WHERE id = ? AND lease_owner = ? AND status = 'running'
+        """, (error[-2000:], now, retry_delay, now, job_id, worker_id))
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, status: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+        if status:
+            rows = self.conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)
+            ).fetchall()
+        else:
+            rows = self.conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["options"] = json.loads(job["options"] or "{}")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def close(self):
+        try:
+            self.conn.close()
+        except sqlite3.Error as e:
+            logging.error(f"Failed to close job queue: {str(e)}")
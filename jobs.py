@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import argparse
+import importlib
+import threading
+import multiprocessing
+from pathlib import Path
+from typing import List
+from colorama import init, Fore
+from job_queue import JobQueue
+
+init(autoreset=True)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+DEFAULT_DB = "jobs.db"
+
+# Paths every worker must share even though each one chdirs into its own workdir; None means unset is off.
+SHARED_PATHS = {
+    "MANIM_ERRORS_DB": "manim_errors.db",
+    "ARTIFACT_DIR": "artifacts",
+    "SEMANTIC_CACHE_DB": "semantic_cache.db",
+    "HLS_OUTPUT_DIR": "output/hls",
+    "MANIM_GLYPH_CACHE": None,
+    "MANIM_PROFILE_DIR": None,
+    "LLM_ROUTING_LOG": None,
+    "LLM_ROUTES": None,
+}
+
+def _heartbeat(db_path: str, job_id: str, worker_id: str, lease_seconds: float, done: threading.Event) -> None:
+    queue = JobQueue(db_path)
+    try:
+        while not done.wait(lease_seconds / 3):
+            if not queue.heartbeat(job_id, worker_id, lease_seconds):
+                logging.warning(Fore.YELLOW + f"[{worker_id}] Lost lease on job {job_id}")
+                return
+    finally:
+        queue.close()
+
+def worker_main(db_path: str, worker_id: str, workdir: str, flow_module: str,
+                lease_seconds: float, poll_interval: float, exit_when_idle: bool, stop) -> None:
+    """Worker process: owns one LLM client (via the per-process factories) and one render slot."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    flow = importlib.import_module(flow_module)
+    Path(workdir).mkdir(parents=True, exist_ok=True)
+    os.chdir(workdir)
+    queue = JobQueue(db_path)
+    logging.info(Fore.GREEN + f"[{worker_id}] Started in {workdir}")
+
+    try:
+        while not stop.is_set():
+            job = queue.lease(worker_id, lease_seconds)
+            if job is None:
+                if exit_when_idle and not queue.counts().get("queued"):
+                    break
+                stop.wait(poll_interval)
+                continue
+
+            logging.info(Fore.GREEN + f"[{worker_id}] Running job {job['id']} (attempt {job['attempts']}): {job['topic']}")
+            done = threading.Event()
+            beat = threading.Thread(
+                target=_heartbeat, args=(db_path, job["id"], worker_id, lease_seconds, done), daemon=True
+            )
+            beat.start()
+            started = time.time()
+            try:
+                options = {"profile": "batch", **(job["options"] or {})}
+                result = flow.run_workflow(job["topic"], thread_id=job["id"], options=options)
+                result["elapsed"] = time.time() - started
+                if queue.complete(job["id"], worker_id, result):
+                    logging.info(Fore.GREEN + f"[{worker_id}] Job {job['id']} finished with status {result['status']}")
+                else:
+                    logging.warning(Fore.YELLOW + f"[{worker_id}] Lost the lease on job {job['id']}; "
+                                                  f"its result was discarded")
+            except Exception as e:
+                logging.error(Fore.RED + f"[{worker_id}] Job {job['id']} failed: {str(e)}")
+                if not queue.fail(job["id"], worker_id, f"{type(e).__name__}: {e}"):
+                    logging.warning(Fore.YELLOW + f"[{worker_id}] Lost the lease on job {job['id']}; "
+                                                  f"the failure was not recorded")
+            finally:
+                done.set()
+                beat.join()
+    finally:
+        queue.close()
+        if hasattr(flow, "cleanup"):
+            flow.cleanup()
+
+def run_pool(db_path: str, workers: int, workdir: str, flow_module: str,
+             lease_seconds: float, poll_interval: float, exit_when_idle: bool) -> None:
+    db_path = str(Path(db_path).resolve())
+    for name, default in SHARED_PATHS.items():
+        value = os.getenv(name, default)
+        if value:
+            os.environ[name] = str(Path(value).resolve())
+    if not os.getenv("RENDER_AGENTS"):
+        # Every worker process builds its own RenderScheduler, so split the host's CPU budget between them.
+        host_budget = float(os.getenv("RENDER_CPU_BUDGET") or os.cpu_count() or 1)
+        os.environ["RENDER_CPU_BUDGET"] = str(host_budget / workers)
+        if host_budget / workers < float(os.getenv("RENDER_CPUS", "2")):
+            logging.warning(Fore.YELLOW + f"{workers} workers each need at least one {os.getenv('RENDER_CPUS', '2')}-CPU "
+                                          f"render slot, more than the {host_budget:g} CPU budget")
+    JobQueue(db_path).close()
+
+    ctx = multiprocessing.get_context("spawn")
+    stop = ctx.Event()
+    processes = []
+    for i in range(workers):
+        worker_id = f"{os.uname().nodename}-{os.getpid()}-w{i}"
+        process = ctx.Process(
+            target=worker_main,
+            args=(db_path, worker_id, str(Path(workdir).resolve() / f"worker-{i}"), flow_module,
+                  lease_seconds, poll_interval, exit_when_idle, stop),
+            name=worker_id
+        )
+        process.start()
+        processes.append(process)
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        logging.warning(Fore.YELLOW + "Stopping workers after their current job")
+        stop.set()
+        for process in processes:
+            process.join()
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Submit video jobs and run the worker pool.")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    submit = sub.add_parser("submit", help="Queue one or more topics")
+    submit.add_argument("topics", nargs="+")
+    submit.add_argument("--priority", type=int, default=0)
+    submit.add_argument("--max-attempts", type=int, default=3)
+
+    status = sub.add_parser("status", help="Show a job")
+    status.add_argument("job_id")
+    status.add_argument("--code", action="store_true", help="Print the final script")
+
+    listing = sub.add_parser("list", help="List recent jobs")
+    listing.add_argument("--status")
+    listing.add_argument("--limit", type=int, default=20)
+
+    work = sub.add_parser("work", help="Run the worker pool")
+    work.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    work.add_argument("--workdir", default="workers")
+    work.add_argument("--flow", default="flow4", choices=["flow4"],
+                      help="Workflow module; only flow4 has the options/make_initial_state/build_result API")
+    work.add_argument("--lease", type=float, default=600)
+    work.add_argument("--poll", type=float, default=2)
+    work.add_argument("--exit-when-idle", action="store_true")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "work":
+        run_pool(args.db, args.workers, args.workdir, args.flow, args.lease, args.poll, args.exit_when_idle)
+        return 0
+
+    queue = JobQueue(args.db)
+    try:
+        if args.command == "submit":
+            for topic in args.topics:
+                print(queue.submit(topic, priority=args.priority, max_attempts=args.max_attempts))
+        elif args.command == "status":
+            job = queue.get(args.job_id)
+            if job is None:
+                print(Fore.RED + f"No such job: {args.job_id}")
+                return 1
+            result = job["result"] or {}
+            if not args.code:
+                result = {k: v for k, v in result.items() if k != "final_code"}
+            print(json.dumps({**job, "result": result}, indent=2))
+        elif args.command == "list":
+            print(f"Counts: {queue.counts()}")
+            for job in queue.list(args.status, args.limit):
+                print(f"{job['id']}  {job['status']:<8} p={job['priority']:<3} attempts={job['attempts']}  {job['topic']}")
+    finally:
+        queue.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from colorama import init, Fore
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.language_models.chat_models import BaseChatModel
+
+init(autoreset=True)
+
+DEFAULT_OUTPUT_TOKENS = 1024
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+class _Bucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float, now: float) -> float:
+        self._refill(now)
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+class RateLimiter:
+    """Process-wide token buckets for requests and tokens per minute.
+
+    Callers reserve up front and then sleep off their share of the deficit, so waiting
+    callers are served in arrival order and the limiter works the same from threads and
+    from the event loop. Token reservations are estimates, settled once usage is known.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float = None):
+        self.requests = _Bucket(requests_per_minute)
+        self.tokens = _Bucket(tokens_per_minute) if tokens_per_minute else None
+        self.lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> float:
+        """Reserve one request and `tokens` tokens; returns how long to wait before sending."""
+        with self.lock:
+            now = time.monotonic()
+            wait = self.requests.wait_for(1, now)
+            if self.tokens:
+                wait = max(wait, self.tokens.wait_for(tokens, now))
+            self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+            return wait
+
+    def try_reserve(self, tokens: int) -> bool:
+        """Reserve only if it needs no wait (used for hedges, which must not queue behind real work)."""
+        with self.lock:
+            now = time.monotonic()
+            if self.requests.wait_for(1, now) > 0 or (self.tokens and self.tokens.wait_for(tokens, now) > 0):
+                return False
+            self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+            return True
+
+    def settle(self, estimated: int, actual: int) -> None:
+        if self.tokens and actual:
+            with self.lock:
+                self.tokens.level -= actual - estimated
+
+    def acquire(self, tokens: int) -> float:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+class LatencyTracker:
+    """Rolling per-model call latencies, plus hedge counters."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self.samples: Dict[str, Deque[float]] = {}
+        self.counters: Dict[str, int] = {"calls": 0, "hedged": 0, "hedge_wins": 0, "throttled": 0}
+        self.lock = threading.Lock()
+
+    def add(self, key: str, seconds: float) -> None:
+        with self.lock:
+            self.samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.counters[name] += 1
+
+    def p95(self, key: str, min_samples: int = HEDGE_MIN_SAMPLES) -> Optional[float]:
+        with self.lock:
+            samples = sorted(self.samples.get(key, ()))
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, round(0.95 * (len(samples) - 1)))]
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return dict(self.counters)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """One event loop for all synchronous callers, so a losing hedge can actually be cancelled."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop.set_default_executor(ThreadPoolExecutor(max_workers=64, thread_name_prefix="llm"))
+            threading.Thread(target=_loop.run_forever, name="llm-guard-loop", daemon=True).start()
+        return _loop
+
+def _run_sync(coro) -> Any:
+    loop = _background_loop()
+    context = contextvars.copy_context()
+    done = threading.Event()
+    holder: Dict[str, Any] = {}
+
+    def _start():
+        task = loop.create_task(coro, context=context)
+        task.add_done_callback(lambda t: (holder.setdefault("task", t), done.set()))
+
+    loop.call_soon_threadsafe(_start)
+    done.wait()
+    return holder["task"].result()
+
+def estimate_tokens(messages: List[BaseMessage], max_output_tokens: Optional[int]) -> int:
+    prompt = sum(len(str(m.content)) for m in messages) // 4
+    return prompt + (max_output_tokens or DEFAULT_OUTPUT_TOKENS)
+
+def _used_tokens(result: ChatResult) -> int:
+    try:
+        usage = result.generations[0].message.usage_metadata or {}
+    except (AttributeError, IndexError):
+        return 0
+    return usage.get("total_tokens", 0)
+
+class GuardedChatModel(BaseChatModel):
+    """Wraps a chat model with the shared rate limiter and hedged requests.
+
+    A call still running at the model's p95 latency gets a duplicate; the first to finish
+    wins and the other is cancelled. Hedges are only sent when the limiter has headroom.
+    """
+
+    inner: BaseChatModel
+    limiter: Any = None
+    latencies: Any = None
+    hedge: bool = True
+
+    @property
+    def _llm_type(self) -> str:
+        return f"guarded-{self.inner._llm_type}"
+
+    @property
+    def _key(self) -> str:
+        return str(getattr(self.inner, "model", self.inner._llm_type))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        return _run_sync(self._call(messages, stop, kwargs))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        return await self._call(messages, stop, kwargs)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        """Rate-limited but never hedged: the first tokens arrive long before p95. Closing the
+        iterator closes the inner stream, which is how callers abort a generation early."""
+        if type(self.inner)._stream is BaseChatModel._stream:
+            message = self._generate(messages, stop, **kwargs).generations[0].message
+            yield ChatGenerationChunk(message=AIMessageChunk(content=message.content,
+                                                             usage_metadata=message.usage_metadata))
+            return
+        estimate = estimate_tokens(messages, getattr(self.inner, "max_output_tokens", None))
+        if self.latencies:
+            self.latencies.count("calls")
+        if self.limiter:
+            wait = self.limiter.acquire(estimate)
+            if wait > 0:
+                if self.latencies:
+                    self.latencies.count("throttled")
+                logging.info(Fore.YELLOW + f"LLM rate limit: waited {wait:.1f}s")
+        used = 0
+        stream = self.inner._stream(messages, stop=stop, **kwargs)
+        try:
+            for chunk in stream:
+                used = (chunk.message.usage_metadata or {}).get("total_tokens", used)
+                yield chunk
+        finally:
+            stream.close()
+            if self.limiter:
+                self.limiter.settle(estimate, used)
+
+    async def _call(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> ChatResult:
+        estimate = estimate_tokens(messages, getattr(self.inner, "max_output_tokens", None))
+        if self.latencies:
+            self.latencies.count("calls")
+        if self.limiter:
+            wait = self.limiter.reserve(estimate)
+            if wait > 0:
+                if self.latencies:
+                    self.latencies.count("throttled")
+                logging.info(Fore.YELLOW + f"LLM rate limit: waiting {wait:.1f}s")
+                await asyncio.sleep(wait)
+
+        primary = asyncio.ensure_future(self._attempt(messages, stop, kwargs, estimate))
+        threshold = self.latencies.p95(self._key) if self.hedge and self.latencies else None
+        if threshold is None:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=threshold)
+        if done or (self.limiter and not self.limiter.try_reserve(estimate)):
+            return await primary
+
+        logging.info(Fore.YELLOW + f"Hedging {self._key} call still running after p95 ({threshold:.2f}s)")
+        self.latencies.count("hedged")
+        hedge = asyncio.ensure_future(self._attempt(messages, stop, kwargs, estimate))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((t for t in done if not t.exception()), None)
+                if winner is not None:
+                    if winner is hedge:
+                        self.latencies.count("hedge_wins")
+                    return winner.result()
+            return await primary
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _attempt(self, messages: List[BaseMessage], stop: Optional[List[str]],
+                       kwargs: Dict[str, Any], estimate: int) -> ChatResult:
+        start = time.perf_counter()
+        result = await self.inner._agenerate(messages, stop=stop, **kwargs)
+        if self.latencies:
+            self.latencies.add(self._key, time.perf_counter() - start)
+        if self.limiter:
+            self.limiter.settle(estimate, _used_tokens(result))
+        return result
@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+import statistics
+import threading
+from pathlib import Path
+from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from colorama import init, Fore
+from stubs import StubChatModel, StubLLMServer, HttpChatModel, StubRenderer, parse_distribution, session_timings
+
+init(autoreset=True)
+
+def load_topics(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        topics = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not topics:
+        raise ValueError(f"No topics found in {path}")
+    return topics
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    return {
+        "p50": percentile(values, 50),
+        "p99": percentile(values, 99),
+        "mean": statistics.fmean(values) if values else 0.0,
+        "max": max(values, default=0.0),
+    }
+
+def run_session(flow, topic: str, thread_id: int, submitted: float) -> Dict[str, Any]:
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+    token = session_timings.set(timings)
+    status, error, coalesced = "unknown", "", False
+    try:
+        result = flow.run_workflow(topic, thread_id=thread_id)
+        status = result["status"]
+        coalesced = bool(result.get("coalesced"))
+    except Exception as e:
+        status, error = "failed", f"{type(e).__name__}: {e}"
+    finally:
+        session_timings.reset(token)
+    finished = time.perf_counter()
+    return {
+        "topic": topic,
+        "status": status,
+        "error": error,
+        "coalesced": coalesced,
+        "queue_wait": started - submitted,
+        "end_to_end": finished - submitted,
+        "service_time": finished - started,
+        "llm_seconds": timings.get("llm_seconds", 0.0),
+        "llm_calls": timings.get("llm_seconds_calls", 0),
+        "render_seconds": timings.get("render_seconds", 0.0),
+        "render_wait_seconds": timings.get("render_wait_seconds", 0.0),
+        "renders": timings.get("render_seconds_calls", 0),
+    }
+
+def build_report(sessions: List[Dict[str, Any]], wall: float, args: argparse.Namespace) -> Dict[str, Any]:
+    statuses: Dict[str, int] = {}
+    for s in sessions:
+        statuses[s["status"]] = statuses.get(s["status"], 0) + 1
+    # Coalesced sessions only waited for another session's run, so they are not throughput.
+    coalesced = [s for s in sessions if s["coalesced"]]
+    completed = [s for s in sessions if s["status"] != "failed" and not s["coalesced"]]
+    service = sum(s["service_time"] for s in sessions) or 1.0
+    llm = sum(s["llm_seconds"] for s in sessions)
+    render = sum(s["render_seconds"] for s in sessions)
+    return {
+        "config": {
+            "users": args.users,
+            "requests": len(sessions),
+            "arrival_rate": args.rate,
+            "llm_latency": args.llm_latency,
+            "llm_failure_rate": args.llm_failure_rate,
+            "render_latency": args.render_latency,
+            "render_failure_rate": args.render_failure_rate,
+            "render_slots": args.render_slots,
+            "single_flight": args.single_flight,
+        },
+        "wall_seconds": wall,
+        "throughput_per_min": len(completed) / wall * 60 if wall else 0.0,
+        "statuses": statuses,
+        "coalesced": len(coalesced),
+        "queue_wait": _summary([s["queue_wait"] for s in sessions]),
+        "end_to_end": _summary([s["end_to_end"] for s in sessions]),
+        "breakdown": {
+            "llm_share": llm / service,
+            "render_share": render / service,
+            "other_share": max(0.0, 1 - (llm + render) / service),
+            "llm_seconds_per_session": _summary([s["llm_seconds"] for s in sessions]),
+            "render_seconds_per_session": _summary([s["render_seconds"] for s in sessions]),
+            "render_wait_per_session": _summary([s["render_wait_seconds"] for s in sessions]),
+            "llm_calls_per_session": statistics.fmean(s["llm_calls"] for s in sessions) if sessions else 0,
+            "renders_per_session": statistics.fmean(s["renders"] for s in sessions) if sessions else 0,
+        },
+        "errors": sorted({s["error"] for s in sessions if s["error"]})[:10],
+    }
+
+def print_report(report: Dict[str, Any]) -> None:
+    print("\n=== Load Test Results ===")
+    print(f"Requests: {report['config']['requests']}  Users: {report['config']['users']}  Wall: {report['wall_seconds']:.1f}s")
+    print(f"Throughput: {report['throughput_per_min']:.2f} videos/min")
+    print(f"Statuses: {report['statuses']}  Coalesced: {report['coalesced']}")
+    for key in ("queue_wait", "end_to_end"):
+        s = report[key]
+        print(f"{key:<12} p50 {s['p50']:8.2f}s   p99 {s['p99']:8.2f}s   max {s['max']:8.2f}s")
+    b = report["breakdown"]
+    print(f"Time split: LLM {b['llm_share']:.0%}  render {b['render_share']:.0%}  other {b['other_share']:.0%}")
+    print(f"Per session: {b['llm_calls_per_session']:.1f} LLM calls, {b['renders_per_session']:.1f} renders, "
+          f"render slot wait p99 {b['render_wait_per_session']['p99']:.2f}s")
+    if "llm_guard" in report:
+        print(f"LLM guard: {report['llm_guard']}")
+    if "llm_server" in report:
+        print(f"Stub LLM server: {report['llm_server']}")
+    for route, s in report.get("routing", {}).items():
+        print(f"Route {route}: {s['calls']} calls, p50 {s['p50']:.2f}s, p95 {s['p95']:.2f}s, {s['escalated']} escalated, {s['aborted']} aborted")
+    for error in report["errors"]:
+        print(Fore.RED + f"Error: {error}")
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent run_workflow load generator with stubbed LLM and render backends.")
+    parser.add_argument("prompts", help="File with one topic per line")
+    parser.add_argument("--users", type=int, default=8, help="Concurrent workflow sessions")
+    parser.add_argument("--requests", type=int, default=50, help="Total sessions to run")
+    parser.add_argument("--rate", type=float, default=0.0, help="Poisson arrivals per second (0 = submit all at once)")
+    parser.add_argument("--llm-latency", default="lognormal:0,0.5", help="Seconds per LLM call, e.g. const:1 or uniform:0.5,3")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--approve-rate", type=float, default=0.5)
+    parser.add_argument("--semantic-cache", action="store_true",
+                        help="Keep the semantic result cache on (off by default so every session generates)")
+    parser.add_argument("--single-flight", action="store_true",
+                        help="Let identical in-flight topics share one run (off by default so every session runs)")
+    parser.add_argument("--llm-server", action="store_true",
+                        help="Serve the stub LLM over local HTTP (exercises hedge cancellation on real sockets)")
+    parser.add_argument("--render-latency", default="uniform:20,60", help="Seconds per render")
+    parser.add_argument("--render-failure-rate", type=float, default=0.2)
+    parser.add_argument("--render-slots", type=int, default=0, help="Concurrent render limit (0 = unlimited)")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiply all stub latencies, e.g. 0.01 for a quick dry run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    topics = load_topics(args.prompts)
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s", force=True)
+
+    import flow4
+    import clients
+    from error_memory import ErrorMemory
+    logging.getLogger().setLevel(logging.WARNING)
+
+    llm_latency = parse_distribution(args.llm_latency)
+    render_latency = parse_distribution(args.render_latency)
+    llm_server = None
+    if args.llm_server:
+        llm_server = StubLLMServer(
+            latency=lambda: llm_latency() * args.time_scale,
+            failure_rate=args.llm_failure_rate,
+            approve_rate=args.approve_rate
+        ).start()
+        stub_llm = clients.guard_llm(HttpChatModel(url=llm_server.url))
+    else:
+        stub_llm = clients.guard_llm(StubChatModel(
+            latency=lambda: llm_latency() * args.time_scale,
+            failure_rate=args.llm_failure_rate,
+            approve_rate=args.approve_rate
+        ))
+    clients.get_llm = lambda *_, **__: stub_llm
+    stub_renderer = StubRenderer(
+        latency=lambda: render_latency() * args.time_scale,
+        failure_rate=args.render_failure_rate,
+        slots=args.render_slots
+    )
+    flow4.get_renderer = lambda: stub_renderer
+    if not args.semantic_cache:
+        flow4.get_semantic_cache = lambda: None
+    os.environ["SINGLE_FLIGHT"] = "1" if args.single_flight else "0"
+
+    workdir = tempfile.mkdtemp(prefix="manim-loadtest-")
+    error_memory = ErrorMemory(str(Path(workdir) / "loadtest_errors.db"))
+    flow4.get_error_memory = lambda *_, **__: error_memory
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+
+    sessions: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+
+    def _done(future):
+        with lock:
+            sessions.append(future.result())
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.users) as pool:
+            for i in range(args.requests):
+                if args.rate > 0 and i:
+                    time.sleep(random.expovariate(args.rate))
+                topic = random.choice(topics)
+                pool.submit(run_session, flow4, topic, i + 1, time.perf_counter()).add_done_callback(_done)
+    finally:
+        os.chdir(previous_cwd)
+        error_memory.close()
+        if llm_server:
+            llm_server.stop()
+    wall = time.perf_counter() - start
+
+    report = build_report(sessions, wall, args)
+    report["routing"] = clients.get_model_router().stats()
+    report["llm_guard"] = clients.get_latency_tracker().stats()
+    if llm_server:
+        report["llm_server"] = dict(llm_server.counts)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"report": report, "sessions": sessions}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from typing import Dict, Any, List, Optional
+from colorama import init, Fore
+from langchain_core.callbacks import BaseCallbackHandler
+from budget import charge
+
+init(autoreset=True)
+
+TIERS = {
+    "fast": "gemini-1.5-flash-8b",
+    "standard": "gemini-1.5-flash",
+    "strong": "gemini-1.5-pro",
+}
+
+DEFAULT_ROUTE = {"tier": "standard"}
+
+DEFAULT_ROUTES = {
+    "think": {"tier": "fast", "temperature": 0.7, "max_output_tokens": 1024},
+    "plan": {"tier": "fast", "temperature": 0.4, "max_output_tokens": 1024},
+    "analyze_error": {"tier": "fast", "temperature": 0.0, "max_output_tokens": 512},
+    "action": {"tier": "standard", "max_output_tokens": 8192, "escalate_after": 2, "escalate_to": "strong"},
+    "edit": {"tier": "standard", "temperature": 0.2, "max_output_tokens": 2048,
+             "escalate_after": 2, "escalate_to": "strong"},
+    "observe": {"tier": "standard", "temperature": 0.2, "max_output_tokens": 1024,
+                "escalate_after": 3, "escalate_to": "strong"},
+    "review": {"tier": "standard", "temperature": 0.2, "max_output_tokens": 1024},
+}
+
+class _RouteRecorder(BaseCallbackHandler):
+    """Times every LLM call made through a routed client and reports it to the router.
+    Tokens are charged to the running graph node's budget (estimated at ~4 chars/token without usage metadata)."""
+
+    def __init__(self, router: "ModelRouter", decision: Dict[str, Any]):
+        self.router = router
+        self.decision = decision
+        self.started: Dict[Any, float] = {}
+        self.prompt_chars: Dict[Any, int] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self.started[run_id] = time.perf_counter()
+        self.prompt_chars[run_id] = sum(len(str(m.content)) for batch in messages for m in batch)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self.started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = {}
+        try:
+            usage = response.generations[0][0].message.usage_metadata or {}
+        except (AttributeError, IndexError):
+            pass
+        prompt_chars = self.prompt_chars.pop(run_id, 0)
+        tokens = usage.get("total_tokens")
+        if tokens is None:
+            text = "".join(g.text for generation in response.generations for g in generation)
+            tokens = (prompt_chars + len(text)) // 4
+        charge(llm_tokens=tokens)
+        self._finish(run_id, True, output_tokens=usage.get("output_tokens"))
+
+    def on_llm_error(self, error, *, run_id, response=None, **kwargs):
+        prompt_chars = self.prompt_chars.pop(run_id, 0)
+        if isinstance(error, GeneratorExit):
+            # The caller closed a stream early; it still paid for the prompt and what was streamed.
+            text = "".join(g.text for generation in response.generations for g in generation) if response else ""
+            charge(llm_tokens=(prompt_chars + len(text)) // 4)
+            self._finish(run_id, True, aborted=True)
+            return
+        self._finish(run_id, False, error=f"{type(error).__name__}: {error}"[:200])
+
+    def _finish(self, run_id, ok: bool, **extra) -> None:
+        started = self.started.pop(run_id, None)
+        seconds = time.perf_counter() - started if started is not None else 0.0
+        self.router.record({**self.decision, "seconds": round(seconds, 4), "ok": ok, **extra})
+
+class ModelRouter:
+    """Chooses model, temperature and max output tokens per graph node.
+
+    Routes name a tier (fast/standard/strong) or an explicit model. A route with
+    escalate_after moves to escalate_to once that many consecutive renders have failed.
+    Every call is recorded with its latency; set log_path to append them as JSON lines.
+    """
+
+    def __init__(self, routes: Dict[str, Dict[str, Any]] = None, tiers: Dict[str, str] = None,
+                 log_path: str = None):
+        self.routes = {**DEFAULT_ROUTES, **(routes or {})}
+        self.tiers = {**TIERS, **(tiers or {})}
+        self.log_path = log_path
+        self.lock = threading.Lock()
+        self.calls: List[Dict[str, Any]] = []
+
+    def route(self, node: str, failures: int = 0, escalate: bool = False) -> Dict[str, Any]:
+        config = self.routes.get(node, DEFAULT_ROUTE)
+        tier = config.get("tier", "standard")
+        escalated = escalate or ("escalate_after" in config and failures >= config["escalate_after"])
+        if escalated:
+            tier = config.get("escalate_to", "strong")
+        return {
+            "node": node,
+            "tier": tier,
+            "model": config.get("model") if not escalated and "model" in config else self.tiers[tier],
+            "temperature": config.get("temperature"),
+            "max_output_tokens": config.get("max_output_tokens"),
+            "failures": failures,
+            "escalated": escalated,
+        }
+
+    def instrument(self, llm, decision: Dict[str, Any]):
+        if decision["escalated"]:
+            logging.info(Fore.YELLOW + f"Escalating {decision['node']} to {decision['model']} "
+                                       f"({decision['failures']} failed renders)")
+        return llm.with_config(callbacks=[_RouteRecorder(self, decision)])
+
+    def record(self, call: Dict[str, Any]) -> None:
+        call = {"time": time.time(), **call}
+        with self.lock:
+            self.calls.append(call)
+            if self.log_path:
+                try:
+                    with open(self.log_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(call) + "\n")
+                except OSError as e:
+                    logging.error(Fore.RED + f"Could not write routing log: {str(e)}")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            return summarize(self.calls)
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))] if ordered else 0.0
+
+def summarize(calls: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Per node/model call counts, error rate, escalations, aborted streams and latency percentiles."""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for call in calls:
+        groups.setdefault(f"{call['node']} -> {call['model']}", []).append(call)
+    summary = {}
+    for key, group in sorted(groups.items()):
+        seconds = [c["seconds"] for c in group if c["ok"] and not c.get("aborted")]
+        summary[key] = {
+            "calls": len(group),
+            "errors": sum(not c["ok"] for c in group),
+            "escalated": sum(bool(c.get("escalated")) for c in group),
+            "aborted": sum(bool(c.get("aborted")) for c in group),
+            "p50": _percentile(seconds, 50),
+            "p95": _percentile(seconds, 95),
+            "output_tokens": sum(c.get("output_tokens") or 0 for c in group),
+        }
+    return summary
+
+def load_routes(path: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize an LLM routing log written via LLM_ROUTING_LOG.")
+    parser.add_argument("log")
+    args = parser.parse_args(argv)
+
+    with open(args.log, encoding="utf-8") as f:
+        calls = [json.loads(line) for line in f if line.strip()]
+    print(f"{'route':<45} {'calls':>6} {'errors':>6} {'escal.':>6} {'p50 s':>7} {'p95 s':>7} {'out tok':>8}")
+    for key, s in summarize(calls).items():
+        print(f"{key:<45} {s['calls']:>6} {s['errors']:>6} {s['escalated']:>6} "
+              f"{s['p50']:>7.2f} {s['p95']:>7.2f} {s['output_tokens']:>8}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
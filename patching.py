@@ -0,0 +1,119 @@
+import re
+import difflib
+from typing import List, Optional, Tuple
+
+FUZZY_THRESHOLD = 0.9
+FUZZY_MIN_LINES = 2
+
+_BLOCK = re.compile(r"<{5,9} SEARCH[^\n]*\n(.*?)^={5,9}[ \t]*\n(.*?)^>{5,9} REPLACE", re.S | re.M)
+
+# Strings, numbers and names; comments are matched only so that their words are dropped.
+_TOKEN = re.compile(r"""("[^"\n]*"|'[^'\n]*'|\d[\w.]*|[A-Za-z_]\w*)|#[^\n]*""")
+
+def parse_search_replace(text: str) -> List[Tuple[str, str]]:
+    """SEARCH/REPLACE blocks as (search, replace) pairs."""
+    return [(search, replace) for search, replace in _BLOCK.findall(text)]
+
+def parse_unified_diff(text: str) -> List[Tuple[str, str]]:
+    """Each hunk of a unified diff as a (search, replace) pair. Line numbers are ignored;
+    hunks are located by their content, which survives the model miscounting lines."""
+    edits, search, replace, in_hunk = [], [], [], False
+    for line in text.strip("\n").split("\n"):
+        if line.startswith("@@"):
+            if search or replace:
+                edits.append(("\n".join(search) + "\n", "\n".join(replace) + "\n"))
+            search, replace, in_hunk = [], [], True
+        elif not in_hunk or line.startswith(("--- ", "+++ ", "```")):
+            continue
+        elif line.startswith("-"):
+            search.append(line[1:])
+        elif line.startswith("+"):
+            replace.append(line[1:])
+        elif line.startswith(" ") or line == "":
+            search.append(line[1:])
+            replace.append(line[1:])
+    if search or replace:
+        edits.append(("\n".join(search) + "\n", "\n".join(replace) + "\n"))
+    return edits
+
+def parse_edits(text: str) -> List[Tuple[str, str]]:
+    return parse_search_replace(text) or (parse_unified_diff(text) if "@@" in text else [])
+
+def _indent(line: str) -> str:
+    return line[:len(line) - len(line.lstrip())]
+
+def _reindent(lines: List[str], old: str, new: str) -> List[str]:
+    if old == new:
+        return lines
+    return [new + line[len(old):] if line.startswith(old) else (new + line.lstrip() if line.strip() else line)
+            for line in lines]
+
+def _tokens(text: str) -> List[str]:
+    """Identifiers and literals in order, the part of a line a fuzzy match must not change."""
+    return [token for token in _TOKEN.findall(text) if token]
+
+def _splice(lines: List[str], start: int, matched: List[str], search: List[str], replace: str) -> str:
+    """Swap lines[start:start+len(matched)] for replace, shifted to the indentation found in the script."""
+    first = next((i for i, line in enumerate(search) if line.strip()), 0)
+    new = _reindent(replace.splitlines(), _indent(search[first]), _indent(matched[first]))
+    return "\n".join(lines[:start] + new + lines[start + len(matched):]) + "\n"
+
+def apply_edit(script: str, search: str, replace: str) -> Tuple[Optional[str], str]:
+    """Apply one edit; returns (new script or None, how it matched).
+
+    Tries an exact unique match, then a match ignoring indentation and trailing whitespace
+    (re-indenting the replacement), then the closest window of lines above FUZZY_THRESHOLD.
+    Fuzzy matching needs at least FUZZY_MIN_LINES lines and the same identifiers and literals,
+    so a short line is never applied to a similar statement about a different object.
+    An empty search inserts the replacement at the top, which is where missing imports go.
+    """
+    if not search.strip():
+        return replace.rstrip("\n") + "\n" + script, "insert"
+    if script.count(search) == 1:
+        return script.replace(search, replace), "exact"
+    if script.count(search) > 1:
+        return None, "ambiguous"
+
+    lines = script.splitlines()
+    wanted = search.splitlines()
+    while wanted and not wanted[-1].strip():
+        wanted.pop()
+    while wanted and not wanted[0].strip():
+        wanted.pop(0)
+    if not wanted:
+        return None, "empty"
+    size = len(wanted)
+    stripped = [line.strip() for line in wanted]
+    matches = [i for i in range(len(lines) - size + 1)
+               if [line.strip() for line in lines[i:i + size]] == stripped]
+    if len(matches) == 1:
+        return _splice(lines, matches[0], lines[matches[0]:matches[0] + size], wanted, replace), "whitespace"
+    if len(matches) > 1:
+        return None, "ambiguous"
+
+    if size < FUZZY_MIN_LINES:
+        return None, "no match"
+    target = "\n".join(stripped)
+    tokens = _tokens(target)
+    scored = sorted(
+        (difflib.SequenceMatcher(None, "\n".join(l.strip() for l in lines[i:i + size]), target).ratio(), i)
+        for i in range(len(lines) - size + 1)
+        if _tokens("\n".join(lines[i:i + size])) == tokens
+    )
+    if not scored or scored[-1][0] < FUZZY_THRESHOLD or (len(scored) > 1 and scored[-2][0] == scored[-1][0]):
+        return None, "no match"
+    start = scored[-1][1]
+    return _splice(lines, start, lines[start:start + size], wanted, replace), f"fuzzy {scored[-1][0]:.2f}"
+
+def apply_patch(script: str, patch: str) -> Tuple[Optional[str], str]:
+    """Apply every edit in a model response, in order; all of them must land or nothing is applied."""
+    edits = parse_edits(patch)
+    if not edits:
+        return None, "no edits found"
+    matched = []
+    for n, (search, replace) in enumerate(edits, 1):
+        script, how = apply_edit(script, search, replace)
+        if script is None:
+            return None, f"edit {n}/{len(edits)}: {how}"
+        matched.append(how)
+    return script, f"{len(edits)} edit{'s' if len(edits) > 1 else ''} ({', '.join(matched)})"
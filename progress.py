@@ -0,0 +1,54 @@
+import re
+import ast
+import hashlib
+from typing import Dict, Any, List, Optional, Tuple
+
+STALL_WINDOW = 3
+
+TRANSIENT_ERRORS = ("Timeout expired", "Cancelled", "Connection", "No render agent", "Cannot connect to the Docker daemon")
+
+def script_fingerprint(script: str) -> str:
+    """Hash of the script's AST, so formatting, comments and blank lines do not make a new attempt."""
+    try:
+        normalized = ast.dump(ast.parse(script), include_attributes=False)
+    except SyntaxError:
+        normalized = re.sub(r"\s+", " ", script).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+def error_fingerprint(error: str) -> str:
+    """The render's final error line with paths, line numbers and addresses blanked out."""
+    if not error:
+        return ""
+    lines = [line.strip() for line in error.strip().split("\n") if line.strip()]
+    core = next((line for line in reversed(lines) if re.search(r"(Error|Exception)\b", line)),
+                lines[-1] if lines else "")
+    core = re.sub(r"(/[\w.\-]+)+", "<path>", core)
+    core = re.sub(r"0x[0-9a-fA-F]+", "<addr>", core)
+    core = re.sub(r"\bline \d+", "line <n>", core)
+    return core[:300]
+
+def is_transient(error: str) -> bool:
+    """Infrastructure failures say nothing about the script, so they are worth rendering again."""
+    return any(marker in error for marker in TRANSIENT_ERRORS)
+
+def find_attempt(history: List[Dict[str, Any]], script_hash: str) -> Optional[Dict[str, Any]]:
+    """Most recent attempt of an identical script whose outcome can be reused."""
+    return next((h for h in reversed(history)
+                 if h["script_hash"] == script_hash and not is_transient(h["last_error"])), None)
+
+def assess_progress(history: List[Dict[str, Any]]) -> Tuple[str, str]:
+    """Classify the latest attempt as "ok", "repeat", "oscillation" or "stalled", with a reason."""
+    if not history or is_transient(history[-1]["last_error"]):
+        return "ok", ""
+    last, earlier = history[-1], history[:-1]
+    same = [h for h in earlier if h["script_hash"] == last["script_hash"] and h["error"] == last["error"]]
+    if same:
+        outcome = f"failed with: {last['error']}" if last["error"] else "rendered but was not approved"
+        if same[-1] is earlier[-1]:
+            return "repeat", f"Attempt {last['attempt']} is identical to attempt {same[-1]['attempt']}, which {outcome}"
+        return "oscillation", (f"Attempt {last['attempt']} went back to the script of attempt "
+                               f"{same[-1]['attempt']}, which {outcome}")
+    recent = history[-STALL_WINDOW:]
+    if last["error"] and len(recent) == STALL_WINDOW and all(h["error"] == last["error"] for h in recent):
+        return "stalled", f"The last {STALL_WINDOW} attempts all failed with: {last['error']}"
+    return "ok", ""
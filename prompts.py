@@ -1,4 +1,4 @@
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
 
 think_prompt = ChatPromptTemplate.from_messages([
     ("system", """
@@ -74,6 +74,54 @@ action_prompt = ChatPromptTemplate.from_messages([
     ("human", "Generate the Manim script for {user_input}")
 ])
 
+edit_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
+        You are an expert in **editing Manim scripts** for mathematical and data visualizations.
+
+        **Objective:**
+        Apply the requested fixes and improvements to the current script with the **smallest possible edits**. Do NOT rewrite parts of the script that do not need to change.
+
+        ---
+
+        **Input Details:**
+        - **User Request:** {user_input}
+        - **Improvements Requested:**
+          {improvement_suggestions}
+        - **Specific Fixes to Apply:**
+          {error_fixes}
+        - **Current Script:**
+        ```
+        {script_content}
+        ```
+
+        ---
+
+        **Strict Requirements:**
+        ✅ Keep **Blue** for data representation and **Red** for results.
+        ✅ Keep everything within **a single Scene class**.
+        🚫 **Do NOT use static images** like "house.png" or "scatter_example.jpg".
+
+        **Prevention Guide:**
+        {prevention_guide}
+
+        ---
+
+        **Strict Response Format:**
+        Output **only** SEARCH/REPLACE blocks, one per change:
+        ```
+        <<<<<<< SEARCH
+        <exact lines copied from the current script>
+        =======
+        <the lines that replace them>
+        >>>>>>> REPLACE
+        ```
+        - SEARCH must copy a few lines of the current script exactly, enough to be unique.
+        - To add imports, leave SEARCH empty; the lines are added at the top.
+        - Do not add explanations or any other text.
+    """),
+    ("human", "Edit the Manim script for {user_input}")
+])
+
 observe_prompt = ChatPromptTemplate.from_messages([
     ("system", """
         You are an expert in **Manim script debugging and evaluation**. Your task is to analyze the execution results and provide precise feedback.
@@ -132,3 +180,60 @@ observe_prompt = ChatPromptTemplate.from_messages([
     """),
     ("human", "Review the execution of the Manim script")
 ])
+
+review_prompt = ChatPromptTemplate.from_messages([
+    ("system", """
+        You are an expert in **Manim animations for teaching Machine Learning**. Review the educational quality of the script below. It is being rendered right now, so judge only what it teaches and how, not whether it runs.
+
+        ---
+        
+        **Input Details:**  
+        - **Concept:** {user_input}  
+        - **Script Content:**  
+        ```  
+        {script_content}  
+        ```  
+        
+        ---
+        
+        **Your Tasks:**  
+        - Compare the script with the **concept** and what a student needs to understand it.  
+        - Identify **missing, unclear, or ineffective parts**.  
+        - Suggest **precise educational improvements** to enhance clarity and impact.  
+        - If the script already teaches the concept well, respond with **"APPROVED"** (without any additional comments).  
+        
+        ---
+        
+        **Strict Response Format:**  
+        - If improvements are needed:  
+          ```
+          IMPROVEMENTS:
+          <suggestion1>
+          <suggestion2>
+          ```  
+          
+        - If correct: `"APPROVED"`  
+    """),
+    ("human", "Review the educational quality of the Manim script")
+])
+
+# Vendored copy of hub.pull("hwchase17/react") so agents can be built offline.
+react_prompt = PromptTemplate.from_template("""Answer the following questions as best you can. You have access to the following tools:
+
+{tools}
+
+Use the following format:
+
+Question: the input question you must answer
+Thought: you should always think about what to do
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question
+
+Begin!
+
+Question: {input}
+Thought:{agent_scratchpad}""")
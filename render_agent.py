@@ -0,0 +1,237 @@
+import os
+import sys
+import json
+import time
+import uuid
+import heapq
+import shutil
+import socket
+import asyncio
+import logging
+import argparse
+import tempfile
+import itertools
+from pathlib import Path
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List
+from aiohttp import web
+from colorama import init, Fore
+from utils import build_manim_command, rendered_video_path, write_manim_config, QUALITY_DIRS
+from glyph_cache import GlyphCache, DEFAULT_MAX_BYTES, PRUNE_EVERY
+from render_scheduler import PRIORITY_FIRST
+
+init(autoreset=True)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+RENDER_TIMEOUT_SECONDS = 300
+RESULT_TTL_SECONDS = 3600
+
+class PrioritySlots:
+    """Async counterpart of RenderScheduler's slots: lower priority values get a free slot first,
+    FIFO within a priority."""
+
+    def __init__(self, capacity: int):
+        self.free = capacity
+        self.waiting: List[tuple] = []
+        self.sequence = itertools.count()
+
+    @asynccontextmanager
+    async def hold(self, priority: int) -> AsyncIterator[None]:
+        if self.free > 0 and not self.waiting:
+            self.free -= 1
+        else:
+            entry = (priority, next(self.sequence), asyncio.get_running_loop().create_future())
+            heapq.heappush(self.waiting, entry)
+            try:
+                await entry[2]
+            except asyncio.CancelledError:
+                if not entry[2].cancelled():
+                    self._release()
+                elif entry in self.waiting:
+                    self.waiting.remove(entry)
+                    heapq.heapify(self.waiting)
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        while self.waiting:
+            future = heapq.heappop(self.waiting)[2]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.free += 1
+
+class RenderAgent:
+    """Accepts scripts over HTTP and renders them locally, at most `capacity` at a time, each
+    container limited to `cpus` and `memory` like RenderScheduler's local renders."""
+
+    def __init__(self, capacity: int, backend: str, workdir: str, glyph_cache: GlyphCache = None,
+                 cpus: float = None, memory: str = None):
+        self.agent_id = f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}"
+        self.capacity = capacity
+        self.backend = backend
+        self.cpus = cpus
+        self.memory = memory
+        self.glyph_cache = glyph_cache
+        self.workdir = Path(workdir)
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        self.active = 0
+        self.completed = 0
+        self.slots = PrioritySlots(capacity)
+        self.videos: Dict[str, Dict[str, object]] = {}
+
+    def health(self) -> Dict[str, object]:
+        self._expire_results()
+        return {
+            "agent_id": self.agent_id,
+            "capacity": self.capacity,
+            "active": self.active,
+            "completed": self.completed,
+            "backend": self.backend,
+            "time": time.time(),
+        }
+
+    def _expire_results(self) -> None:
+        cutoff = time.time() - RESULT_TTL_SECONDS
+        for render_id, entry in list(self.videos.items()):
+            if entry["created"] < cutoff:
+                shutil.rmtree(entry["dir"], ignore_errors=True)
+                del self.videos[render_id]
+
+    async def render(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        script, scene_name = body["script"], body["scene_name"]
+        quality = body.get("quality", "low")
+        if quality not in QUALITY_DIRS:
+            raise web.HTTPBadRequest(text=f"Unknown quality: {quality}")
+        priority = body.get("priority", PRIORITY_FIRST)
+        if not isinstance(priority, int):
+            raise web.HTTPBadRequest(text=f"Priority must be an integer: {priority!r}")
+        render_id = uuid.uuid4().hex
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+
+        async def send(message: Dict[str, object]) -> None:
+            await response.write((json.dumps(message) + "\n").encode("utf-8"))
+
+        run_dir = Path(tempfile.mkdtemp(prefix=f"render-{render_id[:8]}-", dir=self.workdir))
+        script_path = run_dir / "scene.py"
+        script_path.write_text(script, encoding="utf-8")
+
+        self.active += 1
+        try:
+            async with self.slots.hold(priority):
+                await send({"type": "started", "render_id": render_id, "agent_id": self.agent_id})
+                success, error = await self._run(script_path, scene_name, send, quality)
+        except (asyncio.CancelledError, ConnectionResetError):
+            logging.warning(Fore.YELLOW + f"Client went away; abandoned render {render_id}")
+            shutil.rmtree(run_dir, ignore_errors=True)
+            raise
+        finally:
+            self.active -= 1
+            self.completed += 1
+            if self.glyph_cache and self.completed % PRUNE_EVERY == 0:
+                self.glyph_cache.prune()
+
+        video = Path(rendered_video_path(str(script_path), scene_name, QUALITY_DIRS[quality]))
+        if success and video.exists():
+            self.videos[render_id] = {"path": video, "dir": run_dir, "created": time.time()}
+            await send({"type": "result", "success": True, "render_id": render_id, "size": video.stat().st_size})
+        else:
+            shutil.rmtree(run_dir, ignore_errors=True)
+            await send({"type": "result", "success": False, "error": error or "Rendered video not found"})
+        await response.write_eof()
+        return response
+
+    async def _run(self, script_path: Path, scene_name: str, send, quality: str = "low") -> tuple[bool, str]:
+        cache_dir = str(self.glyph_cache.root) if self.glyph_cache else None
+        if cache_dir:
+            write_manim_config(str(script_path.parent), cache_dir, self.backend)
+        command = build_manim_command(str(script_path), scene_name, self.backend, cpus=self.cpus, memory=self.memory,
+                                      cache_dir=cache_dir, quality=quality)
+        logging.info(Fore.GREEN + f"Executing Manim script: {' '.join(command)}")
+        process = await asyncio.create_subprocess_exec(
+            *command, cwd=script_path.parent,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+        )
+        stderr: List[str] = []
+
+        async def pump():
+            async for raw in process.stderr:
+                line = raw.decode("utf-8", errors="replace").rstrip("\n")
+                stderr.append(line)
+                await send({"type": "stderr", "line": line})
+
+        try:
+            await asyncio.wait_for(asyncio.gather(pump(), process.wait()), RENDER_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            await _stop(process)
+            return False, "Timeout expired"
+        except (asyncio.CancelledError, ConnectionResetError):
+            await _stop(process)
+            raise
+        if process.returncode == 0:
+            return True, ""
+        return False, "\n".join(stderr) or "Unknown error"
+
+    async def video(self, request: web.Request) -> web.StreamResponse:
+        entry = self.videos.get(request.match_info["render_id"])
+        if entry is None:
+            raise web.HTTPNotFound(text="Unknown render")
+        return web.FileResponse(entry["path"])
+
+    async def release(self, request: web.Request) -> web.Response:
+        entry = self.videos.pop(request.match_info["render_id"], None)
+        if entry is not None:
+            shutil.rmtree(entry["dir"], ignore_errors=True)
+        return web.json_response({"released": entry is not None})
+
+async def _stop(process: asyncio.subprocess.Process) -> None:
+    """Like utils._stop: SIGTERM reaches the container through `docker run` (SIGKILL would not), then kill."""
+    process.terminate()
+    try:
+        await asyncio.wait_for(process.wait(), 10)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+
+def create_app(capacity: int, backend: str, workdir: str, glyph_cache: GlyphCache = None,
+               cpus: float = None, memory: str = None) -> web.Application:
+    agent = RenderAgent(capacity, backend, workdir, glyph_cache, cpus, memory)
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app["agent"] = agent
+
+    async def health(request: web.Request) -> web.Response:
+        return web.json_response(agent.health())
+
+    app.router.add_get("/health", health)
+    app.router.add_post("/render", agent.render)
+    app.router.add_get("/renders/{render_id}/video", agent.video)
+    app.router.add_delete("/renders/{render_id}", agent.release)
+    return app
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Render agent: renders Manim scripts received over HTTP.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--capacity", type=int, default=1, help="Concurrent renders on this host")
+    parser.add_argument("--backend", choices=["docker", "local"], default="docker")
+    parser.add_argument("--cpus", type=float, default=float(os.getenv("RENDER_CPUS", "2")),
+                        help="CPU limit per render container")
+    parser.add_argument("--memory", default=os.getenv("RENDER_MEMORY", "2g"), help="Memory limit per render container")
+    parser.add_argument("--workdir", default=str(Path(tempfile.gettempdir()) / "render-agent"))
+    parser.add_argument("--glyph-cache", help="Directory shared by all renders on this host for tex/text SVGs")
+    parser.add_argument("--glyph-cache-bytes", type=int, default=DEFAULT_MAX_BYTES)
+    args = parser.parse_args(argv)
+
+    glyph_cache = GlyphCache(args.glyph_cache, args.glyph_cache_bytes) if args.glyph_cache else None
+    web.run_app(create_app(args.capacity, args.backend, args.workdir, glyph_cache, args.cpus, args.memory),
+                host=args.host, port=args.port)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
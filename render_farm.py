@@ -0,0 +1,203 @@
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set
+import requests
+from colorama import init, Fore
+from utils import rendered_video_path, QUALITY_DIRS
+
+init(autoreset=True)
+
+RENDER_TIMEOUT_SECONDS = 300
+
+class AgentInfo:
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.agent_id = ""
+        self.capacity = 1
+        self.active = 0
+        self.in_flight = 0
+        self.healthy = False
+        self.last_seen = 0.0
+
+    @property
+    def load(self) -> float:
+        return max(self.active, self.in_flight) / max(1, self.capacity)
+
+@contextmanager
+def _closed_on(cancel, response):
+    """Close the streaming response once `cancel` is set; the agent kills the render when its client goes away."""
+    if cancel is None:
+        yield
+        return
+    done = threading.Event()
+
+    def watch():
+        while not done.wait(0.5):
+            if cancel.is_set():
+                response.close()
+                return
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        yield
+    finally:
+        done.set()
+        watcher.join()
+
+MESSAGE_FIELDS = {"stderr": ("line",), "result": ("success",)}
+
+def _parse_message(raw: bytes) -> Dict[str, object]:
+    """One NDJSON line from an agent; a malformed or cut-off line counts as losing the agent."""
+    try:
+        message = json.loads(raw)
+        required = MESSAGE_FIELDS.get(message["type"], ())
+    except (ValueError, KeyError, TypeError) as e:
+        raise ConnectionError(f"Malformed message from render agent: {raw[:200]!r}") from e
+    if message["type"] == "result" and message.get("success"):
+        required += ("render_id",)
+    if any(field not in message for field in required):
+        raise ConnectionError(f"Malformed message from render agent: {raw[:200]!r}")
+    return message
+
+class RenderFarm:
+    """Sends renders to the least-loaded healthy render agent, retrying elsewhere on agent loss."""
+
+    def __init__(self, agent_urls: List[str], heartbeat_interval: float = 5, max_retries: int = 3):
+        self.agents: Dict[str, AgentInfo] = {url.rstrip("/"): AgentInfo(url) for url in agent_urls}
+        self.heartbeat_interval = heartbeat_interval
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        # Only the heartbeat thread uses this; requests.Session is not thread-safe, so renders open their own.
+        self.session = requests.Session()
+        self._stop = threading.Event()
+        self._poll_all()
+        self._thread = threading.Thread(target=self._heartbeat_loop, daemon=True, name="render-farm-heartbeat")
+        self._thread.start()
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(self.heartbeat_interval):
+            self._poll_all()
+
+    def _poll_all(self, session: requests.Session = None) -> None:
+        for agent in list(self.agents.values()):
+            self._poll(agent, session or self.session)
+
+    def _poll(self, agent: AgentInfo, session: requests.Session) -> None:
+        try:
+            health = session.get(f"{agent.url}/health", timeout=2).json()
+            with self.lock:
+                if not agent.healthy:
+                    logging.info(Fore.GREEN + f"Render agent {agent.url} is up ({health['capacity']} slots)")
+                agent.agent_id = health["agent_id"]
+                agent.capacity = health["capacity"]
+                agent.active = health["active"]
+                agent.healthy = True
+                agent.last_seen = time.time()
+        except (requests.RequestException, ValueError, KeyError):
+            self._mark_down(agent)
+
+    def _mark_down(self, agent: AgentInfo) -> None:
+        with self.lock:
+            if agent.healthy:
+                logging.warning(Fore.YELLOW + f"Render agent {agent.url} is down")
+            agent.healthy = False
+
+    def _pick(self, exclude: Set[str]) -> Optional[AgentInfo]:
+        with self.lock:
+            candidates = [a for a in self.agents.values() if a.healthy and a.url not in exclude]
+            if not candidates:
+                return None
+            agent = min(candidates, key=lambda a: (a.load, a.in_flight))
+            agent.in_flight += 1
+            return agent
+
+    def status(self) -> List[Dict[str, object]]:
+        with self.lock:
+            return [
+                {"url": a.url, "healthy": a.healthy, "capacity": a.capacity,
+                 "active": a.active, "in_flight": a.in_flight, "last_seen": a.last_seen}
+                for a in self.agents.values()
+            ]
+
+    def render(self, script_path: str, scene_name: str, priority: int = 1, cancel=None,
+               quality: str = "low") -> tuple[bool, str]:
+        """Same contract as utils.run_manim_script; the mp4 lands where a local render would put it."""
+        script = Path(script_path).read_text(encoding="utf-8")
+        with requests.Session() as session:
+            return self._render(session, script, script_path, scene_name, priority, cancel, quality)
+
+    def _render(self, session: requests.Session, script: str, script_path: str, scene_name: str,
+                priority: int, cancel, quality: str) -> tuple[bool, str]:
+        tried: Set[str] = set()
+        for attempt in range(1, self.max_retries + 1):
+            if cancel is not None and cancel.is_set():
+                return False, "Cancelled"
+            agent = self._pick(tried)
+            if agent is None:
+                tried.clear()
+                time.sleep(self.heartbeat_interval)
+                self._poll_all(session)
+                continue
+            try:
+                return self._render_on(session, agent, script, script_path, scene_name, priority, cancel, quality)
+            except (requests.RequestException, ConnectionError) as e:
+                if cancel is not None and cancel.is_set():
+                    return False, "Cancelled"
+                logging.warning(Fore.YELLOW + f"Render attempt {attempt} lost agent {agent.url}: {str(e)}")
+                tried.add(agent.url)
+                self._mark_down(agent)
+            finally:
+                with self.lock:
+                    agent.in_flight -= 1
+        return False, "No render agent available"
+
+    def _render_on(self, session: requests.Session, agent: AgentInfo, script: str, script_path: str, scene_name: str,
+                   priority: int = 1, cancel=None, quality: str = "low") -> tuple[bool, str]:
+        logging.info(Fore.GREEN + f"Rendering {scene_name} on {agent.url}")
+        stderr: List[str] = []
+        with session.post(
+            f"{agent.url}/render", json={"script": script, "scene_name": scene_name, "quality": quality, "priority": priority},
+            stream=True, timeout=(5, RENDER_TIMEOUT_SECONDS + 60)
+        ) as response, _closed_on(cancel, response):
+            if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+                # The agent is fine; it rejected this request (e.g. a bad quality value).
+                return False, f"Render agent rejected the request ({response.status_code}): {response.text[:500]}"
+            response.raise_for_status()
+            try:
+                for raw in response.iter_lines():
+                    if not raw:
+                        continue
+                    message = _parse_message(raw)
+                    if message["type"] == "stderr":
+                        stderr.append(message["line"])
+                    elif message["type"] == "result":
+                        if not message["success"]:
+                            return False, message.get("error") or "\n".join(stderr) or "Unknown error"
+                        self._download(session, agent, message["render_id"], rendered_video_path(script_path, scene_name, QUALITY_DIRS[quality]))
+                        return True, "Success"
+            except Exception:
+                if cancel is not None and cancel.is_set():
+                    return False, "Cancelled"
+                raise
+        if cancel is not None and cancel.is_set():
+            return False, "Cancelled"
+        raise ConnectionError("Render stream ended without a result")
+
+    def _download(self, session: requests.Session, agent: AgentInfo, render_id: str, destination: str) -> None:
+        Path(destination).parent.mkdir(parents=True, exist_ok=True)
+        with session.get(f"{agent.url}/renders/{render_id}/video", stream=True, timeout=60) as response:
+            response.raise_for_status()
+            with open(destination, "wb") as f:
+                for chunk in response.iter_content(chunk_size=1 << 20):
+                    f.write(chunk)
+        session.delete(f"{agent.url}/renders/{render_id}", timeout=10)
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.session.close()
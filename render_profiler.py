@@ -0,0 +1,212 @@
+import sys
+import json
+import html
+import zlib
+import logging
+import argparse
+from pathlib import Path
+from collections import Counter
+from typing import Dict, Any, List, Optional
+from colorama import init, Fore
+from utils import PROFILE_WRAPPER, extract_scene_name, run_manim_script
+
+init(autoreset=True)
+
+RAW_PROFILE = "_manim_profile.json"
+
+WRAPPER_SOURCE = '''
+import os
+import sys
+import json
+import time
+import threading
+import collections
+from manim import Scene
+
+SAMPLE_INTERVAL = 0.005
+OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "{raw_profile}")
+plays = []
+stacks = collections.Counter()
+current = {{"index": None}}
+done = threading.Event()
+main_thread = threading.main_thread().ident
+
+def sampler():
+    while not done.wait(SAMPLE_INTERVAL):
+        frame = sys._current_frames().get(main_thread)
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{{code.co_name}} ({{os.path.basename(code.co_filename)}}:{{code.co_firstlineno}})")
+            frame = frame.f_back
+        stacks[";".join(reversed(stack))] += 1
+        if current["index"] is not None:
+            plays[current["index"]]["samples"] += 1
+
+def describe(args):
+    animations, types, family = [], collections.Counter(), 0
+    for arg in args:
+        animations.append("animate" if type(arg).__name__ == "_AnimationBuilder" else type(arg).__name__)
+        mobject = getattr(arg, "mobject", None)
+        if mobject is not None:
+            members = mobject.get_family()
+            family += len(members)
+            types.update(type(m).__name__ for m in members)
+    return animations, dict(types), family
+
+original_play = Scene.play
+
+def play(self, *args, **kwargs):
+    animations, types, family = describe(args)
+    record = {{"index": len(plays), "animations": animations, "mobject_types": types,
+              "family_size": family, "samples": 0}}
+    plays.append(record)
+    current["index"] = record["index"]
+    start, video_start = time.perf_counter(), getattr(self.renderer, "time", 0.0)
+    try:
+        return original_play(self, *args, **kwargs)
+    finally:
+        record["seconds"] = time.perf_counter() - start
+        record["video_seconds"] = getattr(self.renderer, "time", 0.0) - video_start
+        current["index"] = None
+
+Scene.play = play
+
+if __name__ == "__main__":
+    threading.Thread(target=sampler, daemon=True).start()
+    from manim.__main__ import main
+    sys.argv = ["manim"] + sys.argv[1:]
+    started = time.perf_counter()
+    try:
+        main()
+    finally:
+        done.set()
+        with open(OUTPUT, "w", encoding="utf-8") as f:
+            json.dump({{"interval": SAMPLE_INTERVAL, "total_seconds": time.perf_counter() - started,
+                       "plays": plays, "stacks": dict(stacks)}}, f)
+'''
+
+def write_profile_wrapper(script_dir: str) -> str:
+    """Drop the profiling entry point next to the script so it is visible inside the container too."""
+    (Path(script_dir) / RAW_PROFILE).unlink(missing_ok=True)
+    path = Path(script_dir) / PROFILE_WRAPPER
+    path.write_text(WRAPPER_SOURCE.format(raw_profile=RAW_PROFILE), encoding="utf-8")
+    return str(path)
+
+def _flamegraph_svg(stacks: Dict[str, int], title: str, width: int = 1200, row: int = 16) -> str:
+    """Minimal self-contained flamegraph (hover a frame for its sample count)."""
+    tree: Dict[str, Any] = {"name": "all", "value": 0, "children": {}}
+    for stack, count in stacks.items():
+        tree["value"] += count
+        node = tree
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"name": frame, "value": 0, "children": {}})
+            node["value"] += count
+
+    def depth(node):
+        return 1 + max((depth(child) for child in node["children"].values()), default=0)
+
+    height = (depth(tree) + 2) * row
+    total = max(tree["value"], 1)
+    rects: List[str] = []
+
+    def layout(node, x: float, level: int):
+        w = node["value"] / total * width
+        if w < 0.3:
+            return
+        y = height - (level + 1) * row
+        hue = zlib.crc32(node["name"].encode()) % 60
+        label = html.escape(node["name"])
+        text = label[:int(w / 7)] if w > 21 else ""
+        pct = node["value"] / total * 100
+        rects.append(
+            f'<g><title>{label} ({node["value"]} samples, {pct:.1f}%)</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row - 1}" fill="hsl({hue},90%,60%)"/>'
+            f'<text x="{x + 3:.1f}" y="{y + row - 4}" font-size="11" font-family="monospace">{text}</text></g>'
+        )
+        for child in sorted(node["children"].values(), key=lambda c: c["name"]):
+            layout(child, x, level + 1)
+            x += child["value"] / total * width
+
+    layout(tree, 0.0, 0)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">'
+        f'<text x="4" y="14" font-size="13" font-family="sans-serif">{html.escape(title)}</text>'
+        + "".join(rects) + "</svg>\n"
+    )
+
+def collect_profile(script_dir: str, output_dir: str, title: str = "manim render") -> Optional[Dict[str, Any]]:
+    """Turn the wrapper's raw samples into a flamegraph, folded stacks and a per-play timing table."""
+    raw_path = Path(script_dir) / RAW_PROFILE
+    if not raw_path.exists():
+        logging.warning(Fore.YELLOW + f"No profile written in {script_dir}")
+        return None
+    with open(raw_path, encoding="utf-8") as f:
+        raw = json.load(f)
+
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    with open(output / "stacks.folded", "w", encoding="utf-8") as f:
+        f.writelines(f"{stack} {count}\n" for stack, count in raw["stacks"].items())
+    (output / "flamegraph.svg").write_text(_flamegraph_svg(raw["stacks"], title), encoding="utf-8")
+
+    by_type: Counter = Counter()
+    for play in raw["plays"]:
+        family = sum(play["mobject_types"].values())
+        for name, count in play["mobject_types"].items():
+            by_type[name] += play.get("seconds", 0.0) * count / family
+
+    report = {
+        "total_seconds": raw["total_seconds"],
+        "play_seconds": sum(p.get("seconds", 0.0) for p in raw["plays"]),
+        "plays": raw["plays"],
+        "seconds_by_mobject_type": dict(by_type.most_common()),
+        "flamegraph": str((output / "flamegraph.svg").resolve()),
+        "folded_stacks": str((output / "stacks.folded").resolve()),
+    }
+    with open(output / "timings.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+def format_timing_table(report: Dict[str, Any], limit: int = 15) -> str:
+    lines = [
+        f"Render {report['total_seconds']:.1f}s, {report['play_seconds']:.1f}s inside {len(report['plays'])} play() calls",
+        f"{'#':>4} {'wall s':>8} {'video s':>8} {'s/video s':>9} {'family':>7}  animations -> top mobject types",
+    ]
+    slowest = sorted(report["plays"], key=lambda p: p.get("seconds", 0.0), reverse=True)[:limit]
+    for play in slowest:
+        seconds, video = play.get("seconds", 0.0), play.get("video_seconds", 0.0)
+        types = ", ".join(f"{name}x{count}" for name, count in
+                          sorted(play["mobject_types"].items(), key=lambda t: -t[1])[:3])
+        lines.append(
+            f"{play['index']:>4} {seconds:>8.2f} {video:>8.2f} {seconds / video if video else 0:>9.1f} "
+            f"{play['family_size']:>7}  {', '.join(play['animations'])[:40]} -> {types}"
+        )
+    lines.append("Time by mobject type: " + ", ".join(
+        f"{name} {seconds:.1f}s" for name, seconds in list(report["seconds_by_mobject_type"].items())[:8]
+    ))
+    return "\n".join(lines)
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Render a Manim script under the sampling profiler.")
+    parser.add_argument("script")
+    parser.add_argument("scene", nargs="?", help="Scene class (default: first Scene in the script)")
+    parser.add_argument("--output", default="profile", help="Directory for flamegraph.svg, stacks.folded, timings.json")
+    parser.add_argument("--backend", choices=["docker", "local"], default="docker")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    script = Path(args.script).resolve()
+    scene = args.scene or extract_scene_name(script.read_text(encoding="utf-8"))
+    success, result = run_manim_script(str(script), scene, backend=args.backend, profile_dir=args.output)
+    output = Path(args.output).resolve()
+    if (output / "timings.json").exists():
+        print(f"Timing table: {output / 'timings.json'}")
+        print(f"Flamegraph: {output / 'flamegraph.svg'}")
+    if not success:
+        print(Fore.RED + result)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
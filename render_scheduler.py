@@ -0,0 +1,113 @@
+import os
+import time
+import heapq
+import logging
+import itertools
+import threading
+import statistics
+from collections import deque
+from typing import Dict, Any, Optional
+from colorama import init, Fore
+from utils import run_manim_script
+from glyph_cache import PRUNE_EVERY
+
+init(autoreset=True)
+
+PRIORITY_FIX = 0
+PRIORITY_FIRST = 1
+PRIORITY_SPECULATIVE = 2
+
+class RenderScheduler:
+    """Bounds concurrent local renders to a CPU budget and hands free slots out by priority.
+
+    Lower priority values go first, FIFO within a priority, so fix-iteration renders of
+    workflows already in flight overtake the first render of newly started jobs.
+    """
+
+    def __init__(self, cpu_budget: float = None, cpus_per_render: float = 2.0,
+                 memory: str = "2g", backend: str = "docker", glyph_cache=None, profile_dir: str = None):
+        self.cpu_budget = cpu_budget or os.cpu_count() or 1
+        self.cpus_per_render = cpus_per_render
+        self.memory = memory
+        self.backend = backend
+        self.glyph_cache = glyph_cache
+        self.profile_dir = profile_dir
+        self.slots = max(1, int(self.cpu_budget // cpus_per_render))
+        self.active = 0
+        self._cond = threading.Condition()
+        self._waiting: list[tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._waits: deque = deque(maxlen=1000)
+        self._durations: deque = deque(maxlen=1000)
+        self.completed = 0
+        logging.info(f"Render scheduler: {self.slots} slots of {cpus_per_render} CPUs / {memory}")
+
+    def _acquire(self, priority: int, cancel=None) -> Optional[float]:
+        ticket = (priority, next(self._sequence))
+        start = time.perf_counter()
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            while self.active >= self.slots or self._waiting[0] != ticket:
+                self._cond.wait(timeout=0.5 if cancel is not None else None)
+                if cancel is not None and cancel.is_set():
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                    return None
+            heapq.heappop(self._waiting)
+            self.active += 1
+            self._cond.notify_all()
+        waited = time.perf_counter() - start
+        self._waits.append(waited)
+        return waited
+
+    def _release(self, duration: float) -> None:
+        with self._cond:
+            self.active -= 1
+            self.completed += 1
+            self._durations.append(duration)
+            self._cond.notify_all()
+
+    def render(self, script_path: str, scene_name: str, priority: int = PRIORITY_FIRST, cancel=None,
+               quality: str = "low") -> tuple[bool, str]:
+        waited = self._acquire(priority, cancel)
+        if waited is None:
+            return False, "Cancelled"
+        if waited > 1:
+            logging.info(Fore.YELLOW + f"Render of {scene_name} waited {waited:.1f}s for a slot (priority {priority})")
+        start = time.perf_counter()
+        try:
+            return run_manim_script(
+                script_path, scene_name, backend=self.backend,
+                cpus=self.cpus_per_render, memory=self.memory,
+                cache_dir=str(self.glyph_cache.root) if self.glyph_cache else None,
+                profile_dir=self._profile_path(scene_name), cancel=cancel, quality=quality
+            )
+        finally:
+            self._release(time.perf_counter() - start)
+            if self.glyph_cache and self.completed % PRUNE_EVERY == 0:
+                self.glyph_cache.prune()
+
+    def _profile_path(self, scene_name: str) -> str:
+        if not self.profile_dir:
+            return None
+        return os.path.join(self.profile_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{scene_name}-{next(self._sequence)}")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            depth_by_priority: Dict[int, int] = {}
+            for priority, _ in self._waiting:
+                depth_by_priority[priority] = depth_by_priority.get(priority, 0) + 1
+            waits = sorted(self._waits)
+            durations = list(self._durations)
+            return {
+                "slots": self.slots,
+                "active": self.active,
+                "queue_depth": len(self._waiting),
+                "queue_depth_by_priority": depth_by_priority,
+                "completed": self.completed,
+                "wait_seconds_p50": waits[len(waits) // 2] if waits else 0.0,
+                "wait_seconds_p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+                "wait_seconds_max": waits[-1] if waits else 0.0,
+                "render_seconds_mean": statistics.fmean(durations) if durations else 0.0,
+            }
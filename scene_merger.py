@@ -0,0 +1,255 @@
+import ast
+import copy
+import logging
+from typing import Dict, List, Set, Tuple
+
+TRANSITION = """
+if self.mobjects:
+    self.play(*[FadeOut(mob) for mob in self.mobjects], run_time={run_time})
+"""
+
+class SceneMergeError(ValueError):
+    """Raised when scene scripts cannot be merged deterministically."""
+
+class _Renamer(ast.NodeTransformer):
+    """Consistently renames identifiers (and `self.<method>` attributes) within a subtree."""
+
+    def __init__(self, names: Dict[str, str], methods: Dict[str, str] = None):
+        self.names = names
+        self.methods = methods or {}
+
+    def visit_Name(self, node: ast.Name) -> ast.Name:
+        node.id = self.names.get(node.id, node.id)
+        return node
+
+    def visit_arg(self, node: ast.arg) -> ast.arg:
+        node.arg = self.names.get(node.arg, node.arg)
+        return node
+
+    def _rename_definition(self, node):
+        node.name = self.names.get(node.name, node.name)
+        self.generic_visit(node)
+        return node
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = _rename_definition
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler) -> ast.ExceptHandler:
+        if node.name:
+            node.name = self.names.get(node.name, node.name)
+        self.generic_visit(node)
+        return node
+
+    def visit_Global(self, node):
+        node.names = [self.names.get(name, name) for name in node.names]
+        return node
+
+    visit_Nonlocal = visit_Global
+
+    def visit_Attribute(self, node: ast.Attribute) -> ast.Attribute:
+        self.generic_visit(node)
+        if isinstance(node.value, ast.Name) and node.value.id == "self":
+            node.attr = self.methods.get(node.attr, node.attr)
+        return node
+
+def _is_scene_class(node: ast.stmt) -> bool:
+    return isinstance(node, ast.ClassDef) and any(
+        ast.unparse(base).split(".")[-1].endswith("Scene") for base in node.bases
+    )
+
+def _is_main_guard(node: ast.stmt) -> bool:
+    return isinstance(node, ast.If) and "__name__" in ast.unparse(node.test)
+
+def _defined_names(node: ast.stmt) -> List[str]:
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return [node.name]
+    if isinstance(node, (ast.Assign, ast.AnnAssign)):
+        targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+        return [n.id for t in targets for n in ast.walk(t) if isinstance(n, ast.Name)]
+    return []
+
+def _unique(name: str, suffix: int, taken: Set[str]) -> str:
+    candidate = f"{name}_{suffix}"
+    while candidate in taken:
+        suffix += 1
+        candidate = f"{name}_{suffix}"
+    return candidate
+
+def _scope_names(body: List[ast.stmt]) -> Tuple[Set[str], Set[str]]:
+    """Names bound anywhere in a function body, and names it reads without binding."""
+    bound, loaded = set(), set()
+    for node in ast.walk(ast.Module(body=body, type_ignores=[])):
+        if isinstance(node, ast.Name):
+            (bound if isinstance(node.ctx, (ast.Store, ast.Del)) else loaded).add(node.id)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            bound.add(node.name)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            bound.add(node.name)
+    bound.discard("self")
+    return bound, loaded - bound
+
+class _Merger:
+    def __init__(self):
+        self.imports: List[ast.stmt] = []
+        self.toplevel: List[ast.stmt] = []
+        self.definitions: Dict[str, str] = {}
+        self.seen: Set[str] = set()
+        self.base: str = None
+        self.class_attrs: Dict[str, ast.stmt] = {}
+        self.methods: Dict[str, str] = {}
+        self.method_nodes: List[ast.FunctionDef] = []
+        self.sections: List[List[ast.stmt]] = []
+
+    def add_module(self, index: int, tree: ast.Module) -> None:
+        renames = self._module_renames(index, tree)
+        tree = _Renamer(renames).visit(copy.deepcopy(tree))
+        scene_classes = [node for node in tree.body if _is_scene_class(node)]
+        if not scene_classes:
+            raise SceneMergeError(f"Scene {index + 1} defines no Scene class")
+
+        for node in tree.body:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                self._add_unique(self.imports, node)
+            elif _is_scene_class(node):
+                self._add_scene_class(index, node)
+            elif _is_main_guard(node) or (isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)):
+                continue
+            else:
+                for name in _defined_names(node):
+                    self.definitions[name] = ast.unparse(node)
+                self._add_unique(self.toplevel, node)
+
+    def _module_renames(self, index: int, tree: ast.Module) -> Dict[str, str]:
+        """Rename top-level helpers that clash with a different earlier definition, until no clash remains."""
+        renames: Dict[str, str] = {}
+        while True:
+            renamed = _Renamer(renames).visit(copy.deepcopy(tree))
+            clashes = [
+                original
+                for node, original_node in zip(renamed.body, tree.body)
+                if not _is_scene_class(node)
+                for name, original in zip(_defined_names(node), _defined_names(original_node))
+                if original not in renames
+                and name in self.definitions and self.definitions[name] != ast.unparse(node)
+            ]
+            if not clashes:
+                return renames
+            taken = set(self.definitions) | set(renames.values())
+            for name in clashes:
+                renames[name] = _unique(name, index + 1, taken)
+                taken.add(renames[name])
+
+    def _add_unique(self, target: List[ast.stmt], node: ast.stmt) -> None:
+        source = ast.unparse(node)
+        if source not in self.seen:
+            self.seen.add(source)
+            target.append(node)
+
+    def _add_scene_class(self, index: int, node: ast.ClassDef) -> None:
+        base = ", ".join(ast.unparse(b) for b in node.bases)
+        if self.base is not None and base != self.base:
+            raise SceneMergeError(f"Scenes use different base classes: {self.base} and {base}")
+        self.base = base
+
+        construct, methods = None, {}
+        for stmt in node.body:
+            if isinstance(stmt, ast.FunctionDef) and stmt.name == "construct":
+                construct = stmt
+            elif isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                methods[stmt.name] = stmt
+            elif isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant):
+                continue
+            else:
+                self._add_class_attr(stmt)
+        if construct is None:
+            raise SceneMergeError(f"{node.name} has no construct method")
+
+        method_renames = {"setup": _unique("setup_section", index + 1, set(self.methods))} if "setup" in methods else {}
+        while True:
+            renamer = _Renamer({}, method_renames)
+            renamed = {name: renamer.visit(copy.deepcopy(method)) for name, method in methods.items()}
+            clashes = [
+                name for name, method in renamed.items()
+                if name not in method_renames and name in self.methods and self.methods[name] != ast.unparse(method)
+            ]
+            if not clashes:
+                break
+            for name in clashes:
+                method_renames[name] = _unique(name, index + 1, set(self.methods) | set(method_renames.values()))
+        for name, method in renamed.items():
+            method.name = method_renames.get(name, name)
+            if method.name not in self.methods:
+                self.methods[method.name] = ast.unparse(method)
+                self.method_nodes.append(method)
+
+        body = renamer.visit(construct).body
+        if "setup" in method_renames:
+            body = ast.parse(f"self.{method_renames['setup']}()").body + body
+        self.sections.append(body)
+
+    def _add_class_attr(self, stmt: ast.stmt) -> None:
+        for name in _defined_names(stmt) or [ast.unparse(stmt)]:
+            existing = self.class_attrs.get(name)
+            if existing is not None and ast.unparse(existing) != ast.unparse(stmt):
+                raise SceneMergeError(f"Conflicting class attribute {name}")
+            self.class_attrs[name] = stmt
+
+    def build(self, class_name: str, transitions: bool, transition_time: float) -> str:
+        sections = self._rename_locals()
+        construct_body: List[ast.stmt] = []
+        for i, body in enumerate(sections):
+            if i > 0:
+                separator = TRANSITION.format(run_time=transition_time) if transitions else "self.clear()"
+                construct_body += ast.parse(separator).body
+            construct_body += body
+
+        construct = ast.parse("def construct(self):\n    pass").body[0]
+        construct.body = construct_body
+        scene = ast.parse(f"class {class_name}({self.base or 'Scene'}):\n    pass").body[0]
+        scene.body = list(dict.fromkeys(self.class_attrs.values())) + self.method_nodes + [construct]
+
+        imports = list(self.imports)
+        if not any(isinstance(i, ast.ImportFrom) and i.module == "manim"
+                   and any(a.name == "*" for a in i.names) for i in imports):
+            imports.insert(0, ast.parse("from manim import *").body[0])
+        module = ast.Module(body=imports + self.toplevel + [scene], type_ignores=[])
+        return ast.unparse(ast.fix_missing_locations(module)) + "\n"
+
+    def _rename_locals(self) -> List[List[ast.stmt]]:
+        """Give each section's locals names that no other section binds or reads, so closures
+        such as updaters and always_redraw lambdas keep pointing at their own scene's objects."""
+        scopes = [_scope_names(body) for body in self.sections]
+        reserved = set().union(*(loaded for _, loaded in scopes)) | set(self.definitions)
+        taken: Set[str] = set()
+        every_local = set().union(*(bound for bound, _ in scopes))
+        sections = []
+        for i, (body, (bound, _)) in enumerate(zip(self.sections, scopes)):
+            renames = {}
+            for name in sorted(bound):
+                if name in taken or name in reserved:
+                    renames[name] = _unique(name, i + 1, taken | reserved | every_local)
+                taken.add(renames.get(name, name))
+            module = _Renamer(renames).visit(ast.Module(body=body, type_ignores=[]))
+            sections.append(module.body)
+        return sections
+
+def merge_scenes(scripts: List[str], class_name: str = "CombinedScene",
+                 transitions: bool = True, transition_time: float = 0.5) -> str:
+    """Merge standalone Manim scene scripts into one script with a single Scene that plays them in order."""
+    if not scripts:
+        raise SceneMergeError("No scenes to merge")
+    merger = _Merger()
+    for index, script in enumerate(scripts):
+        try:
+            tree = ast.parse(script)
+        except SyntaxError as e:
+            raise SceneMergeError(f"Scene {index + 1} does not parse: {e}") from e
+        merger.add_module(index, tree)
+    merged = merger.build(class_name, transitions, transition_time)
+    try:
+        compile(merged, "<merged>", "exec")
+    except SyntaxError as e:
+        raise SceneMergeError(f"Merged script does not compile: {e}") from e
+    logging.info(f"Merged {len(scripts)} scenes into {class_name} ({len(merged)} chars)")
+    return merged
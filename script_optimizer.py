@@ -0,0 +1,371 @@
+import ast
+import sys
+import copy
+import time
+import logging
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from colorama import init, Fore
+from utils import extract_scene_name, run_manim_script, rendered_video_path, ffmpeg_command
+from workspace import render_workspace
+
+init(autoreset=True)
+
+TIMING_TOLERANCE = 0.05
+
+# Animations whose mobject is invisible (or already shown, for the fade-outs) at alpha 0, so
+# starting them all at once inside a lag_ratio=1 LaggedStart looks the same as playing them one by one.
+BATCHABLE_ANIMATIONS = {
+    "Create", "FadeIn", "Write", "DrawBorderThenFill", "GrowFromCenter", "GrowFromPoint",
+    "GrowFromEdge", "GrowArrow", "SpinInFromNothing", "FadeOut", "Uncreate", "Unwrite",
+}
+# Calls allowed on mobjects created outside the loop: collecting this iteration's mobject into a group.
+COLLECTING_METHODS = {"add", "append", "extend"}
+TRANSFORMS = {"Transform", "ReplacementTransform", "TransformFromCopy", "FadeTransform"}
+
+def _play_call(stmt: ast.stmt, method: str = "play") -> Optional[ast.Call]:
+    if (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call)
+            and isinstance(stmt.value.func, ast.Attribute) and stmt.value.func.attr == method
+            and isinstance(stmt.value.func.value, ast.Name) and stmt.value.func.value.id == "self"):
+        return stmt.value
+    return None
+
+def _number(node: Optional[ast.expr]) -> Optional[float]:
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return float(node.value)
+    return None
+
+def _keyword(call: ast.Call, name: str) -> Optional[ast.keyword]:
+    return next((k for k in call.keywords if k.arg == name), None)
+
+def _single_animation(play: Optional[ast.Call]) -> Optional[Tuple[ast.Call, float]]:
+    """The one animation of `self.play(Anim(...), run_time=<const>)` and its constant run time."""
+    if play is None or len(play.args) != 1 or any(k.arg != "run_time" for k in play.keywords):
+        return None
+    anim = play.args[0]
+    if not (isinstance(anim, ast.Call) and isinstance(anim.func, ast.Name)) or any(
+            isinstance(a, ast.Starred) for a in anim.args):
+        return None
+    play_rt, anim_rt = _keyword(play, "run_time"), _keyword(anim, "run_time")
+    source = play_rt or anim_rt
+    run_time = _number(source.value) if source else 1.0
+    if run_time is None:
+        return None
+    return anim, run_time
+
+def _without_run_time(anim: ast.Call) -> ast.Call:
+    anim = copy.deepcopy(anim)
+    anim.keywords = [k for k in anim.keywords if k.arg != "run_time"]
+    return anim
+
+def _with_run_time(anim: ast.Call, run_time: float) -> ast.Call:
+    anim = _without_run_time(anim)
+    anim.keywords.append(ast.keyword(arg="run_time", value=ast.Constant(run_time)))
+    return anim
+
+def _self_play(*args: ast.expr, **keywords: ast.expr) -> ast.Expr:
+    return ast.Expr(ast.Call(
+        func=ast.Attribute(value=ast.Name("self", ast.Load()), attr="play", ctx=ast.Load()),
+        args=list(args), keywords=[ast.keyword(arg=k, value=v) for k, v in keywords.items()]
+    ))
+
+def _bound_names(node: ast.AST) -> set:
+    return {n.id for n in ast.walk(node) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)}
+
+class _Optimizer:
+    def __init__(self):
+        self.report = {"loops_batched": 0, "fadeouts_merged": 0, "transform_fadeouts_chained": 0}
+        self.counter = 0
+
+    def block(self, stmts: List[ast.stmt]) -> List[ast.stmt]:
+        result: List[ast.stmt] = []
+        for stmt in stmts:
+            for field in ("body", "orelse", "finalbody"):
+                if isinstance(getattr(stmt, field, None), list):
+                    setattr(stmt, field, self.block(getattr(stmt, field)))
+            for handler in getattr(stmt, "handlers", []):
+                handler.body = self.block(handler.body)
+            batched = self._batch_loop(stmt) if isinstance(stmt, ast.For) else None
+            result.extend(batched or [stmt])
+        return self._chain_plays(result)
+
+    def _batch_loop(self, loop: ast.For) -> Optional[List[ast.stmt]]:
+        """for ...: <fresh mobject>; self.play(Create(m), run_time=r)  ->  one lag_ratio=1 LaggedStart."""
+        single = _single_animation(_play_call(loop.body[-1])) if loop.body else None
+        if loop.orelse or single is None or single[0].func.id not in BATCHABLE_ANIMATIONS:
+            return None
+        anim, run_time = single
+        prelude = loop.body[:-1]
+        if any(isinstance(n, (ast.Break, ast.Continue, ast.Return, ast.Yield, ast.YieldFrom, ast.Await))
+               for stmt in loop.body for n in ast.walk(stmt)):
+            return None
+
+        local = _bound_names(loop.target)
+        for stmt in prelude:
+            if any(isinstance(n, ast.Name) and n.id == "self" for n in ast.walk(stmt)):
+                return None
+            if isinstance(stmt, (ast.Assign, ast.AugAssign, ast.AnnAssign)):
+                local |= _bound_names(stmt)
+            elif not (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call)
+                      and isinstance(stmt.value.func, ast.Attribute)
+                      and isinstance(stmt.value.func.value, ast.Name)
+                      and (stmt.value.func.value.id in local or stmt.value.func.attr in COLLECTING_METHODS)):
+                return None
+
+        targets = _bound_names(loop.target)
+        for arg in anim.args:
+            fresh = (isinstance(arg, ast.Call)
+                     or (isinstance(arg, ast.Name) and arg.id in local)
+                     or (isinstance(arg, ast.Subscript) and targets & {n.id for n in ast.walk(arg.slice)
+                                                                      if isinstance(n, ast.Name)}))
+            if not fresh:
+                return None
+
+        self.counter += 1
+        self.report["loops_batched"] += 1
+        acc = f"_batched_animations_{self.counter}"
+        append = ast.Expr(ast.Call(
+            func=ast.Attribute(value=ast.Name(acc, ast.Load()), attr="append", ctx=ast.Load()),
+            args=[_without_run_time(anim)], keywords=[]
+        ))
+        group = ast.Call(func=ast.Name("LaggedStart", ast.Load()),
+                         args=[ast.Starred(ast.Name(acc, ast.Load()), ast.Load())],
+                         keywords=[ast.keyword(arg="lag_ratio", value=ast.Constant(1.0))])
+        total = ast.BinOp(ast.Constant(run_time), ast.Mult(),
+                          ast.Call(func=ast.Name("len", ast.Load()), args=[ast.Name(acc, ast.Load())], keywords=[]))
+        return [
+            ast.Assign(targets=[ast.Name(acc, ast.Store())], value=ast.List(elts=[], ctx=ast.Load())),
+            ast.For(target=loop.target, iter=loop.iter, body=prelude + [append], orelse=[]),
+            ast.If(test=ast.Name(acc, ast.Load()), body=[_self_play(group, run_time=total)], orelse=[]),
+        ]
+
+    def _chain_plays(self, stmts: List[ast.stmt]) -> List[ast.stmt]:
+        """Consecutive FadeOut plays, optionally led by the Transform they clean up after, become one
+        Succession play: same order and durations, one animation segment instead of several."""
+        result, i = [], 0
+        while i < len(stmts):
+            first = _single_animation(_play_call(stmts[i]))
+            run = [first] if first and first[0].func.id in TRANSFORMS | {"FadeOut"} else []
+            j = i + 1
+            while run and j < len(stmts):
+                nxt = _single_animation(_play_call(stmts[j]))
+                if not nxt or nxt[0].func.id != "FadeOut":
+                    break
+                run.append(nxt)
+                j += 1
+            if len(run) < 2:
+                result.append(stmts[i])
+                i += 1
+                continue
+            if run[0][0].func.id in TRANSFORMS:
+                self.report["transform_fadeouts_chained"] += 1
+            self.report["fadeouts_merged"] += sum(1 for anim, _ in run if anim.func.id == "FadeOut") - 1
+            steps = [_with_run_time(anim, run_time) for anim, run_time in run]
+            result.append(_self_play(ast.Call(func=ast.Name("Succession", ast.Load()), args=steps, keywords=[])))
+            i = j
+        return result
+
+def _static_len(node: ast.expr) -> Optional[int]:
+    if isinstance(node, (ast.List, ast.Tuple)) and not any(isinstance(e, ast.Starred) for e in node.elts):
+        return len(node.elts)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "range" \
+            and all(_number(a) is not None for a in node.args) and 1 <= len(node.args) <= 3:
+        return len(range(*(int(_number(a)) for a in node.args)))
+    return None
+
+def _add(total: Dict[str, float], term: Dict[str, float], scale: float = 1.0) -> Dict[str, float]:
+    for key, value in term.items():
+        total[key] = total.get(key, 0.0) + value * scale
+    return total
+
+def _play_seconds(play: ast.Call, counts: Dict[str, Optional[Dict[str, float]]]) -> Optional[Dict[str, float]]:
+    run_time = _keyword(play, "run_time")
+    if run_time is not None:
+        value = run_time.value
+        if _number(value) is not None:
+            return {"": _number(value)}
+        if (isinstance(value, ast.BinOp) and isinstance(value.op, ast.Mult) and _number(value.left) is not None
+                and isinstance(value.right, ast.Call) and value.right.args
+                and isinstance(value.right.args[0], ast.Name) and counts.get(value.right.args[0].id) is not None):
+            return _add({}, counts[value.right.args[0].id], _number(value.left))
+        return None
+    durations = []
+    for anim in play.args:
+        if not isinstance(anim, ast.Call):
+            durations.append(1.0)
+        elif isinstance(anim.func, ast.Name) and anim.func.id == "Succession":
+            steps = [_keyword(step, "run_time") if isinstance(step, ast.Call) else None for step in anim.args]
+            durations.append(sum(_number(k.value) if k else 1.0 for k in steps))
+        else:
+            keyword = _keyword(anim, "run_time")
+            durations.append(_number(keyword.value) if keyword else 1.0)
+    return None if any(d is None for d in durations) else {"": max(durations, default=0.0)}
+
+def estimate_seconds(stmts: List[ast.stmt], counts: Dict[str, Optional[Dict[str, float]]] = None) -> Optional[Dict[str, float]]:
+    """Video duration of a block of play()/wait() calls as a linear form: the "" key holds constant
+    seconds, other keys are the source of a loop iterable whose length is only known at runtime.
+    Returns None when the duration depends on anything else (branches, while loops, nested unknowns)."""
+    counts = {} if counts is None else counts
+    total: Dict[str, float] = {}
+    for stmt in stmts:
+        play, wait = _play_call(stmt), _play_call(stmt, "wait")
+        if play is not None:
+            seconds = _play_seconds(play, counts)
+        elif wait is not None:
+            value = _number(wait.args[0]) if wait.args else 1.0
+            seconds = None if value is None else {"": value}
+        elif isinstance(stmt, ast.Assign) and isinstance(stmt.value, ast.List) and not stmt.value.elts \
+                and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name):
+            counts[stmt.targets[0].id] = {}
+            continue
+        elif isinstance(stmt, ast.For):
+            length = _static_len(stmt.iter)
+            iterations = {"": float(length)} if length is not None else {ast.unparse(stmt.iter): 1.0}
+            for inner_stmt in stmt.body:
+                call = inner_stmt.value if isinstance(inner_stmt, ast.Expr) else None
+                if (isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute) and call.func.attr == "append"
+                        and isinstance(call.func.value, ast.Name) and counts.get(call.func.value.id) is not None):
+                    _add(counts[call.func.value.id], iterations)
+            inner = estimate_seconds(stmt.body, counts)
+            if inner is None:
+                return None
+            if not any(inner.values()):
+                continue
+            if length is not None:
+                seconds = _add({}, inner, length)
+            elif set(inner) == {""}:
+                seconds = _add({}, iterations, inner[""])
+            else:
+                seconds = None
+        elif isinstance(stmt, ast.If) and isinstance(stmt.test, ast.Name) and stmt.test.id in counts:
+            seconds = estimate_seconds(stmt.body, counts)
+        elif any(_play_call(n) or _play_call(n, "wait") for n in ast.walk(stmt) if isinstance(n, ast.stmt)):
+            seconds = None
+        else:
+            continue
+        if seconds is None:
+            return None
+        _add(total, seconds)
+    return total
+
+def _construct_seconds(tree: ast.Module) -> Optional[Dict[str, float]]:
+    total: Dict[str, float] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef) and node.name == "construct":
+            seconds = estimate_seconds(node.body)
+            if seconds is None:
+                return None
+            _add(total, seconds)
+    return total
+
+def scene_seconds(source: str) -> Optional[float]:
+    """Estimated video length of a script, or None when it is not known before rendering."""
+    try:
+        seconds = _construct_seconds(ast.parse(source))
+    except SyntaxError:
+        return None
+    return seconds[""] if seconds is not None and set(seconds) <= {""} and seconds else None
+
+def _timing_drift(before: Dict[str, float], after: Dict[str, float]) -> float:
+    """Largest relative change of any term of the duration."""
+    return max(
+        (abs(after.get(k, 0.0) - before.get(k, 0.0)) / max(abs(before.get(k, 0.0)), 1e-9)
+         for k in set(before) | set(after)),
+        default=0.0
+    )
+
+def optimize_script(source: str, tolerance: float = TIMING_TOLERANCE) -> Tuple[str, Dict[str, Any]]:
+    """Batch per-item play() loops and chain consecutive fade-outs; returns the original source when
+    nothing applies, the result does not compile, or the estimated duration moves beyond tolerance."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        return source, {"skipped": f"does not parse: {e}"}
+    optimizer = _Optimizer()
+    before = _construct_seconds(tree)
+    optimized = ast.fix_missing_locations(ast.Module(body=optimizer.block(copy.deepcopy(tree).body), type_ignores=[]))
+    report: Dict[str, Any] = dict(optimizer.report)
+    if not any(report.values()):
+        return source, report
+
+    after = _construct_seconds(optimized)
+    report.update(estimated_seconds_before=before, estimated_seconds_after=after)
+    if before is not None and after is not None and _timing_drift(before, after) > tolerance:
+        report["rejected"] = f"estimated duration changed from {before} to {after}"
+        return source, report
+    code = ast.unparse(optimized) + "\n"
+    try:
+        compile(code, "<optimized>", "exec")
+    except SyntaxError as e:
+        report["rejected"] = f"does not compile: {e}"
+        return source, report
+    return code, report
+
+def _video_seconds(video: str, backend: str) -> Optional[float]:
+    result = subprocess.run(
+        ffmpeg_command("ffprobe", ["-v", "error", "-show_entries", "format=duration",
+                                   "-of", "default=noprint_wrappers=1:nokey=1", Path(video).name],
+                       Path(video).parent, backend),
+        capture_output=True, text=True, cwd=Path(video).parent
+    )
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        return None
+
+def measure(source: str, backend: str = "docker", tolerance: float = TIMING_TOLERANCE) -> Dict[str, Any]:
+    """Render the original and optimized script and compare render time, segments and video length."""
+    optimized, report = optimize_script(source, tolerance)
+    scene_name = extract_scene_name(source)
+    rows = {}
+    for label, code in (("original", source), ("optimized", optimized)):
+        with render_workspace(f"optimizer-{label}", 1) as workdir:
+            script_path = str(workdir / "scene.py")
+            Path(script_path).write_text(code, encoding="utf-8")
+            start = time.perf_counter()
+            success, result = run_manim_script(script_path, scene_name, backend=backend)
+            video = rendered_video_path(script_path, scene_name)
+            partials = Path(video).parent / "partial_movie_files" / scene_name
+            rows[label] = {
+                "success": success,
+                "render_seconds": time.perf_counter() - start,
+                "segments": len(list(partials.glob("*.mp4"))) if partials.is_dir() else 0,
+                "video_seconds": _video_seconds(video, backend) if success else None,
+                "error": "" if success else result[-500:],
+            }
+    original, faster = rows["original"]["video_seconds"], rows["optimized"]["video_seconds"]
+    report["renders"] = rows
+    report["timing_preserved"] = bool(original and faster and abs(faster - original) <= tolerance * original)
+    return report
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Batch sequential animations in a Manim script.")
+    parser.add_argument("script")
+    parser.add_argument("--output", help="Write the optimized script here (default: print it)")
+    parser.add_argument("--measure", action="store_true", help="Render both versions and compare")
+    parser.add_argument("--backend", choices=["docker", "local"], default="docker")
+    parser.add_argument("--tolerance", type=float, default=TIMING_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    source = Path(args.script).read_text(encoding="utf-8")
+    if args.measure:
+        report = measure(source, args.backend, args.tolerance)
+        for label, row in report.pop("renders").items():
+            print(f"{label:<10} render {row['render_seconds']:7.1f}s  segments {row['segments']:4d}  "
+                  f"video {row['video_seconds'] or 0:6.2f}s  {'ok' if row['success'] else row['error']}")
+        print(report)
+        return 0 if report["timing_preserved"] else 1
+
+    optimized, report = optimize_script(source, args.tolerance)
+    print(Fore.GREEN + str(report), file=sys.stderr)
+    if args.output:
+        Path(args.output).write_text(optimized, encoding="utf-8")
+    else:
+        print(optimized)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+import os
+import re
+import sys
+import json
+import math
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from collections import Counter
+from typing import Dict, Any, List, Optional
+
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_WARM_THRESHOLD = 0.45
+
+FILLER = {
+    "a", "an", "the", "of", "to", "in", "on", "for", "and", "with", "me", "us", "please", "can", "you",
+    "what", "is", "are", "how", "does", "do", "why", "explain", "explanation", "show", "visualize",
+    "visualise", "understand", "understanding", "teach", "intro", "introduction", "simple", "basic",
+    "basics", "concept", "work", "video", "animation",
+}
+
+def _stem(word: str) -> str:
+    for suffix in ("ations", "ation", "ings", "ing", "ed", "es", "s", "ly"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+def embed_topic(topic: str) -> Dict[str, float]:
+    """Sparse, normalized topic vector: content-word stems, word bigrams and character trigrams.
+
+    Filler such as "explain" or "what is" is dropped so phrasings of one topic land together,
+    while trigrams keep near-spellings (regression/regressions) close.
+    """
+    words = [_stem(w) for w in re.findall(r"[a-z0-9]+", topic.lower())]
+    content = [w for w in words if w not in FILLER] or words
+    features: Counter = Counter()
+    for word in content:
+        features[f"w:{word}"] += 1.0
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            features[f"c:{padded[i:i + 3]}"] += 0.25
+    for first, second in zip(content, content[1:]):
+        features[f"b:{first} {second}"] += 0.5
+    norm = math.sqrt(sum(v * v for v in features.values())) or 1.0
+    return {k: v / norm for k, v in features.items()}
+
+def similarity(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+class SemanticCache:
+    """Approved results keyed by topic embedding, so near-duplicate topics reuse an existing video."""
+
+    def __init__(self, db_path: str = "semantic_cache.db", ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 threshold: float = DEFAULT_THRESHOLD):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.lock = threading.Lock()
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._init_db()
+
+    def _init_db(self):
+        try:
+            self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS semantic_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT NOT NULL,
+                embedding TEXT NOT NULL,
+                final_code TEXT NOT NULL,
+                artifact_id TEXT NOT NULL DEFAULT '',
+                created_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                last_hit REAL
+            )
+            """)
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Semantic cache initialization failed: {str(e)}")
+            raise
+
+    def put(self, topic: str, final_code: str, artifact_id: str = "") -> Optional[int]:
+        try:
+            with self.lock:
+                cursor = self.conn.execute("""
+                INSERT INTO semantic_cache (topic, embedding, final_code, artifact_id, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """, (topic, json.dumps(embed_topic(topic)), final_code, artifact_id, time.time()))
+                self.conn.commit()
+            return cursor.lastrowid
+        except sqlite3.Error as e:
+            logging.error(f"Failed to cache result: {str(e)}")
+            return None
+
+    def lookup(self, topic: str, threshold: float = None) -> Optional[Dict[str, Any]]:
+        """Best unexpired entry at or above the threshold, with its similarity; newest wins ties."""
+        threshold = self.threshold if threshold is None else threshold
+        query = embed_topic(topic)
+        try:
+            with self.lock:
+                rows = self.conn.execute("""
+                SELECT id, topic, embedding, final_code, artifact_id, created_at, hits
+                FROM semantic_cache WHERE created_at >= ? ORDER BY created_at DESC
+                """, (time.time() - self.ttl_seconds,)).fetchall()
+        except sqlite3.Error as e:
+            logging.error(f"Semantic cache lookup failed: {str(e)}")
+            return None
+
+        best, best_score = None, 0.0
+        for row in rows:
+            score = similarity(query, json.loads(row[2]))
+            if score >= threshold and score > best_score:
+                best, best_score = row, score
+        if best is None:
+            return None
+        try:
+            with self.lock:
+                self.conn.execute("UPDATE semantic_cache SET hits = hits + 1, last_hit = ? WHERE id = ?",
+                                  (time.time(), best[0]))
+                self.conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Failed to record cache hit: {str(e)}")
+        keys = ("id", "topic", "final_code", "artifact_id", "created_at", "hits")
+        values = (best[0], best[1], best[3], best[4], best[5], best[6] + 1)
+        return {**dict(zip(keys, values)), "similarity": round(best_score, 4)}
+
+    def invalidate(self, entry_id: int = None, topic: str = None) -> int:
+        """Drop one entry by id, or every entry similar to a topic; returns how many were removed."""
+        if entry_id is not None:
+            ids = [entry_id]
+        elif topic is not None:
+            query = embed_topic(topic)
+            with self.lock:
+                rows = self.conn.execute("SELECT id, embedding FROM semantic_cache").fetchall()
+            ids = [row[0] for row in rows if similarity(query, json.loads(row[1])) >= self.threshold]
+        else:
+            return 0
+        try:
+            with self.lock:
+                self.conn.executemany("DELETE FROM semantic_cache WHERE id = ?", [(i,) for i in ids])
+                self.conn.commit()
+            return len(ids)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to invalidate cache entries: {str(e)}")
+            return 0
+
+    def purge_expired(self) -> int:
+        try:
+            with self.lock:
+                cursor = self.conn.execute("DELETE FROM semantic_cache WHERE created_at < ?",
+                                           (time.time() - self.ttl_seconds,))
+                self.conn.commit()
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logging.error(f"Failed to purge expired cache entries: {str(e)}")
+            return 0
+
+    def entries(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self.lock:
+            rows = self.conn.execute("""
+            SELECT id, topic, artifact_id, created_at, hits, last_hit
+            FROM semantic_cache ORDER BY created_at DESC LIMIT ?
+            """, (limit,)).fetchall()
+        keys = ("id", "topic", "artifact_id", "created_at", "hits", "last_hit")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def close(self):
+        try:
+            self.conn.close()
+        except sqlite3.Error as e:
+            logging.error(f"Failed to close database: {str(e)}")
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect and invalidate the semantic result cache.")
+    parser.add_argument("--db", default=os.getenv("SEMANTIC_CACHE_DB", "semantic_cache.db"))
+    parser.add_argument("--ttl", type=float, default=float(os.getenv("SEMANTIC_CACHE_TTL", DEFAULT_TTL_SECONDS)))
+    parser.add_argument("--threshold", type=float,
+                        default=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", DEFAULT_THRESHOLD)))
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="Show the newest entries")
+    lookup = sub.add_parser("lookup", help="Show what a topic would hit")
+    lookup.add_argument("topic")
+    invalidate = sub.add_parser("invalidate", help="Drop an entry by id, or every entry matching a topic")
+    invalidate.add_argument("target", help="Entry id or topic")
+    sub.add_parser("purge", help="Delete expired entries")
+    args = parser.parse_args(argv)
+
+    cache = SemanticCache(args.db, args.ttl, args.threshold)
+    try:
+        if args.command == "list":
+            for entry in cache.entries():
+                print(entry)
+        elif args.command == "lookup":
+            hit = cache.lookup(args.topic)
+            print({k: v for k, v in hit.items() if k != "final_code"} if hit else "No match")
+        elif args.command == "invalidate":
+            removed = cache.invalidate(entry_id=int(args.target)) if args.target.isdigit() \
+                else cache.invalidate(topic=args.target)
+            print(f"Removed {removed} entries")
+        elif args.command == "purge":
+            print(f"Removed {cache.purge_expired()} expired entries")
+    finally:
+        cache.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
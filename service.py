@@ -0,0 +1,313 @@
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import logging
+import argparse
+import importlib
+from typing import Dict, Any, List, Optional
+from aiohttp import web
+from colorama import init, Fore
+from clients import get_render_scheduler, get_artifact_store
+from hls import stream_dir
+from singleflight import flight_key
+
+init(autoreset=True)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+SSE_KEEPALIVE_SECONDS = 15
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", "3600"))
+JOB_SWEEP_SECONDS = 60
+SUMMARY_FIELDS = ("status", "attempts", "last_error", "observer_feedback", "artifact_id", "stop_reason")
+
+def summarize_update(update: Dict[str, Any]) -> Dict[str, Any]:
+    """Small, JSON-safe view of a node's state update for the event stream."""
+    summary = {"updated": sorted(update.keys())}
+    for key in SUMMARY_FIELDS:
+        if key in update:
+            value = update[key]
+            summary[key] = value[:500] if isinstance(value, str) else value
+    if update.get("script_content"):
+        summary["script_chars"] = len(update["script_content"])
+    return summary
+
+class VideoJob:
+    def __init__(self, topic: str, key: str = "", options: Dict[str, Any] = None):
+        self.id = uuid.uuid4().hex
+        self.topic = topic
+        self.options = options or {}
+        self.key = key
+        self.leader_id: Optional[str] = None
+        self.followers: List["VideoJob"] = []
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error = ""
+        self.events: List[Dict[str, Any]] = []
+        self.changed = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    async def publish(self, event: str, data: Dict[str, Any]) -> None:
+        async with self.changed:
+            self.events.append({"id": len(self.events), "event": event, "data": data})
+            self.changed.notify_all()
+        for follower in self.followers:
+            follower._mirror(self)
+            await follower.publish(event, follower.to_dict() if event == "done" else data)
+
+    def attach(self, follower: "VideoJob") -> None:
+        """Subscribe an identical request to this job: it replays the events so far and gets every later one."""
+        follower.leader_id = self.id
+        follower._mirror(self)
+        follower.events = [{**event, "id": i} for i, event in enumerate(self.events)]
+        self.followers.append(follower)
+
+    def _mirror(self, leader: "VideoJob") -> None:
+        self.status = leader.status
+        self.started_at = leader.started_at
+        self.finished_at = leader.finished_at
+        self.result = leader.result
+        self.error = leader.error
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "topic": self.topic,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "result": {k: v for k, v in (self.result or {}).items() if k != "final_code"},
+            "events": len(self.events),
+            "coalesced_with": self.leader_id,
+        }
+
+class VideoService:
+    """Admits jobs into a bounded queue and runs them on a fixed number of async graph runners."""
+
+    def __init__(self, flow, workers: int = 2, max_pending: int = 16, job_ttl: float = JOB_TTL_SECONDS):
+        self.flow = flow
+        self.workers = workers
+        self.job_ttl = job_ttl
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.jobs: Dict[str, VideoJob] = {}
+        self.inflight: Dict[str, VideoJob] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self, app: web.Application) -> None:
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+
+    async def stop(self, app: web.Application) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def submit(self, topic: str, options: Dict[str, Any] = None) -> VideoJob:
+        """Queue a job, or attach it to an identical queued/running one so the work happens once."""
+        job = VideoJob(topic, flight_key(topic, options), options)
+        leader = self.inflight.get(job.key)
+        if leader is not None:
+            leader.attach(job)
+            logging.info(Fore.GREEN + f"[{job.id}] Coalesced with in-flight job {leader.id}")
+        else:
+            self.queue.put_nowait(job)
+            self.inflight[job.key] = job
+        self.jobs[job.id] = job
+        return job
+
+    def expire(self, now: float = None) -> int:
+        """Forget jobs (and their event logs) that finished more than job_ttl seconds ago."""
+        cutoff = (now or time.time()) - self.job_ttl
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job.finished and job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+        return len(expired)
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(JOB_SWEEP_SECONDS)
+            removed = self.expire()
+            if removed:
+                logging.info(f"Expired {removed} finished jobs")
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job: VideoJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        await job.publish("status", {"status": "running"})
+        run_config = {"configurable": {"thread_id": job.id}}
+        value: Dict[str, Any] = {}
+        try:
+            initial_state = self.flow.make_initial_state(job.topic, job.options)
+            async for step in self.flow.app.astream(initial_state, config=run_config):
+                for node, value in step.items():
+                    logging.info(Fore.GREEN + f"[{job.id}] Completed node: {node}")
+                    await job.publish("node", {"node": node, **summarize_update(value)})
+            job.result = self.flow.build_result(value, run_config)
+            job.status = "done"
+        except Exception as e:
+            logging.error(Fore.RED + f"[{job.id}] Workflow failed: {str(e)}")
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = "failed"
+        job.finished_at = time.time()
+        if self.inflight.get(job.key) is job:
+            del self.inflight[job.key]
+        await job.publish("done", job.to_dict())
+
+routes = web.RouteTableDef()
+
+@routes.post("/videos")
+async def create_video(request: web.Request) -> web.Response:
+    service: VideoService = request.app["service"]
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise web.HTTPBadRequest(text="Expected a JSON body")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="Expected a JSON object")
+    topic = str(body.get("topic", "")).strip()
+    if not topic:
+        raise web.HTTPBadRequest(text="Missing 'topic'")
+    options = body.get("options") or {}
+    if not isinstance(options, dict):
+        raise web.HTTPBadRequest(text="'options' must be an object")
+    try:
+        job = service.submit(topic, options)
+    except asyncio.QueueFull:
+        raise web.HTTPServiceUnavailable(
+            text="Generation queue is full, retry later",
+            headers={"Retry-After": "30"}
+        )
+    return web.json_response(
+        {"id": job.id, "status": job.status, "events": f"/videos/{job.id}/events", "coalesced_with": job.leader_id},
+        status=202
+    )
+
+def _get_job(request: web.Request) -> VideoJob:
+    job = request.app["service"].jobs.get(request.match_info["job_id"])
+    if job is None:
+        raise web.HTTPNotFound(text="Unknown job")
+    return job
+
+@routes.get("/videos/{job_id}")
+async def get_video(request: web.Request) -> web.Response:
+    return web.json_response(_get_job(request).to_dict())
+
+@routes.get("/videos/{job_id}/events")
+async def stream_events(request: web.Request) -> web.StreamResponse:
+    job = _get_job(request)
+    try:
+        next_id = max(0, int(request.headers.get("Last-Event-ID", -1)) + 1)
+    except ValueError:
+        raise web.HTTPBadRequest(text="Last-Event-ID must be an integer")
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    await response.prepare(request)
+
+    while True:
+        async with job.changed:
+            if next_id >= len(job.events) and not job.finished:
+                try:
+                    await asyncio.wait_for(job.changed.wait(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+            pending = job.events[next_id:]
+            finished = job.finished
+        if not pending:
+            await response.write(b": keepalive\n\n")
+        for event in pending:
+            payload = f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+            await response.write(payload.encode("utf-8"))
+            next_id = event["id"] + 1
+        if finished and next_id >= len(job.events):
+            break
+
+    await response.write_eof()
+    return response
+
+@routes.get("/videos/{job_id}/video")
+async def download_video(request: web.Request) -> web.StreamResponse:
+    job = _get_job(request)
+    if not job.finished:
+        raise web.HTTPConflict(text=f"Job is {job.status}")
+    artifact_id = (job.result or {}).get("artifact_id")
+    video_path = get_artifact_store().path(artifact_id) if artifact_id else None
+    if not video_path:
+        raise web.HTTPNotFound(text="No rendered video for this job")
+    return web.FileResponse(video_path, headers={
+        "Content-Disposition": f'attachment; filename="{job.id}.mp4"'
+    })
+
+STREAM_CONTENT_TYPES = {".m3u8": "application/vnd.apple.mpegurl", ".ts": "video/mp2t"}
+
+@routes.get(r"/streams/{stream_id:[0-9a-f]+}/{name:[A-Za-z0-9_]+\.(?:m3u8|ts)}")
+async def stream_file(request: web.Request) -> web.StreamResponse:
+    """Progressive HLS playlist and segments written by flow2 as scenes finish rendering."""
+    path = stream_dir(request.match_info["stream_id"]) / request.match_info["name"]
+    if not path.exists():
+        raise web.HTTPNotFound(text="Unknown stream")
+    return web.FileResponse(path, headers={
+        "Content-Type": STREAM_CONTENT_TYPES[path.suffix],
+        "Cache-Control": "no-cache" if path.suffix == ".m3u8" else "max-age=86400",
+    })
+
+@routes.get("/metrics")
+async def metrics(request: web.Request) -> web.Response:
+    service: VideoService = request.app["service"]
+    body = {
+        "queue_depth": service.queue.qsize(),
+        "jobs": {status: sum(1 for j in service.jobs.values() if j.status == status)
+                 for status in ("queued", "running", "done", "failed")},
+        "inflight_topics": len(service.inflight),
+        "coalesced": sum(1 for j in service.jobs.values() if j.leader_id),
+    }
+    if not os.getenv("RENDER_AGENTS"):
+        body["render"] = get_render_scheduler().metrics()
+    return web.json_response(body)
+
+def create_app(flow, workers: int = 2, max_pending: int = 16) -> web.Application:
+    service = VideoService(flow, workers=workers, max_pending=max_pending)
+    app = web.Application()
+    app["service"] = service
+    app.add_routes(routes)
+    app.on_startup.append(service.start)
+    app.on_cleanup.append(service.stop)
+    return app
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="HTTP video generation service with streamed progress.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--flow", default="flow4", choices=["flow4"],
+                        help="Workflow module; only flow4 has the options/make_initial_state/build_result API")
+    parser.add_argument("--workers", type=int, default=2, help="Workflows running at once")
+    parser.add_argument("--max-pending", type=int, default=16, help="Queued jobs before returning 503")
+    args = parser.parse_args(argv)
+
+    flow = importlib.import_module(args.flow)
+    web.run_app(create_app(flow, args.workers, args.max_pending), host=args.host, port=args.port)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
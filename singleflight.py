@@ -0,0 +1,65 @@
+import re
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Tuple
+from colorama import init, Fore
+
+init(autoreset=True)
+
+def normalize_topic(topic: str) -> str:
+    """Case, whitespace and trailing punctuation do not change what gets generated."""
+    return re.sub(r"\s+", " ", topic).strip().rstrip("?.!").strip().lower()
+
+def flight_key(topic: str, options: Dict[str, Any] = None) -> str:
+    return json.dumps([normalize_topic(topic), options or {}], sort_keys=True)
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.followers = 0
+
+class SingleFlight:
+    """Runs at most one call per key at a time; callers arriving meanwhile wait for it and share its result."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Returns (result, shared); shared is True when the result came from another caller's execution."""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+            else:
+                call.followers += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return _copy(call.result), True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            if call.followers:
+                logging.info(Fore.GREEN + f"Shared one execution with {call.followers} identical requests")
+            call.done.set()
+
+    def inflight(self) -> int:
+        with self.lock:
+            return len(self.calls)
+
+def _copy(result: Any) -> Any:
+    return dict(result) if isinstance(result, dict) else result
@@ -0,0 +1,87 @@
+import re
+import ast
+import codeop
+import warnings
+from typing import Optional, Tuple
+from utils import extract_scene_name
+
+# Things action_prompt forbids that no later tokens can make right.
+FORBIDDEN_PATTERNS = [
+    (re.compile(r"\b(ImageMobject|SVGMobject)(?=\s*\()"), "loads a static image"),
+    (re.compile(r"""["'][^"'\n]*\.(png|jpe?g|gif|bmp|webp|svg)["']""", re.I), "references a static image file"),
+]
+SCENE_CLASS = re.compile(r"^class\s+\w+\s*\(\s*\w*Scene\s*\)\s*:", re.M)
+
+class ScriptStreamValidator:
+    """Checks a Manim script while it streams in, one complete line at a time.
+
+    Each new line is matched against FORBIDDEN_PATTERNS, and the code so far is compiled with
+    codeop, which tells input that is merely unfinished (an open bracket, a block with no body
+    yet) from input that no continuation can fix (a missing colon, a bad dedent, an
+    unterminated string). feed() returns the first fatal problem so the caller can stop the
+    stream; finish() validates the whole script once the stream ends.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.code_start: Optional[int] = None
+        self.code_end: Optional[int] = None
+        self.checked = 0
+
+    def _code(self) -> str:
+        if self.code_start is None:
+            fence = self.text.find("```")
+            if fence == -1:
+                return ""
+            line_end = self.text.find("\n", fence)
+            if line_end == -1:
+                return ""
+            self.code_start = line_end + 1
+        if self.code_end is None:
+            close = re.search(r"^\s*```", self.text[self.code_start:], re.M)
+            if close:
+                self.code_end = self.code_start + close.start()
+        end = self.code_end if self.code_end is not None else self.text.rfind("\n") + 1
+        return self.text[self.code_start:max(end, self.code_start)]
+
+    def feed(self, chunk: str) -> Optional[str]:
+        self.text += chunk
+        code = self._code()
+        if len(code) <= self.checked:
+            return None
+        new = code[self.checked:]
+        self.checked = len(code)
+        for pattern, reason in FORBIDDEN_PATTERNS:
+            match = pattern.search(new)
+            if match:
+                return f"{reason} ({match.group(0).strip()})"
+        if len(SCENE_CLASS.findall(code)) > 1:
+            return "defines more than one Scene class"
+        return syntax_problem(code)
+
+    def finish(self) -> Tuple[Optional[str], str]:
+        """(script, "") when the whole stream is a valid single-scene script, else (None, problem)."""
+        if self.code_start is None:
+            self.code_start = 0
+        problem = self.feed("\n")
+        if problem:
+            return None, problem
+        code = self._code()
+        try:
+            ast.parse(code)
+        except SyntaxError as e:
+            return None, f"is cut off or invalid: {e.msg} (line {e.lineno})"
+        if extract_scene_name(code) == "DefaultScene":
+            return None, "defines no Scene class"
+        return code.strip(), ""
+
+def syntax_problem(code: str) -> Optional[str]:
+    """None if the code is valid or only unfinished, else why no continuation can fix it."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            codeop.compile_command(code, "<stream>", "exec")
+        except (SyntaxError, ValueError, OverflowError) as e:
+            lineno = getattr(e, "lineno", None)
+            return f"has a syntax error: {getattr(e, 'msg', str(e))}" + (f" (line {lineno})" if lineno else "")
+    return None
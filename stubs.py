@@ -0,0 +1,265 @@
+import json
+import time
+import socket
+import random
+import select
+import asyncio
+import logging
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.language_models.chat_models import BaseChatModel
+
+STUB_SCRIPT = """```python
+from manim import *
+
+class LinearRegression(Scene):
+    def construct(self):
+        axes = Axes(x_range=[0, 10, 1], y_range=[0, 8, 1], x_length=6, y_length=4)
+        dots = VGroup(*[Dot(axes.c2p(x, 0.6 * x + 1), color=BLUE) for x in range(1, 10)])
+        line = axes.plot(lambda x: 0.6 * x + 1, color=RED)
+        self.play(Create(axes))
+        self.play(LaggedStart(*[Create(d) for d in dots], lag_ratio=0.1))
+        self.play(Create(line))
+        self.wait(1)
+```"""
+
+STUB_EDIT = """<<<<<<< SEARCH
+        self.wait(1)
+=======
+        self.wait({seconds})
+>>>>>>> REPLACE"""
+
+session_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("session_timings", default=None)
+
+def parse_distribution(spec: str) -> Callable[[], float]:
+    """Parse "const:1", "uniform:0.5,2", "exp:1.5" or "lognormal:mu,sigma" into a sampler (seconds)."""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v.strip()] if params else []
+    if kind == "const":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "exp":
+        return lambda: random.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown distribution: {spec}")
+
+def _record(key: str, seconds: float) -> None:
+    timings = session_timings.get()
+    if timings is not None:
+        timings[key] = timings.get(key, 0.0) + seconds
+        timings[f"{key}_calls"] = timings.get(f"{key}_calls", 0) + 1
+
+def stub_response(text: str, approve_rate: float) -> str:
+    if "Review the execution" in text or "Review the educational quality" in text:
+        if random.random() < approve_rate:
+            return "APPROVED"
+        return "IMPROVEMENTS:\nSlow down the line fitting animation."
+    if "Edit the Manim script" in text:
+        return STUB_EDIT.format(seconds=random.choice([0.5, 1.5, 2, 2.5, 3]))
+    if "Generate the Manim script" in text or "Generate production-quality Manim code" in text:
+        return STUB_SCRIPT
+    if "Fix this EXACT Manim error" in text:
+        return "ADD: import numpy as np"
+    return "1. Show the data\n2. Fit the line\n3. Explain the residuals"
+
+class StubChatModel(BaseChatModel):
+    """Offline stand-in for ChatGoogleGenerativeAI with injected latency and failures."""
+
+    latency: Callable[[], float] = lambda: 0.0
+    failure_rate: float = 0.0
+    approve_rate: float = 0.5
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    def _respond(self, text: str) -> str:
+        return stub_response(text, self.approve_rate)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        start = time.perf_counter()
+        try:
+            time.sleep(max(0.0, self.latency()))
+            if random.random() < self.failure_rate:
+                raise RuntimeError("Stub LLM injected failure (429 Resource exhausted)")
+            text = "\n".join(str(m.content) for m in messages)
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._respond(text)))])
+        finally:
+            _record("llm_seconds", time.perf_counter() - start)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        """Same response, one line at a time, with the latency spread across the lines."""
+        start = time.perf_counter()
+        try:
+            if random.random() < self.failure_rate:
+                raise RuntimeError("Stub LLM injected failure (429 Resource exhausted)")
+            lines = self._respond("\n".join(str(m.content) for m in messages)).split("\n")
+            delay = max(0.0, self.latency()) / len(lines)
+            for i, line in enumerate(lines):
+                time.sleep(delay)
+                yield ChatGenerationChunk(message=AIMessageChunk(content=line + ("\n" if i < len(lines) - 1 else "")))
+        finally:
+            _record("llm_seconds", time.perf_counter() - start)
+
+class StubRenderer:
+    """Drop-in for utils.run_manim_script that sleeps instead of running docker."""
+
+    def __init__(self, latency: Callable[[], float], failure_rate: float = 0.0, slots: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._slots = threading.BoundedSemaphore(slots) if slots > 0 else None
+
+    def __call__(self, script_path: str, scene_name: str, *args, **kwargs) -> tuple[bool, str]:
+        start = time.perf_counter()
+        try:
+            if self._slots:
+                with self._slots:
+                    _record("render_wait_seconds", time.perf_counter() - start)
+                    time.sleep(max(0.0, self.latency()))
+            else:
+                time.sleep(max(0.0, self.latency()))
+            if random.random() < self.failure_rate:
+                logging.debug(f"Stub render failure for {scene_name}")
+                return False, "Traceback (most recent call last):\nNameError: name 'np' is not defined"
+            return True, "Success"
+        finally:
+            _record("render_seconds", time.perf_counter() - start)
+
+class StubLLMServer:
+    """Local HTTP stand-in for the Gemini API with injected latency, for exercising the
+    rate limiter and hedged requests over a real socket. Counts requests the client
+    abandoned (a cancelled hedge loser shows up as `cancelled`)."""
+
+    def __init__(self, latency: Callable[[], float], failure_rate: float = 0.0,
+                 approve_rate: float = 0.5, port: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.approve_rate = approve_rate
+        self.counts = {"requests": 0, "completed": 0, "cancelled": 0, "rejected": 0}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1/generate"
+
+    def start(self) -> "StubLLMServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, key: str) -> None:
+        with self.lock:
+            self.counts[key] += 1
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _client_gone(self, seconds: float) -> bool:
+                """Sleep, but notice a client that hangs up meanwhile."""
+                readable, _, _ = select.select([self.connection], [], [], max(0.0, seconds))
+                if not readable:
+                    return False
+                try:
+                    return self.connection.recv(1, socket.MSG_PEEK) == b""
+                except OSError:
+                    return True
+
+            def do_POST(self):
+                stub._count("requests")
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self._client_gone(stub.latency()):
+                    stub._count("cancelled")
+                    return
+                if random.random() < stub.failure_rate:
+                    stub._count("rejected")
+                    self.send_error(429, "Resource exhausted")
+                    return
+                text = stub_response(body.get("prompt", ""), stub.approve_rate)
+                prompt_tokens, output_tokens = len(body.get("prompt", "")) // 4, len(text) // 4
+                payload = json.dumps({"text": text, "usage": {
+                    "input_tokens": prompt_tokens, "output_tokens": output_tokens,
+                    "total_tokens": prompt_tokens + output_tokens}}).encode()
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    stub._count("completed")
+                except (BrokenPipeError, ConnectionResetError):
+                    stub._count("cancelled")
+
+        return Handler
+
+class HttpChatModel(BaseChatModel):
+    """Chat model client for StubLLMServer. The async path uses a raw socket so that
+    cancelling the call really drops the connection."""
+
+    url: str
+    timeout: float = 120.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-http"
+
+    @staticmethod
+    def _result(payload: Dict[str, Any]) -> ChatResult:
+        message = AIMessage(content=payload["text"], usage_metadata=payload["usage"])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        start = time.perf_counter()
+        body = json.dumps({"prompt": "\n".join(str(m.content) for m in messages)}).encode()
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return self._result(json.load(response))
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"Stub LLM server returned {e.code} {e.reason}") from e
+        finally:
+            _record("llm_seconds", time.perf_counter() - start)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        start = time.perf_counter()
+        target = urllib.parse.urlsplit(self.url)
+        body = json.dumps({"prompt": "\n".join(str(m.content) for m in messages)}).encode()
+        reader, writer = await asyncio.open_connection(target.hostname, target.port)
+        try:
+            writer.write(
+                f"POST {target.path} HTTP/1.0\r\nHost: {target.netloc}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), self.timeout)
+        finally:
+            writer.close()
+            _record("llm_seconds", time.perf_counter() - start)
+        head, _, payload = response.partition(b"\r\n\r\n")
+        status = head.split(b" ", 2)[1].decode() if head else "000"
+        if status != "200":
+            raise RuntimeError(f"Stub LLM server returned {status}")
+        return self._result(json.loads(payload))
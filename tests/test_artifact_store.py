@@ -0,0 +1,57 @@
+import pytest
+from artifact_store import ArtifactStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts"), quota_bytes=25, grace_seconds=0)
+    yield store
+    store.close()
+
+def make(tmp_path, name, size, fill):
+    path = tmp_path / name
+    path.write_bytes(bytes([fill]) * size)
+    return str(path)
+
+def test_identical_files_are_stored_once(store, tmp_path):
+    first = store.put(make(tmp_path, "a.mp4", 10, 1))
+    second = store.put(make(tmp_path, "b.mp4", 10, 1))
+    assert first == second
+    assert store.get(first)["refs"] == 2
+    assert store.usage()["artifacts"] == 1
+
+def test_eviction_removes_least_recently_used(store, tmp_path):
+    old = store.put(make(tmp_path, "a.mp4", 10, 1))
+    new = store.put(make(tmp_path, "b.mp4", 10, 2))
+    store.path(old)
+    store.path(new)
+    store.put(make(tmp_path, "c.mp4", 10, 3))
+    assert store.path(old) is None
+    assert store.path(new) is not None
+
+def test_pinned_artifacts_are_not_evicted(store, tmp_path):
+    pinned = store.put(make(tmp_path, "a.mp4", 10, 1))
+    with store.pinned([pinned]):
+        for i in range(3):
+            store.put(make(tmp_path, f"{i}.mp4", 10, 10 + i))
+        assert store.path(pinned) is not None
+    store.quota_bytes = 0
+    store.evict()
+    assert store.path(pinned) is None
+
+def test_pins_are_counted(store, tmp_path):
+    artifact_id = store.put(make(tmp_path, "a.mp4", 10, 1))
+    store.pin(artifact_id)
+    store.pin(artifact_id)
+    store.unpin(artifact_id)
+    assert artifact_id in store.pins
+    store.unpin(artifact_id)
+    assert artifact_id not in store.pins
+
+def test_recently_used_artifacts_are_not_evicted(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts"), quota_bytes=15, grace_seconds=600)
+    try:
+        ids = [store.put(make(tmp_path, f"{i}.mp4", 10, i)) for i in range(3)]
+        assert all(store.path(artifact_id) for artifact_id in ids)
+        assert store.usage()["bytes"] == 30
+    finally:
+        store.close()
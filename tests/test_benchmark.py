@@ -0,0 +1,11 @@
+import flow4
+from benchmark import _checkpoint_state, compare_to_baseline
+
+def test_checkpoint_fixture_has_every_agent_state_field():
+    assert set(_checkpoint_state()) == set(flow4.make_initial_state("topic"))
+
+def test_regressions_compare_the_best_run():
+    baseline = {"results": {"bench": {"min_ms": 1.0, "median_ms": 1.0}}}
+    assert compare_to_baseline({"bench": {"min_ms": 1.2, "median_ms": 9.0}}, baseline, tolerance=0.5) == []
+    regressions = compare_to_baseline({"bench": {"min_ms": 2.0, "median_ms": 2.0}}, baseline, tolerance=0.5)
+    assert len(regressions) == 1 and "best run 2.000ms" in regressions[0]
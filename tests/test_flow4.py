@@ -0,0 +1,83 @@
+import pytest
+from langchain_core.messages import AIMessageChunk
+import flow4
+
+SCRIPT_CHUNKS = [
+    "```python\nfrom manim import *\n\nclass Demo(Scene):\n",
+    "    def construct(self):\n",
+    "        img = ImageMobject('cat.png')\n",
+    "        self.play(FadeIn(img))\n",
+    "        self.wait(2)\n",
+    "```\n",
+]
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.closed = False
+
+    def __iter__(self):
+        return (AIMessageChunk(content=chunk) for chunk in self.chunks)
+
+    def close(self):
+        self.closed = True
+
+class FakeChain:
+    def __init__(self):
+        self.streams = []
+
+    def __or__(self, llm):
+        return self
+
+    def stream(self, inputs):
+        self.streams.append(FakeStream(SCRIPT_CHUNKS))
+        return self.streams[-1]
+
+def test_stream_script_sends_the_whole_script_on_the_last_attempt(monkeypatch):
+    chain = FakeChain()
+    monkeypatch.setattr(flow4, "action_prompt", chain)
+    script = flow4.stream_script(None, {"error_fixes": ""})
+    assert len(chain.streams) == flow4.STREAM_RETRIES + 1
+    assert script.endswith("self.wait(2)")
+    assert "self.play(FadeIn(img))" in script
+
+def test_race_candidates_survives_a_candidate_that_raises(monkeypatch):
+    def render(state, script, run_id, attempt, priority, cancel):
+        if script == "broken":
+            raise OSError("docker is gone")
+        return True, "Success", "artifact"
+    monkeypatch.setattr(flow4, "render_script", render)
+    assert flow4.race_candidates({}, ["broken", "good"], "run", 1, 0) == (True, "Success", "artifact", "good")
+    success, error, artifact_id, script = flow4.race_candidates({}, ["broken", "broken"], "run", 1, 0)
+    assert not success and "docker is gone" in error and artifact_id == ""
+
+class FakeCache:
+    def __init__(self):
+        self.entries = []
+
+    def put(self, topic, script, artifact_id):
+        self.entries.append((topic, script, artifact_id))
+
+@pytest.fixture
+def approved_draft():
+    state = flow4.make_initial_state("Explain vectors")
+    state.update(script_content="class Demo(Scene): pass", status="success", quality_review="APPROVED",
+                 reviewed_script="class Demo(Scene): pass", render_quality="draft", artifact_id="draft-id")
+    return state
+
+def test_approved_draft_is_rendered_again_before_caching(monkeypatch, approved_draft):
+    cache = FakeCache()
+    monkeypatch.setattr(flow4, "get_semantic_cache", lambda: cache)
+    monkeypatch.setattr(flow4, "render_script", lambda state, *args: (state["render_quality"] == "low", "ok", "full-id"))
+    update = flow4.observe_node(approved_draft, {"configurable": {"thread_id": "t"}})
+    assert update["status"] == "approved"
+    assert update["artifact_id"] == "full-id" and update["render_quality"] == "low"
+    assert cache.entries == [("Explain vectors", "class Demo(Scene): pass", "full-id")]
+
+def test_draft_is_not_cached_when_the_rerender_fails(monkeypatch, approved_draft):
+    cache = FakeCache()
+    monkeypatch.setattr(flow4, "get_semantic_cache", lambda: cache)
+    monkeypatch.setattr(flow4, "render_script", lambda state, *args: (False, "boom", ""))
+    update = flow4.observe_node(approved_draft, {"configurable": {"thread_id": "t"}})
+    assert update["status"] == "approved" and "artifact_id" not in update
+    assert cache.entries == []
@@ -0,0 +1,62 @@
+import sqlite3
+import pytest
+from job_queue import JobQueue
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    yield queue
+    queue.close()
+
+def test_lease_takes_highest_priority_first(queue):
+    low = queue.submit("low")
+    high = queue.submit("high", priority=5)
+    assert queue.lease("w1")["id"] == high
+    assert queue.lease("w1")["id"] == low
+    assert queue.lease("w1") is None
+
+def test_complete_requires_the_lease(queue):
+    job_id = queue.submit("topic")
+    job = queue.lease("w1")
+    assert job["attempts"] == 1 and job["status"] == "running"
+    assert not queue.complete(job_id, "w2", {"status": "approved"})
+    assert queue.complete(job_id, "w1", {"status": "approved"})
+    assert queue.get(job_id)["result"] == {"status": "approved"}
+
+def test_expired_lease_is_requeued_and_old_owner_loses_it(queue):
+    job_id = queue.submit("topic")
+    queue.lease("w1", lease_seconds=-1)
+    job = queue.lease("w2")
+    assert job["id"] == job_id and job["attempts"] == 2
+    assert not queue.heartbeat(job_id, "w1")
+    assert not queue.complete(job_id, "w1", {})
+    assert queue.complete(job_id, "w2", {})
+
+def test_expired_lease_fails_after_max_attempts(queue):
+    job_id = queue.submit("topic", max_attempts=1)
+    queue.lease("w1", lease_seconds=-1)
+    assert queue.lease("w2") is None
+    job = queue.get(job_id)
+    assert job["status"] == "failed" and job["error"] == "lease expired"
+
+def test_fail_retries_with_backoff_then_gives_up(queue):
+    job_id = queue.submit("topic", max_attempts=2)
+    queue.lease("w1")
+    assert queue.fail(job_id, "w1", "boom", retry_delay=0)
+    assert queue.get(job_id)["status"] == "queued"
+    queue.lease("w1")
+    assert queue.fail(job_id, "w1", "boom again", retry_delay=0)
+    assert queue.get(job_id)["status"] == "failed"
+
+def test_lease_survives_a_failed_begin(queue, tmp_path):
+    job_id = queue.submit("topic")
+    queue.conn.execute("PRAGMA busy_timeout = 50")
+    blocker = sqlite3.connect(str(tmp_path / "jobs.db"), isolation_level=None)
+    blocker.execute("BEGIN EXCLUSIVE")
+    try:
+        assert queue.lease("w1") is None
+        assert not queue.conn.in_transaction
+    finally:
+        blocker.execute("ROLLBACK")
+        blocker.close()
+    assert queue.lease("w1")["id"] == job_id
@@ -0,0 +1,70 @@
+from patching import apply_edit, apply_patch, parse_search_replace, parse_unified_diff
+
+SCRIPT = """from manim import *
+
+class Demo(Scene):
+    def construct(self):
+        a = Circle()
+        b = Square()
+        self.play(FadeOut(a))
+        self.play(FadeOut(b))
+        self.wait(1)
+"""
+
+def test_exact_match():
+    script, how = apply_edit(SCRIPT, "        self.wait(1)\n", "        self.wait(2)\n")
+    assert how == "exact"
+    assert "self.wait(2)" in script and "self.wait(1)" not in script
+
+def test_repeated_search_is_ambiguous():
+    script, how = apply_edit("x = 1\nx = 1\n", "x = 1\n", "x = 2\n")
+    assert script is None and how == "ambiguous"
+
+def test_empty_search_inserts_at_top():
+    script, how = apply_edit(SCRIPT, "", "import numpy as np\n")
+    assert how == "insert"
+    assert script.startswith("import numpy as np\nfrom manim import *")
+
+def test_whitespace_match_reindents_replacement():
+    script, how = apply_edit(SCRIPT, "a = Circle()\nb = Square()\n", "a = Circle()\nb = Triangle()\n")
+    assert how == "whitespace"
+    assert "        a = Circle()\n        b = Triangle()\n" in script
+
+def test_fuzzy_match_multi_line_block():
+    search = "self.play(FadeOut( b ))\nself.wait(1);\n"
+    script, how = apply_edit(SCRIPT, search, "self.play(FadeOut(b), run_time=2)\nself.wait(1)\n")
+    assert how.startswith("fuzzy")
+    assert "        self.play(FadeOut(b), run_time=2)\n" in script
+    assert "self.play(FadeOut(a))" in script
+
+def test_fuzzy_match_rejects_single_line():
+    script, how = apply_edit(SCRIPT, "self.play(FadeOut(c))\n", "self.play(FadeOut(c), run_time=2)\n")
+    assert script is None and how == "no match"
+
+def test_fuzzy_match_rejects_different_identifiers():
+    search = "self.play(FadeOut(c))\nself.wait(1)\n"
+    script, how = apply_edit(SCRIPT, search, "self.wait(3)\n")
+    assert script is None and how == "no match"
+
+def test_fuzzy_match_rejects_different_literals():
+    search = "self.play(FadeOut(b))\nself.wait(5)\n"
+    script, how = apply_edit(SCRIPT, search, "self.wait(3)\n")
+    assert script is None and how == "no match"
+
+def test_parse_search_replace_blocks():
+    text = "<<<<<<< SEARCH\nx = 1\n=======\nx = 2\n>>>>>>> REPLACE\n"
+    assert parse_search_replace(text) == [("x = 1\n", "x = 2\n")]
+
+def test_parse_unified_diff_ignores_trailing_blank_line():
+    diff = "--- a/s.py\n+++ b/s.py\n@@ -1,2 +1,2 @@\n a = 1\n-b = 2\n+b = 3\n\n"
+    assert parse_unified_diff(diff) == [("a = 1\nb = 2\n", "a = 1\nb = 3\n")]
+
+def test_apply_patch_is_all_or_nothing():
+    patch = ("<<<<<<< SEARCH\n        self.wait(1)\n=======\n        self.wait(2)\n>>>>>>> REPLACE\n"
+             "<<<<<<< SEARCH\n        missing()\n=======\n        other()\n>>>>>>> REPLACE\n")
+    script, report = apply_patch(SCRIPT, patch)
+    assert script is None
+    assert report.startswith("edit 2/2")
+
+def test_apply_patch_without_edits():
+    assert apply_patch(SCRIPT, "Looks fine to me.") == (None, "no edits found")
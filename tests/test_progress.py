@@ -0,0 +1,41 @@
+from progress import assess_progress, error_fingerprint, find_attempt, script_fingerprint
+
+def attempt(n, script, error="", last_error=None):
+    return {"attempt": n, "script_hash": script_fingerprint(script), "error": error,
+            "last_error": error if last_error is None else last_error}
+
+def test_script_fingerprint_ignores_formatting_and_comments():
+    assert script_fingerprint("x = 1\n") == script_fingerprint("x   =  1  # one\n\n")
+    assert script_fingerprint("x = 1\n") != script_fingerprint("x = 2\n")
+
+def test_error_fingerprint_blanks_paths_and_line_numbers():
+    a = 'File "/tmp/manim-a1-x/mymanim.py", line 12\nNameError: name \'foo\' is not defined'
+    b = 'File "/tmp/manim-a2-y/mymanim.py", line 40\nNameError: name \'foo\' is not defined'
+    assert error_fingerprint(a) == error_fingerprint(b) == "NameError: name 'foo' is not defined"
+    assert error_fingerprint("") == ""
+
+def test_first_attempt_is_ok():
+    assert assess_progress([attempt(1, "x = 1", "NameError")]) == ("ok", "")
+
+def test_identical_consecutive_attempt_is_a_repeat():
+    verdict, reason = assess_progress([attempt(1, "x = 1", "NameError"), attempt(2, "x = 1", "NameError")])
+    assert verdict == "repeat" and "identical to attempt 1" in reason
+
+def test_returning_to_an_earlier_script_is_oscillation():
+    history = [attempt(1, "x = 1", "NameError"), attempt(2, "x = 2", "TypeError"), attempt(3, "x = 1", "NameError")]
+    verdict, reason = assess_progress(history)
+    assert verdict == "oscillation" and "attempt 1" in reason
+
+def test_same_error_from_different_scripts_stalls():
+    history = [attempt(i, f"x = {i}", "NameError") for i in range(1, 4)]
+    verdict, _ = assess_progress(history)
+    assert verdict == "stalled"
+
+def test_transient_failures_are_not_progress_problems():
+    history = [attempt(1, "x = 1", "Timeout expired"), attempt(2, "x = 1", "Timeout expired")]
+    assert assess_progress(history) == ("ok", "")
+
+def test_find_attempt_skips_transient_outcomes():
+    history = [attempt(1, "x = 1", "NameError"), attempt(2, "x = 1", "", last_error="Cancelled")]
+    assert find_attempt(history, script_fingerprint("x = 1"))["attempt"] == 1
+    assert find_attempt(history, script_fingerprint("x = 3")) is None
@@ -0,0 +1,41 @@
+import asyncio
+from render_agent import PrioritySlots
+
+async def _queue_behind_a_running_render(requests):
+    """Start one render that holds the only slot, then queue the others behind it."""
+    slots, order, release = PrioritySlots(1), [], asyncio.Event()
+
+    async def render(name, priority, hold=False):
+        async with slots.hold(priority):
+            order.append(name)
+            if hold:
+                await release.wait()
+
+    running = asyncio.create_task(render("running", 1, hold=True))
+    while not order:
+        await asyncio.sleep(0)
+    waiting = [asyncio.create_task(render(name, priority)) for name, priority in requests]
+    while len(slots.waiting) < len(requests):
+        await asyncio.sleep(0)
+    return slots, order, release, [running] + waiting
+
+def test_free_slots_go_to_the_lowest_priority_value_first():
+    async def scenario():
+        slots, order, release, tasks = await _queue_behind_a_running_render([("speculative", 2), ("first", 1), ("fix", 0)])
+        release.set()
+        await asyncio.gather(*tasks)
+        return slots, order
+    slots, order = asyncio.run(scenario())
+    assert order == ["running", "fix", "first", "speculative"]
+    assert slots.free == 1 and not slots.waiting
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def scenario():
+        slots, order, release, tasks = await _queue_behind_a_running_render([("gone", 0), ("fix", 0)])
+        tasks[1].cancel()
+        release.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return slots, order
+    slots, order = asyncio.run(scenario())
+    assert order == ["running", "fix"]
+    assert slots.free == 1 and not slots.waiting
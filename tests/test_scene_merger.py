@@ -0,0 +1,83 @@
+import ast
+import pytest
+from scene_merger import merge_scenes, SceneMergeError
+
+INTRO = """from manim import *
+
+def make_title(text):
+    return Text(text)
+
+class Intro(Scene):
+    def setup(self):
+        self.camera.background_color = BLACK
+
+    def construct(self):
+        title = make_title("Intro")
+        self.play(Write(title))
+"""
+
+BODY = """from manim import *
+
+def make_title(text):
+    return Text(text, color=BLUE)
+
+class Body(Scene):
+    def setup(self):
+        self.camera.background_color = WHITE
+
+    def construct(self):
+        title = make_title("Body")
+        dot = Dot()
+        dot.add_updater(lambda m: m.next_to(title, DOWN))
+        self.play(Write(title))
+"""
+
+def construct_of(merged):
+    scene = next(node for node in ast.parse(merged).body if isinstance(node, ast.ClassDef))
+    return next(node for node in scene.body if isinstance(node, ast.FunctionDef) and node.name == "construct")
+
+def test_merges_into_one_scene_that_compiles():
+    merged = merge_scenes([INTRO, BODY])
+    classes = [node.name for node in ast.parse(merged).body if isinstance(node, ast.ClassDef)]
+    assert classes == ["CombinedScene"]
+    assert merged.count("from manim import *") == 1
+    compile(merged, "<merged>", "exec")
+
+def test_clashing_helpers_are_renamed_per_scene():
+    merged = merge_scenes([INTRO, BODY])
+    functions = {node.name for node in ast.parse(merged).body if isinstance(node, ast.FunctionDef)}
+    assert len(functions) == 2 and "make_title" in functions
+    renamed = (functions - {"make_title"}).pop()
+    assert f"{renamed}('Body')" in merged and "make_title('Intro')" in merged
+
+def test_identical_helpers_are_kept_once():
+    merged = merge_scenes([INTRO, INTRO.replace("Intro(Scene)", "Again(Scene)")])
+    assert merged.count("def make_title") == 1
+
+def test_each_setup_runs_before_its_own_section():
+    construct = ast.unparse(construct_of(merge_scenes([INTRO, BODY])))
+    calls = [line.strip() for line in construct.splitlines() if line.strip().startswith("self.setup_section")]
+    assert len(calls) == 2 and calls[0] != calls[1]
+
+def test_locals_are_renamed_so_closures_keep_their_own_objects():
+    construct = ast.unparse(construct_of(merge_scenes([INTRO, BODY])))
+    assert "title = " in construct
+    updater = next(line for line in construct.splitlines() if "add_updater" in line)
+    second_title = updater.split("next_to(")[1].split(",")[0]
+    assert second_title != "title"
+    assert f"{second_title} = " in construct
+
+def test_transitions_fade_out_between_sections():
+    merged = merge_scenes([INTRO, BODY], transition_time=0.25)
+    assert "FadeOut(mob) for mob in self.mobjects" in merged and "run_time=0.25" in merged
+    assert "self.clear()" in merge_scenes([INTRO, BODY], transitions=False)
+
+def test_errors():
+    with pytest.raises(SceneMergeError):
+        merge_scenes([])
+    with pytest.raises(SceneMergeError):
+        merge_scenes(["x = 1\n"])
+    with pytest.raises(SceneMergeError):
+        merge_scenes(["class A(Scene)\n"])
+    with pytest.raises(SceneMergeError):
+        merge_scenes([INTRO, BODY.replace("Body(Scene)", "Body(MovingCameraScene)")])
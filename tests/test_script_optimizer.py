@@ -0,0 +1,41 @@
+import ast
+from script_optimizer import estimate_seconds, optimize_script, scene_seconds
+
+def scene(body):
+    lines = "\n".join(f"        {line}" for line in body.strip().splitlines())
+    return f"from manim import *\n\nclass Demo(Scene):\n    def construct(self):\n{lines}\n"
+
+def test_estimate_counts_plays_waits_and_static_loops():
+    body = ast.parse("self.play(Write(t), run_time=2)\nself.wait(3)\nfor i in range(4):\n    self.play(Create(Dot()))\n").body
+    assert estimate_seconds(body) == {"": 9.0}
+
+def test_estimate_keeps_unknown_loop_lengths_symbolic():
+    body = ast.parse("for p in points:\n    self.play(Create(Dot(p)), run_time=0.5)\n").body
+    assert estimate_seconds(body) == {"points": 0.5}
+
+def test_scene_seconds():
+    assert scene_seconds(scene("self.play(Write(t), run_time=40)\nself.wait(30)")) == 70.0
+    assert scene_seconds(scene("for p in points:\n    self.play(Create(Dot(p)))")) is None
+    assert scene_seconds("class A(") is None
+
+def test_per_item_loop_is_batched_without_changing_duration():
+    source = scene("for p in points:\n    dot = Dot(p)\n    self.play(Create(dot), run_time=0.5)")
+    optimized, report = optimize_script(source)
+    assert report["loops_batched"] == 1
+    assert "LaggedStart" in optimized and "lag_ratio=1.0" in optimized
+    assert report["estimated_seconds_before"] == report["estimated_seconds_after"]
+
+def test_loop_touching_self_is_left_alone():
+    source = scene("for p in points:\n    self.add(Dot(p))\n    self.play(Create(Dot(p)))")
+    optimized, report = optimize_script(source)
+    assert optimized == source and report["loops_batched"] == 0
+
+def test_consecutive_fadeouts_become_one_succession():
+    source = scene("self.play(FadeOut(a))\nself.play(FadeOut(b), run_time=2)\nself.wait()")
+    optimized, report = optimize_script(source)
+    assert report["fadeouts_merged"] == 1
+    assert "Succession(FadeOut(a, run_time=1.0), FadeOut(b, run_time=2.0))" in optimized
+
+def test_unparseable_source_is_returned_unchanged():
+    optimized, report = optimize_script("class A(")
+    assert optimized == "class A(" and "skipped" in report
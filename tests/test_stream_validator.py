@@ -0,0 +1,51 @@
+from stream_validator import ScriptStreamValidator, syntax_problem
+
+HEADER = "Here is the script:\n```python\nfrom manim import *\n\nclass Demo(Scene):\n    def construct(self):\n"
+
+def feed_all(validator, chunks):
+    return next((problem for problem in map(validator.feed, chunks) if problem), None)
+
+def test_unfinished_code_is_not_a_problem():
+    assert syntax_problem("x = foo(\n    1,\n") is None
+    assert syntax_problem("for i in range(3):\n") is None
+
+def test_unfixable_code_is_a_problem():
+    assert "syntax error" in syntax_problem("def f()\n    pass\n")
+    assert syntax_problem("x = (1]\n") is not None
+
+def test_open_bracket_across_chunks_streams_through():
+    validator = ScriptStreamValidator()
+    assert feed_all(validator, [HEADER, "        self.play(\n", "            Create(Circle())\n", "        )\n"]) is None
+
+def test_forbidden_image_is_caught_mid_stream():
+    validator = ScriptStreamValidator()
+    problem = feed_all(validator, [HEADER, "        img = ImageMobject('cat.png')\n"])
+    assert problem.startswith("loads a static image")
+
+def test_second_scene_class_is_caught():
+    validator = ScriptStreamValidator()
+    problem = feed_all(validator, [HEADER, "        self.wait()\n\nclass Other(Scene):\n"])
+    assert problem == "defines more than one Scene class"
+
+def test_partial_line_is_not_checked_until_complete():
+    validator = ScriptStreamValidator()
+    assert feed_all(validator, [HEADER, "        x = Text('a"]) is None
+    assert validator.feed("b')\n") is None
+
+def test_finish_returns_the_code():
+    validator = ScriptStreamValidator()
+    feed_all(validator, [HEADER, "        self.wait()\n```\n"])
+    script, problem = validator.finish()
+    assert problem == ""
+    assert script.startswith("from manim import *") and script.endswith("self.wait()")
+
+def test_finish_rejects_a_cut_off_script():
+    validator = ScriptStreamValidator()
+    feed_all(validator, [HEADER, "        self.play(Create(\n"])
+    script, problem = validator.finish()
+    assert script is None and "cut off" in problem
+
+def test_finish_without_fence_or_scene():
+    validator = ScriptStreamValidator()
+    validator.feed("x = 1\n")
+    assert validator.finish() == (None, "defines no Scene class")
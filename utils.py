@@ -1,4 +1,6 @@
 import re
+import time
+import shutil
 import logging
 import subprocess
 from pathlib import Path
@@ -15,31 +17,172 @@ def extract_scene_name(script: str) -> str:
     match = re.search(r'class\s+(\w+)\s*\(Scene\):', script)
     return match.group(1) if match else "DefaultScene"
 
-def run_manim_script(script_path: str, scene_name: str) -> tuple[bool, str]:
-    command = [
-        "docker", "run", "--rm",
-        "-v", f"{Path(script_path).parent}:/manim",
-        "manimcommunity/manim", "manim",
-        Path(script_path).name, scene_name, "-ql", "--format=mp4",
-        "--media_dir", "/manim/output"
+def divide_scenes(text_script: str, content: str) -> list[dict[str, str]]:
+    scene_titles = [title.strip() for title in content.split("\n") if title.strip()]
+    if not scene_titles:
+        scene_titles = ["Default Scene"]
+    script_lines = text_script.split(". ")
+    lines_per_scene = max(1, len(script_lines) // len(scene_titles))
+    return [
+        {"title": title, "content": ". ".join(script_lines[i * lines_per_scene:(i + 1) * lines_per_scene]).strip()}
+        for i, title in enumerate(scene_titles)
     ]
+
+def read_module_docs(modules: str, dataset_dir: str = "dataset") -> list[str]:
+    content = []
+    for module in modules.split(","):
+        module = module.strip()
+        path = f"{dataset_dir}/{module}.txt"
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content.append(f.read())
+        except Exception as e:
+            content.append(f"Error reading {module}: {str(e)}")
+    return content
+
+QUALITY_ARGS = {
+    "low": [],
+    "draft": ["--resolution", "426,240", "--frame_rate", "10"],
+}
+QUALITY_DIRS = {"low": "480p15", "draft": "240p10"}
+
+def rendered_video_path(script_path: str, scene_name: str, quality_dir: str = "480p15") -> str:
+    script = Path(script_path)
+    return str(script.parent / "output" / "videos" / script.stem / quality_dir / f"{scene_name}.mp4")
+
+CONTAINER_CACHE_DIR = "/cache"
+RENDER_TIMEOUT_SECONDS = 300
+PROFILE_WRAPPER = "_manim_profile.py"
+
+def write_manim_config(script_dir: str, cache_dir: str, backend: str = "docker") -> None:
+    """Point manim's tex/text SVG output at the shared glyph cache via a manim.cfg next to the script."""
+    root = CONTAINER_CACHE_DIR if backend == "docker" else str(Path(cache_dir).resolve())
+    with open(Path(script_dir) / "manim.cfg", "w", encoding="utf-8") as f:
+        f.write(f"[CLI]\ntex_dir = {root}/Tex\ntext_dir = {root}/texts\n")
+
+def build_manim_command(script_path: str, scene_name: str, backend: str = "docker",
+                        cpus: float = None, memory: str = None, cache_dir: str = None,
+                        extra_args: list[str] = None, profile: bool = False, quality: str = "low") -> list[str]:
+    """quality "low" is manim's -ql; "draft" renders 240p at 10fps for cheap checks under a tight budget."""
+    script = Path(script_path)
+    extra_args = QUALITY_ARGS[quality] + (extra_args or [])
+    entry = ["python", PROFILE_WRAPPER] if profile else ["manim"]
+    if backend == "local":
+        return [
+            *entry, script.name, scene_name, "-ql", "--format=mp4",
+            "--media_dir", str(script.parent / "output"), *extra_args
+        ]
+    options = []
+    if cpus:
+        options += ["--cpus", str(cpus)]
+    if memory:
+        options += ["--memory", memory]
+    if cache_dir:
+        options += ["-v", f"{Path(cache_dir).resolve()}:{CONTAINER_CACHE_DIR}"]
+    return [
+        "docker", "run", "--rm", *options,
+        "-v", f"{script.parent}:/manim",
+        "manimcommunity/manim", *entry,
+        script.name, scene_name, "-ql", "--format=mp4",
+        "--media_dir", "/manim/output", *extra_args
+    ]
+
+def run_manim_script(script_path: str, scene_name: str, backend: str = "docker",
+                     cpus: float = None, memory: str = None, cache_dir: str = None,
+                     extra_args: list[str] = None, profile_dir: str = None, cancel=None,
+                     quality: str = "low") -> tuple[bool, str]:
+    """Render one scene. With profile_dir set, the render runs under the sampling profiler and a
+    flamegraph plus per-play() timing table are written to profile_dir. Setting the optional
+    threading.Event `cancel` stops the render early."""
+    if cache_dir:
+        write_manim_config(str(Path(script_path).parent), cache_dir, backend)
+    if profile_dir:
+        from render_profiler import write_profile_wrapper
+        write_profile_wrapper(str(Path(script_path).parent))
+    command = build_manim_command(script_path, scene_name, backend, cpus, memory, cache_dir, extra_args,
+                                  profile=bool(profile_dir), quality=quality)
+    success, result = _execute_manim(command, Path(script_path).parent, cancel)
+    if profile_dir:
+        from render_profiler import collect_profile, format_timing_table
+        report = collect_profile(str(Path(script_path).parent), profile_dir, title=f"{scene_name} ({script_path})")
+        if report:
+            logging.info(Fore.CYAN + f"Render profile for {scene_name}:\n{format_timing_table(report)}")
+    return success, result
+
+def _execute_manim(command: list[str], cwd: Path, cancel=None) -> tuple[bool, str]:
     try:
         logging.info(Fore.GREEN + f"Executing Manim script: {' '.join(command)}")
-        result = subprocess.run(
-            command, capture_output=True, text=True, timeout=300,
-            encoding="utf-8", errors="replace"
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+            encoding="utf-8", errors="replace", cwd=cwd
         )
-        if result.returncode == 0:
+        deadline = time.monotonic() + RENDER_TIMEOUT_SECONDS
+        while True:
+            try:
+                _, stderr = process.communicate(timeout=0.5)
+                break
+            except subprocess.TimeoutExpired:
+                if cancel is not None and cancel.is_set():
+                    _stop(process)
+                    logging.info(Fore.YELLOW + "Manim execution cancelled")
+                    return False, "Cancelled"
+                if time.monotonic() > deadline:
+                    _stop(process)
+                    logging.error(Fore.RED + "Manim execution timed out")
+                    return False, "Timeout expired"
+        if process.returncode == 0:
             logging.info(Fore.GREEN + "Manim execution succeeded")
             return True, "Success"
         else:
-            logging.error(Fore.RED + f"Manim execution failed with code {result.returncode}")
-            logging.error(Fore.RED + f"Stderr: {result.stderr}")
-            return False, result.stderr or "Unknown error"
-    except subprocess.TimeoutExpired as e:
-        logging.error(Fore.RED + f"Manim execution timed out: {str(e)}")
-        return False, "Timeout expired"
+            logging.error(Fore.RED + f"Manim execution failed with code {process.returncode}")
+            logging.error(Fore.RED + f"Stderr: {stderr}")
+            return False, stderr or "Unknown error"
     except Exception as e:
         logging.error(Fore.RED + f"Unexpected error in Manim execution: {str(e)}")
         return False, str(e)
-    
\ No newline at end of file
+
+def _stop(process: subprocess.Popen) -> None:
+    """SIGTERM first: an attached `docker run` proxies it to the container, which --rm then removes."""
+    process.terminate()
+    try:
+        process.communicate(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+
+def ffmpeg_command(tool: str, args: list[str], workdir: Path, backend: str = "docker") -> list[str]:
+    """ffmpeg/ffprobe invocation over files in workdir; with docker the manim image's binaries are used."""
+    if backend == "local":
+        return [tool, *args]
+    return ["docker", "run", "--rm", "-v", f"{Path(workdir).resolve()}:/manim", "-w", "/manim", "manimcommunity/manim", tool, *args]
+
+def concat_videos(video_paths: list[str], output_path: str, backend: str = "docker") -> tuple[bool, str]:
+    """Join mp4s rendered with identical settings using ffmpeg's concat demuxer (stream copy, no re-encode)."""
+    output = Path(output_path).resolve()
+    workdir = output.parent
+    workdir.mkdir(parents=True, exist_ok=True)
+    names = []
+    for i, video in enumerate(video_paths):
+        name = f"part{i:03d}.mp4"
+        shutil.copyfile(video, workdir / name)
+        names.append(name)
+    (workdir / "concat.txt").write_text("".join(f"file '{name}'\n" for name in names), encoding="utf-8")
+    ffmpeg = ffmpeg_command("ffmpeg", ["-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", "concat.txt",
+                                       "-c", "copy", "-movflags", "+faststart", output.name], workdir, backend)
+    try:
+        logging.info(Fore.GREEN + f"Concatenating {len(names)} videos: {' '.join(ffmpeg)}")
+        result = subprocess.run(
+            ffmpeg, capture_output=True, text=True, timeout=300,
+            encoding="utf-8", errors="replace", cwd=workdir
+        )
+    except (subprocess.TimeoutExpired, OSError) as e:
+        logging.error(Fore.RED + f"Video concatenation failed: {str(e)}")
+        return False, str(e)
+    finally:
+        for name in names:
+            (workdir / name).unlink(missing_ok=True)
+        (workdir / "concat.txt").unlink(missing_ok=True)
+    if result.returncode != 0:
+        logging.error(Fore.RED + f"Video concatenation failed: {result.stderr}")
+        return False, result.stderr or "Unknown error"
+    return True, str(output)
@@ -0,0 +1,31 @@
+import os
+import re
+import shutil
+import logging
+import tempfile
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Iterator, Union
+
+TMPFS_ROOT = "/dev/shm"
+
+def _safe(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)[:40]
+
+@contextmanager
+def render_workspace(run_id: Union[int, str], attempt: int, tmpfs: bool = None) -> Iterator[Path]:
+    """Private directory for one render attempt; only this directory is mounted into the container.
+
+    Set MANIM_WORKSPACE_TMPFS=1 to place workspaces on tmpfs and MANIM_KEEP_WORKSPACES=1
+    to leave them behind for debugging.
+    """
+    if tmpfs is None:
+        tmpfs = os.getenv("MANIM_WORKSPACE_TMPFS") == "1"
+    root = os.getenv("MANIM_WORKSPACE_ROOT") or (TMPFS_ROOT if tmpfs and os.path.isdir(TMPFS_ROOT) else None)
+    path = Path(tempfile.mkdtemp(prefix=f"manim-{_safe(str(run_id))}-a{attempt}-", dir=root))
+    logging.info(f"Created render workspace {path}")
+    try:
+        yield path
+    finally:
+        if os.getenv("MANIM_KEEP_WORKSPACES") != "1":
+            shutil.rmtree(path, ignore_errors=True)